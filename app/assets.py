@@ -0,0 +1,246 @@
+"""Fingerprinted, precompressed static assets.
+
+`python -m app.assets build` copies every file under static/ to static/dist/
+with a content hash in its name (`exercises.js` -> `exercises.3f2a91c0.js`),
+writes `.gz` (and `.br`, when the `brotli` package is installed) siblings
+for text assets, and records the mapping in static/dist/manifest.json.
+Relative ES module imports (`from "./config.js"`) are rewritten to the
+hashed names before hashing, so a change to config.js also changes the name
+of every module that imports it.
+
+Templates call `asset_url("exercises.js")`; it returns the hashed URL when
+the manifest exists and the plain `/static/...` URL otherwise, so a
+checkout without a build keeps working. nginx serves the templates without
+rendering them, so `python -m app.assets pages --out DIR` writes copies
+with those calls replaced by the URLs.
+
+`PrecompressedStaticFiles` serves the `.br` / `.gz` sibling matching the
+request's Accept-Encoding, and marks hashed files as immutable.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+DIST = "dist"
+MANIFEST = "manifest.json"
+STATIC_URL = "/static"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Images are already compressed; gzip would only cost CPU.
+COMPRESSIBLE = frozenset((".js", ".css", ".html", ".json", ".svg", ".txt", ".map"))
+_ASSET_URL = re.compile(r"""\{\{\s*asset_url\(\s*(["'])([^"']+)\1\s*\)\s*\}\}""")
+_IMPORT = re.compile(r"""(\bfrom\s*|\bimport\s*\(?\s*)(["'])\./([^"']+)\2""")
+
+
+# ---------- Build ----------
+def _fingerprint(name: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()[:8]
+    stem, dot, ext = name.rpartition(".")
+    return f"{stem}.{digest}.{ext}" if dot else f"{name}.{digest}"
+
+
+def _rewrite_imports(rel: str, text: str, manifest: Dict[str, str]) -> str:
+    base = os.path.dirname(rel)
+
+    def swap(m: re.Match) -> str:
+        target = os.path.normpath(os.path.join(base, m.group(3))).replace(os.sep, "/")
+        hashed = manifest.get(target)
+        if hashed is None:
+            return m.group(0)
+        return f"{m.group(1)}{m.group(2)}./{os.path.relpath(hashed, base or '.')}{m.group(2)}"
+
+    return _IMPORT.sub(swap, text)
+
+
+def _imports(text: str) -> set:
+    return {m.group(3) for m in _IMPORT.finditer(text)}
+
+
+def _compress(path: Path, data: bytes) -> None:
+    with open(f"{path}.gz", "wb") as f:
+        # mtime=0 keeps the output reproducible between builds
+        with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=9, mtime=0) as gz:
+            gz.write(data)
+    try:
+        import brotli
+    except ImportError:
+        return
+    Path(f"{path}.br").write_bytes(brotli.compress(data, quality=11))
+
+
+def build(src: Path = STATIC_DIR, out: Optional[Path] = None) -> Dict[str, str]:
+    """Write fingerprinted copies of `src` into `out` (default src/dist).
+
+    Returns the manifest: source path (relative to src) -> hashed path
+    (relative to out).
+    """
+    out = out or src / DIST
+    if out.exists():
+        shutil.rmtree(out)
+    out.mkdir(parents=True)
+
+    pending: Dict[str, bytes] = {}
+    for path in sorted(src.rglob("*")):
+        if path.is_file() and out not in path.parents:
+            pending[path.relative_to(src).as_posix()] = path.read_bytes()
+
+    manifest: Dict[str, str] = {}
+    # Hash modules after the modules they import, so the import specifiers
+    # (and therefore the importer's hash) reflect the imported content.
+    while pending:
+        ready = []
+        for rel, data in pending.items():
+            deps = set()
+            if rel.endswith(".js"):
+                base = os.path.dirname(rel)
+                deps = {
+                    os.path.normpath(os.path.join(base, d)).replace(os.sep, "/")
+                    for d in _imports(data.decode("utf-8"))
+                }
+            if not (deps & pending.keys() - {rel}):
+                ready.append(rel)
+        if not ready:  # import cycle: hash the rest with their original specifiers
+            ready = list(pending)
+        for rel in ready:
+            data = pending.pop(rel)
+            if rel.endswith(".js"):
+                data = _rewrite_imports(rel, data.decode("utf-8"), manifest).encode("utf-8")
+            hashed = _fingerprint(rel, data)
+            target = out / hashed
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+            if target.suffix in COMPRESSIBLE:
+                _compress(target, data)
+            manifest[rel] = hashed
+
+    (out / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    return manifest
+
+
+# ---------- URLs for templates ----------
+@lru_cache(maxsize=1)
+def load_manifest(static_dir: Path = STATIC_DIR) -> Dict[str, str]:
+    try:
+        return json.loads((static_dir / DIST / MANIFEST).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(path: str) -> str:
+    """URL of a static asset: the fingerprinted copy if one was built."""
+    hashed = load_manifest().get(path)
+    if hashed is None:
+        return f"{STATIC_URL}/{path}"
+    return f"{STATIC_URL}/{DIST}/{hashed}"
+
+
+def render_pages(out: Path, src: Path = TEMPLATES_DIR) -> List[str]:
+    """Copy the templates in `src` to `out` with every `{{ asset_url(...) }}`
+    replaced by its URL, for servers that do not render Jinja; other
+    template syntax is left as it is. Returns the names written."""
+    out.mkdir(parents=True, exist_ok=True)
+    written = []
+    for path in sorted(src.glob("*.html")):
+        html = _ASSET_URL.sub(lambda m: asset_url(m.group(2)), path.read_text())
+        (out / path.name).write_text(html)
+        written.append(path.name)
+    return written
+
+
+# ---------- Serving ----------
+def accepted_encodings(header: str) -> set:
+    """Content codings with a non-zero q-value in an Accept-Encoding header."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves prebuilt `.br` / `.gz` siblings of files in
+    dist/ and gives them a one-year immutable Cache-Control; their names
+    change whenever their content does."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if not path.startswith(f"{DIST}/") or path.endswith(MANIFEST):
+            return response
+        response.headers["Cache-Control"] = IMMUTABLE
+        if response.status_code != 200 or os.path.splitext(path)[1] not in COMPRESSIBLE:
+            return response
+
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        for coding, ext in (("br", ".br"), ("gzip", ".gz")):
+            if coding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, path + ext
+            )
+            if stat_result is None:
+                continue
+            encoded = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                headers={
+                    "Content-Encoding": coding,
+                    "Cache-Control": IMMUTABLE,
+                    "Vary": "Accept-Encoding",
+                },
+            )
+            if self.is_not_modified(encoded.headers, request_headers):
+                return NotModifiedResponse(encoded.headers)
+            return encoded
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build fingerprinted static assets.")
+    parser.add_argument("command", choices=["build", "pages"])
+    parser.add_argument("--src", type=Path, default=None)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+    if args.command == "pages":
+        if args.out is None:
+            parser.error("pages needs --out")
+        pages = render_pages(args.out, args.src or TEMPLATES_DIR)
+        print(f"Rendered asset URLs into {len(pages)} pages in {args.out}")
+        return
+    src = args.src or STATIC_DIR
+    manifest = build(src, args.out)
+    print(f"Built {len(manifest)} assets into {args.out or src / DIST}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,37 @@
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+import hmac
 import os
+import threading
+import time
 
-from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, Request
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlmodel import Session as DBSession
+from sqlmodel.ext.asyncio.session import AsyncSession as AsyncDBSession
 
-from .db import get_session
+from .db import ENVIRONMENT, get_async_session, get_read_session
+from .metrics import AUTH_CACHE_LOOKUPS
 from .models import User
+from .passwords import password_context
 
-load_dotenv()
-
-# Auth config (helpers)
+# Auth config (helpers); .env is loaded once, by app.db
 ACCESS_COOKIE = "access_token"  # single source of truth
 JWT_SECRET = os.getenv("JWT_SECRET", "DEV_ONLY_CHANGE_ME")
 JWT_ALG = os.getenv("JWT_ALG", "HS256")
 JWT_TTL = timedelta(seconds=int(os.getenv("JWT_TTL_SECONDS", 43200)))
-
-pwd_ctx = CryptContext(schemes=["argon2"], deprecated="auto")
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
 
 
 def hash_pw(p: str) -> str:
-    return pwd_ctx.hash(p)
+    return password_context().hash(p)
 
 
 def verify_pw(p: str, h: str) -> bool:
-    return pwd_ctx.verify(p, h)
+    return password_context().verify(p, h)
 
 
 def make_token(user_id: int) -> str:
@@ -39,24 +44,133 @@ def make_token(user_id: int) -> str:
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
 
 
-def _read_token(token: str) -> int:
+def _decode(token: str) -> tuple[int, float]:
     try:
         data = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-        return int(data.get("sub"))
-    except JWTError:
+        return int(data.get("sub")), float(data.get("exp", 0))
+    except (JWTError, TypeError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
 
+def _read_token(token: str) -> int:
+    return _decode(token)[0]
+
+
+# ---------- Authenticated-user cache ----------
+@dataclass(frozen=True)
+class CurrentUser:
+    """What handlers and templates need from the logged-in user."""
+
+    id: int
+    email: str
+
+
+class _UserCache:
+    """Bounded LRU of token -> CurrentUser; entries expire after AUTH_CACHE_TTL
+    or when the token itself expires, whichever comes first."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[CurrentUser, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> CurrentUser | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[0]
+
+    def put(self, token: str, user: CurrentUser, token_exp: float) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        expires = min(time.time() + self.ttl, token_exp)
+        with self._lock:
+            self._entries[token] = (user, expires)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = _UserCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+
+def invalidate_token(token: str | None) -> None:
+    """Forget a token (logout)."""
+    if token:
+        user_cache.discard(token)
+
+
+def _cached_user(token: str) -> CurrentUser | None:
+    user = user_cache.get(token)
+    AUTH_CACHE_LOOKUPS.labels(result="hit" if user else "miss").inc()
+    return user
+
+
 def get_current_user(
-    request: Request, db: DBSession = Depends(get_session)
-) -> User | None:
+    request: Request, db: DBSession = Depends(get_read_session)
+) -> CurrentUser | None:
     token = request.cookies.get(ACCESS_COOKIE)
     if not token:
         return None
 
-    user_id = _read_token(token)
+    cached = _cached_user(token)
+    if cached is not None:
+        return cached
+
+    user_id, exp = _decode(token)
     user = db.get(User, user_id)
     if not user:
         return None
 
-    return user
+    principal = CurrentUser(id=user.id, email=user.email)
+    user_cache.put(token, principal, exp)
+    return principal
+
+
+async def get_current_user_async(
+    request: Request, db: AsyncDBSession = Depends(get_async_session)
+) -> CurrentUser | None:
+    """`get_current_user` for async handlers (DB_ASYNC=true)."""
+    token = request.cookies.get(ACCESS_COOKIE)
+    if not token:
+        return None
+
+    cached = _cached_user(token)
+    if cached is not None:
+        return cached
+
+    user_id, exp = _decode(token)
+    user = await db.get(User, user_id)
+    if not user:
+        return None
+
+    principal = CurrentUser(id=user.id, email=user.email)
+    user_cache.put(token, principal, exp)
+    return principal
+
+
+def debug_access_allowed(headers) -> bool:
+    """Open outside production; in production needs `X-Debug-Token: $DEBUG_TOKEN`."""
+    if ENVIRONMENT != "production":
+        return True
+    supplied = headers.get("X-Debug-Token", "")
+    return bool(DEBUG_TOKEN) and hmac.compare_digest(supplied, DEBUG_TOKEN)
+
+
+def require_debug_access(request: Request) -> None:
+    if not debug_access_allowed(request.headers):
+        raise HTTPException(status_code=404, detail="Not Found")
@@ -0,0 +1,99 @@
+"""Conditional GET (ETag / If-None-Match) for user-scoped collections.
+
+The ETag of a list or detail response is a hash of the user, the request
+path and query, and the version stamps (app.services.stamps) of the
+collections the response is built from. Checking it costs one primary-key
+lookup: when the client's If-None-Match still matches, the route answers
+304 before its handler loads any rows.
+
+    @router.get("/{exercise_id}", dependencies=[Depends(etag_for(EXERCISES))])
+
+List routes that build their own response take the ETag as a value and
+pass it to `list_response(..., etag=etag)`.
+
+Responses carry `Cache-Control: private, no-cache`, so browsers keep them
+but revalidate on every use. The ETags are weak: GZipMiddleware may
+re-encode the body.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Callable, Dict, Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlmodel import Session as DBSession
+from sqlmodel.ext.asyncio.session import AsyncSession as AsyncDBSession
+
+from .auth import CurrentUser, get_current_user, get_current_user_async
+from .db import get_async_session, get_read_session
+from .services import stamps
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(user_id: int, request: Request, versions: Dict[str, int]) -> str:
+    key = "|".join(
+        [str(user_id), request.url.path, request.url.query]
+        + [f"{c}={v}" for c, v in sorted(versions.items())]
+    )
+    return 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of `etag` against an If-None-Match header value."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(",")
+    )
+
+
+def _check(
+    request: Request, response: Response, user_id: int, versions: Dict[str, int]
+) -> str:
+    etag = make_etag(user_id, request, versions)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=304, headers=etag_headers(etag))
+    response.headers.update(etag_headers(etag))
+    return etag
+
+
+def etag_for(*collections: str) -> Callable[..., Optional[str]]:
+    """Dependency: ETag of the current request over `collections`; raises 304
+    when If-None-Match matches. None (no ETag) for anonymous requests."""
+
+    def check(
+        request: Request,
+        response: Response,
+        db: DBSession = Depends(get_read_session),
+        user: Optional[CurrentUser] = Depends(get_current_user),
+    ) -> Optional[str]:
+        if user is None:
+            return None
+        return _check(request, response, user.id, stamps.current(db, user.id, collections))
+
+    return check
+
+
+def etag_for_async(*collections: str) -> Callable[..., Optional[str]]:
+    """`etag_for` for async handlers (DB_ASYNC=true)."""
+
+    async def check(
+        request: Request,
+        response: Response,
+        db: AsyncDBSession = Depends(get_async_session),
+        user: Optional[CurrentUser] = Depends(get_current_user_async),
+    ) -> Optional[str]:
+        if user is None:
+            return None
+        versions = await stamps.current_async(db, user.id, collections)
+        return _check(request, response, user.id, versions)
+
+    return check
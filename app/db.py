@@ -1,13 +1,29 @@
+import itertools
+import logging
 import os
 import sys
-import traceback
+import time
 
 from dotenv import load_dotenv
+from fastapi import Depends, Request
 from sqlalchemy import event
-from sqlalchemy.engine import Engine
-from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_TIMEOUTS,
+    DB_SESSIONS_ACTIVE,
+)
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 DEFAULT_DB_URL = "sqlite:///./fitness.db"
 ENVIRONMENT = os.getenv("ENV", "development").lower()
@@ -21,16 +37,293 @@ else:
         )
     DATABASE_URL = DEFAULT_DB_URL
 
-print(f"🚀 Using DATABASE_URL = {DATABASE_URL}", flush=True)
 
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+# ---- Connection pool ----
+# Per-backend defaults; each value can be overridden with the DB_POOL_* env vars.
+POOL_PROFILES = {
+    "sqlite": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_pre_ping": False,
+        "pool_recycle": -1,
+    },
+    "postgresql": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    },
+}
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    u = make_url(url)
+    return u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:")
+
+
+def pool_settings(url: str) -> dict:
+    """Resolve pool options for `url` from its backend profile plus env overrides."""
+    backend = "sqlite" if url.startswith("sqlite") else "postgresql"
+    profile = POOL_PROFILES[backend]
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", profile["pool_size"])),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", profile["max_overflow"])),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", profile["pool_timeout"])),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", profile["pool_pre_ping"]),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", profile["pool_recycle"])),
+    }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports checkout wait, checked-out count and overflow."""
+
+    @property
+    def metrics_name(self) -> str:
+        return getattr(self, "logging_name", None) or "primary"
+
+    def _do_get(self):
+        name = self.metrics_name
+        overflow_before = self.overflow()
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.labels(pool=name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(pool=name).observe(time.perf_counter() - start)
+        if self.overflow() > max(overflow_before, 0):
+            DB_POOL_OVERFLOW.labels(pool=name).inc()
+        DB_POOL_CHECKED_OUT.labels(pool=name).set(self.checkedout())
+        return conn
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        DB_POOL_CHECKED_OUT.labels(pool=self.metrics_name).set(self.checkedout())
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """Asyncio-compatible variant used by the async engine."""
+
+
+def build_engine(url: str, name: str = "primary", **pool_overrides) -> Engine:
+    """Create an engine for `url` using the pool profile of its backend."""
+    kwargs: dict = {"echo": _env_bool("SQL_ECHO", False)}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not _is_memory_sqlite(url):
+        kwargs.update(pool_settings(url))
+        kwargs.update(pool_overrides)
+        kwargs["poolclass"] = InstrumentedQueuePool
+        kwargs["pool_logging_name"] = name
+    return create_engine(url, **kwargs)
+
+
+# ---- Production SQLite profile ----
+# Opt-in with SQLITE_PRODUCTION=true: WAL and tuned pragmas, one writer
+# connection per process that queues every write, and a read-only pool.
+def sqlite_production_pragmas(read_only: bool = False) -> list[str]:
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', 268435456))}",
+        f"PRAGMA cache_size={int(os.getenv('SQLITE_CACHE_SIZE', -65536))}",
+        f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def build_sqlite_writer_engine(url: str) -> Engine:
+    """Single-connection engine; the pool queue serializes writers.
+
+    Transactions start with BEGIN IMMEDIATE so a writer takes the database
+    lock up front (waiting up to busy_timeout) instead of failing with
+    "database is locked" when it upgrades from a read to a write.
+    """
+    eng = build_engine(
+        url,
+        name="sqlite-writer",
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=float(os.getenv("SQLITE_WRITE_QUEUE_TIMEOUT", 30)),
+    )
+    pragmas = sqlite_production_pragmas()
+
+    @event.listens_for(eng, "connect")
+    def _writer_connect(dbapi_conn, _):
+        dbapi_conn.isolation_level = None  # SQLAlchemy emits BEGIN below
+        cursor = dbapi_conn.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(eng, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return eng
+
+
+def build_sqlite_reader_engine(url: str) -> Engine:
+    """Pooled engine whose connections refuse writes (PRAGMA query_only)."""
+    eng = build_engine(url, name="sqlite-read")
+    pragmas = sqlite_production_pragmas(read_only=True)
+
+    @event.listens_for(eng, "connect")
+    def _reader_connect(dbapi_conn, _):
+        cursor = dbapi_conn.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return eng
+
+
+SQLITE_PRODUCTION = DATABASE_URL.startswith("sqlite") and _env_bool(
+    "SQLITE_PRODUCTION", False
+)
+
+# ---- Async engine ----
+# DB_ASYNC=true serves the hot read endpoints from async handlers backed by
+# aiosqlite / psycopg async instead of the threadpool.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+psycopg",
+}
+
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=os.getenv("SQL_ECHO", "false").lower() == "true",
-    connect_args=connect_args,
+def async_database_url(url: str) -> str:
+    u = make_url(url)
+    return u.set(drivername=ASYNC_DRIVERS[u.get_backend_name()]).render_as_string(
+        hide_password=False
+    )
+
+
+def build_async_engine(url: str, name: str = "async") -> AsyncEngine:
+    aurl = async_database_url(url)
+    kwargs: dict = {"echo": _env_bool("SQL_ECHO", False)}
+    if not _is_memory_sqlite(url):
+        kwargs.update(pool_settings(url))
+        kwargs["poolclass"] = InstrumentedAsyncQueuePool
+        kwargs["pool_logging_name"] = name
+    return create_async_engine(aurl, **kwargs)
+
+
+ASYNC_DB = _env_bool("DB_ASYNC", False)
+
+# ---- Read routing ----
+# DATABASE_READ_URLS (comma separated) adds read replicas for
+# get_read_session. A client that just wrote is pinned to the primary for
+# DB_READ_AFTER_WRITE_SECONDS (via a cookie) so it reads its own writes.
+READ_POLICIES = ("round_robin", "least_connections")
+READ_AFTER_WRITE_COOKIE = "db_read_primary_until"
+READ_AFTER_WRITE_SECONDS = float(os.getenv("DB_READ_AFTER_WRITE_SECONDS", 5))
+REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", 30))
+
+
+class ReadRouter:
+    """Chooses a read engine per request and skips replicas that failed."""
+
+    def __init__(self, engines: list[Engine], policy: str = "round_robin"):
+        if policy not in READ_POLICIES:
+            raise ValueError(
+                f"Unknown DB_READ_POLICY '{policy}'. Valid options: {READ_POLICIES}"
+            )
+        self.engines = engines
+        self.policy = policy
+        self._counter = itertools.count()
+        self._down_until: dict[Engine, float] = {}
+
+    def pick(self) -> Engine | None:
+        now = time.monotonic()
+        healthy = [e for e in self.engines if self._down_until.get(e, 0) <= now]
+        if not healthy:
+            return None
+        if self.policy == "least_connections":
+            return min(healthy, key=lambda e: e.pool.checkedout())
+        return healthy[next(self._counter) % len(healthy)]
+
+    def mark_down(self, eng: Engine) -> None:
+        self._down_until[eng] = time.monotonic() + REPLICA_RETRY_SECONDS
+
+    def connect(self) -> Connection | None:
+        """Connection to a healthy read engine, or None to fall back to the primary."""
+        while (eng := self.pick()) is not None:
+            try:
+                return eng.connect()
+            except DBAPIError:
+                self.mark_down(eng)
+        return None
+
+
+class ReadSession(Session):
+    """Session that picks its read engine on first use, not when it is created.
+
+    Handlers that answer without a query (a 304, a cached body) never take a
+    replica connection. When no replica is reachable it reads from the
+    `fallback` session's engine.
+    """
+
+    def __init__(self, router: ReadRouter, fallback: Session, **kwargs):
+        super().__init__(**kwargs)
+        self._router = router
+        self._fallback = fallback
+        self._read_bind: Engine | Connection | None = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._read_bind is None:
+            self._read_bind = self._router.connect() or self._fallback.get_bind()
+        return self._read_bind
+
+    def close(self) -> None:
+        super().close()
+        bind, self._read_bind = self._read_bind, None
+        if isinstance(bind, Connection):
+            bind.close()
+
+
+def reads_pinned_to_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(READ_AFTER_WRITE_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+READ_URLS = [u.strip() for u in os.getenv("DATABASE_READ_URLS", "").split(",") if u.strip()]
+
+if SQLITE_PRODUCTION:
+    engine = build_sqlite_writer_engine(DATABASE_URL)
+else:
+    engine = build_engine(DATABASE_URL)
+
+if READ_URLS:
+    read_engines = [
+        build_engine(url, name=f"replica-{i}") for i, url in enumerate(READ_URLS)
+    ]
+elif SQLITE_PRODUCTION:
+    read_engines = [build_sqlite_reader_engine(DATABASE_URL)]
+else:
+    read_engines = []
+
+read_router: ReadRouter | None = (
+    ReadRouter(read_engines, os.getenv("DB_READ_POLICY", "round_robin").lower())
+    if read_engines
+    else None
+)
+
+async_engine: AsyncEngine | None = (
+    build_async_engine(DATABASE_URL) if ASYNC_DB else None
 )
 
 # SQLite foreign keys if needed
@@ -44,18 +337,57 @@ if DATABASE_URL.startswith("sqlite"):
 
 
 def init_db() -> None:
-    print("  Running init_db()...", flush=True)
-    try:
-        from . import models  # noqa: F401
+    """Startup check only: the schema must already be migrated (no DDL here)."""
+    from .migrations import SchemaOutOfDate, check_schema
 
-        SQLModel.metadata.create_all(engine)
-        print(" init_db completed successfully!", flush=True)
-    except Exception as e:
-        print(" init_db FAILED:", e, flush=True)
-        traceback.print_exc()
+    url = make_url(DATABASE_URL).render_as_string(hide_password=True)
+    try:
+        version = check_schema(engine)
+        logger.info("Database %s at schema version %s", url, version)
+    except SchemaOutOfDate as e:
+        if ENVIRONMENT == "production":
+            logger.error("init_db failed for %s: %s", url, e)
+            sys.exit(1)  # force crash so Azure shows logs
+        logger.warning("%s", e)
+    except Exception:
+        logger.exception("init_db failed for %s", url)
         sys.exit(1)  # force crash so Azure shows logs
 
 
 def get_session():
-    with Session(engine) as session:
-        yield session
+    DB_SESSIONS_ACTIVE.labels(kind="primary").inc()
+    try:
+        with Session(engine) as session:
+            yield session
+    finally:
+        DB_SESSIONS_ACTIVE.labels(kind="primary").dec()
+
+
+def get_read_session(request: Request, primary: Session = Depends(get_session)):
+    """Session for read-only handlers.
+
+    Routes to a replica / the read-only pool when one is configured and the
+    client is not pinned to the primary; otherwise it is the same session as
+    `get_session` (which has not touched the database yet). The replica is
+    chosen and connected on the first query (see `ReadSession`).
+    """
+    if read_router is None or (READ_URLS and reads_pinned_to_primary(request)):
+        yield primary
+        return
+    DB_SESSIONS_ACTIVE.labels(kind="read").inc()
+    try:
+        with ReadSession(read_router, primary) as session:
+            yield session
+    finally:
+        DB_SESSIONS_ACTIVE.labels(kind="read").dec()
+
+
+async def get_async_session():
+    if async_engine is None:
+        raise RuntimeError("Async database access is disabled; set DB_ASYNC=true.")
+    DB_SESSIONS_ACTIVE.labels(kind="async").inc()
+    try:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+    finally:
+        DB_SESSIONS_ACTIVE.labels(kind="async").dec()
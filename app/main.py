@@ -1,20 +1,42 @@
+import asyncio
+import contextlib
 from pathlib import Path
 from fastapi import FastAPI, Request, Depends, HTTPException
-from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
-import time
+from fastapi.middleware.gzip import GZipMiddleware
 
 
-from .db import init_db
-from .auth import get_current_user
-from .models import User
-from .routers import exercises, workouts, sessions, external, auth as auth_router
+from .db import READ_URLS, init_db
+from .assets import PrecompressedStaticFiles, asset_url
+from .auth import ACCESS_COOKIE, CurrentUser, get_current_user, invalidate_token
+from .metrics import mark_process_dead, render_latest
+from .middleware import MetricsMiddleware, ReadAfterWriteMiddleware
+from .pagination import NEXT_CURSOR_HEADER
+from .profiler import PROFILER_ENABLED, ProfilerMiddleware
+from .responses import GZIP_MIN_SIZE
+from . import passwords, runtime_monitor
+from .server import configure_threadpool
+from .routers import exercises, workouts, sessions, external, debug, auth as auth_router
 
 
-app = FastAPI(title="Fitness Tracker")
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    configure_threadpool()
+    monitor = asyncio.create_task(runtime_monitor.run())
+    try:
+        yield
+    finally:
+        monitor.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await monitor
+        passwords.shutdown()
+        mark_process_dead()
+
+
+app = FastAPI(title="Fitness Tracker", lifespan=lifespan)
 
 # ---- CORS Configuration for Azure Deployment ----
 origins = [
@@ -32,6 +54,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
 
@@ -40,41 +63,25 @@ STATIC_DIR = BASE_DIR / "static"
 TEMPLATES_DIR = BASE_DIR / "templates"
 
 
-app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=str(STATIC_DIR)), name="static")
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+templates.env.globals["asset_url"] = asset_url  # fingerprinted URLs, see app.assets
 
 
-@app.on_event("startup")
-def on_startup() -> None:
-    init_db()
+# ---- Compression (responses over GZIP_MIN_SIZE, when the client accepts gzip) ----
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
 
+# ---- Metrics (outside GZip, so response sizes are bytes on the wire) ----
+app.add_middleware(MetricsMiddleware)
 
-# ---- Metrics ----
-REQUEST_COUNT = Counter(
-    "http_requests_total",
-    "Total HTTP requests",
-    ["method", "path", "status"],
-)
-REQUEST_LATENCY = Histogram(
-    "http_request_latency_seconds",
-    "Request latency",
-    ["method", "path"],
-)
+# ---- Per-request profiling (X-Profile: 1); not installed unless enabled ----
+if PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
 
 
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next):
-    start = time.perf_counter()
-    response = await call_next(request)
-    path = request.url.path
-    method = request.method
-    REQUEST_COUNT.labels(
-        method=method, path=path, status=str(response.status_code)
-    ).inc()
-    REQUEST_LATENCY.labels(method=method, path=path).observe(
-        time.perf_counter() - start
-    )
-    return response
+# ---- Read-your-writes for replicas ----
+if READ_URLS:
+    app.add_middleware(ReadAfterWriteMiddleware)
 
 
 # ---- APIs ----
@@ -83,9 +90,10 @@ app.include_router(workouts.router)
 app.include_router(sessions.router)
 app.include_router(external.router)
 app.include_router(auth_router.router)  # uses /api/auth/*
+app.include_router(debug.router)  # /__debug/* (open outside production)
 
 
-def require_user(user: User | None = Depends(get_current_user)) -> User:
+def require_user(user: CurrentUser | None = Depends(get_current_user)) -> CurrentUser:
     """Dependency that ensures a logged-in user for HTML routes."""
     if user is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
@@ -112,46 +120,46 @@ def health():
 
 
 @app.get("/metrics")
-def metrics():
-    data = generate_latest()  # type: ignore
-    return PlainTextResponse(data.decode("utf-8"), media_type=CONTENT_TYPE_LATEST)
+def metrics(request: Request):
+    data, content_type = render_latest(request.headers.get("accept", ""))
+    return Response(data, media_type=content_type)
 
 
 # ---- Auth-required pages ----
-def _render_home(request: Request, user: User) -> HTMLResponse:
+def _render_home(request: Request, user: CurrentUser) -> HTMLResponse:
     return templates.TemplateResponse("index.html", {"request": request, "user": user})
 
 
 @app.get("/", response_class=HTMLResponse)
-def home(request: Request, user: User | None = Depends(get_current_user)):
+def home(request: Request, user: CurrentUser | None = Depends(get_current_user)):
     if user is None:
         return RedirectResponse(url="/login", status_code=303)
     return _render_home(request, user)
 
 
 @app.get("/index.html", response_class=HTMLResponse)
-def home_alias(request: Request, user: User | None = Depends(get_current_user)):
+def home_alias(request: Request, user: CurrentUser | None = Depends(get_current_user)):
     if user is None:
         return RedirectResponse(url="/login", status_code=303)
     return _render_home(request, user)
 
 
 @app.get("/exercises", response_class=HTMLResponse)
-def exercises_page(request: Request, user: User = Depends(require_user)):
+def exercises_page(request: Request, user: CurrentUser = Depends(require_user)):
     return templates.TemplateResponse(
         "exercises.html", {"request": request, "user": user}
     )
 
 
 @app.get("/workouts", response_class=HTMLResponse)
-def workouts_page(request: Request, user: User = Depends(require_user)):
+def workouts_page(request: Request, user: CurrentUser = Depends(require_user)):
     return templates.TemplateResponse(
         "workouts.html", {"request": request, "user": user}
     )
 
 
 @app.get("/sessions", response_class=HTMLResponse)
-def sessions_page(request: Request, user: User = Depends(require_user)):
+def sessions_page(request: Request, user: CurrentUser = Depends(require_user)):
     return templates.TemplateResponse(
         "sessions.html", {"request": request, "user": user}
     )
@@ -170,7 +178,8 @@ def debug_templates_path():
 
 # ---- Logout page route: clear BOTH cookie names then redirect ----
 @app.get("/logout")
-def logout_page():
+def logout_page(request: Request):
+    invalidate_token(request.cookies.get(ACCESS_COOKIE))
     resp = RedirectResponse("/login", status_code=303)
     for name in ("access_token", "session"):
         resp.delete_cookie(key=name, path="/")
@@ -0,0 +1,194 @@
+"""Prometheus metric definitions shared across the app.
+
+With several Uvicorn workers, app.server sets PROMETHEUS_MULTIPROC_DIR
+before any worker starts; every process then writes its samples to files in
+that directory and `/metrics` merges them (`render_latest`). Gauges use
+`livesum`, so only live workers contribute to them.
+"""
+
+import os
+import shutil
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.openmetrics import exposition as openmetrics
+
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+MULTIPROCESS = bool(os.getenv(MULTIPROC_ENV))
+
+
+def prepare_multiprocess_dir(path: str) -> None:
+    """Empty `path` (left-over files from a previous run would be merged in)."""
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def render_latest(accept: str = "") -> tuple[bytes, str]:
+    """Exposition body and content type for `/metrics`, merged across workers
+    in multiprocess mode. OpenMetrics (which carries exemplars) is used when
+    the scraper asks for it."""
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    if "application/openmetrics-text" in accept:
+        return openmetrics.generate_latest(registry), openmetrics.CONTENT_TYPE_LATEST
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int | None = None) -> None:
+    """Drop a stopped worker's live gauges from the merged output."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def route_label(scope: dict) -> str:
+    """Route template for a handled request (e.g. /api/sessions/{session_id})."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:  # mounted app such as /static
+        mount = scope.get("root_path", "")[len(scope.get("app_root_path", "")) :]
+        return f"{mount}/{{path}}"
+    return "<unmatched>"
+
+
+# ---- HTTP (labelled by route template and status class, never raw paths) ----
+_SIZE_BUCKETS = (0, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "Total HTTP requests",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_latency_seconds",
+    "Request latency",
+    ["method", "route"],
+)
+REQUEST_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum",
+)
+REQUEST_SIZE = Histogram(
+    "http_request_size_bytes",
+    "Request body size",
+    ["method", "route"],
+    buckets=_SIZE_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Response body size",
+    ["method", "route"],
+    buckets=_SIZE_BUCKETS,
+)
+
+
+# ---- Database connection pool ----
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Counter(
+    "db_pool_overflow_total",
+    "Connections opened beyond pool_size (overflow)",
+    ["pool"],
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up after pool_timeout",
+    ["pool"],
+)
+
+
+# ---- SQL per request ----
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "db_statements_per_request",
+    "SQL statements executed per request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 200),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Total time spent executing SQL per request",
+    ["method", "route"],
+)
+
+
+# ---- Auth ----
+AUTH_CACHE_LOOKUPS = Counter(
+    "auth_user_cache_lookups_total",
+    "Authenticated-user cache lookups in get_current_user",
+    ["result"],
+)
+
+# ---- Exercise library cache ----
+EXERCISE_CACHE_LOOKUPS = Counter(
+    "exercise_cache_lookups_total",
+    "Per-user exercise library cache lookups",
+    ["result"],
+)
+
+
+# ---- Password hashing ----
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Password hash/verify operations running or waiting for the pool",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Time to hash or verify a password, including queueing",
+    ["op"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Password operations refused because the queue was full",
+)
+
+
+# ---- Runtime (app.runtime_monitor) ----
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop woke a sleeping monitor task",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+THREADPOOL_SIZE = Gauge(
+    "threadpool_size",
+    "AnyIO threadpool tokens (max concurrent sync handlers)",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_BUSY = Gauge(
+    "threadpool_busy",
+    "AnyIO threadpool tokens in use",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_QUEUED = Gauge(
+    "threadpool_queued",
+    "Tasks waiting for an AnyIO threadpool token",
+    multiprocess_mode="livesum",
+)
+DB_SESSIONS_ACTIVE = Gauge(
+    "db_sessions_active",
+    "Open request-scoped DB sessions",
+    ["kind"],
+    multiprocess_mode="livesum",
+)
@@ -0,0 +1,149 @@
+"""Pure ASGI middleware.
+
+Unlike `@app.middleware("http")` (BaseHTTPMiddleware), these wrap the ASGI
+callables directly: no Request/Response objects, no extra task per request
+and streaming bodies pass straight through.
+"""
+
+from __future__ import annotations
+
+import time
+from http.cookies import SimpleCookie
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import (
+    DB_STATEMENTS_PER_REQUEST,
+    DB_TIME_PER_REQUEST,
+    REQUEST_COUNT,
+    REQUEST_IN_FLIGHT,
+    REQUEST_LATENCY,
+    REQUEST_SIZE,
+    RESPONSE_SIZE,
+    route_label,
+)
+from . import tracing
+from .db import READ_AFTER_WRITE_COOKIE, READ_AFTER_WRITE_SECONDS
+from .query_monitor import finish_request, start_request
+
+KNOWN_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+)
+
+
+def status_class(status: int) -> str:
+    return f"{status // 100}xx"
+
+
+class MetricsMiddleware:
+    """HTTP metrics labelled by method, route template and status class.
+
+    Labels never contain raw paths or ids, so the number of series is bounded
+    by the number of routes.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in KNOWN_METHODS else "OTHER"
+        status = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        span = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if span is not None:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-trace-id", span.trace_id.encode()))
+                    message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        REQUEST_IN_FLIGHT.inc()
+        query_scope = start_request()
+        start = time.perf_counter()
+        with tracing.start_span(method, root=True, **{"http.method": method}) as span:
+            try:
+                await self.app(scope, receive_wrapper, send_wrapper)
+            finally:
+                elapsed = time.perf_counter() - start
+                REQUEST_IN_FLIGHT.dec()
+                route = route_label(scope)
+                stats = finish_request(query_scope, route)
+                exemplar = None
+                if span is not None:
+                    span.name = f"{method} {route}"
+                    span.set("http.route", route)
+                    span.set("http.status_code", status)
+                    span.set("db.statements", stats.statements)
+                    exemplar = {"trace_id": span.trace_id}
+                REQUEST_COUNT.labels(
+                    method=method, route=route, status=status_class(status)
+                ).inc()
+                REQUEST_LATENCY.labels(method=method, route=route).observe(
+                    elapsed, exemplar
+                )
+                REQUEST_SIZE.labels(method=method, route=route).observe(request_bytes)
+                RESPONSE_SIZE.labels(method=method, route=route).observe(response_bytes)
+                DB_STATEMENTS_PER_REQUEST.labels(method=method, route=route).observe(
+                    stats.statements
+                )
+                DB_TIME_PER_REQUEST.labels(method=method, route=route).observe(
+                    stats.db_time
+                )
+
+
+class ReadAfterWriteMiddleware:
+    """Pin a client's reads to the primary for a while after it writes.
+
+    A successful non-GET response gets the `READ_AFTER_WRITE_COOKIE` with the
+    time until which `get_read_session` skips the replicas, so the client
+    reads its own writes despite replication lag.
+    """
+
+    SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    @staticmethod
+    def cookie_header() -> bytes:
+        cookie: SimpleCookie = SimpleCookie()
+        cookie[READ_AFTER_WRITE_COOKIE] = f"{time.time() + READ_AFTER_WRITE_SECONDS:.3f}"
+        morsel = cookie[READ_AFTER_WRITE_COOKIE]
+        morsel["max-age"] = max(1, int(READ_AFTER_WRITE_SECONDS))
+        morsel["path"] = "/"
+        morsel["httponly"] = True
+        morsel["samesite"] = "lax"
+        return cookie.output(header="").strip().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", self.cookie_header()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
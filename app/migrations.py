@@ -0,0 +1,286 @@
+"""Versioned schema migrations.
+
+Each migration runs once, in order, inside its own transaction, and is
+recorded in the `schema_version` table. Worker startup only compares the
+recorded version with the latest one (see `check_schema`).
+
+    python -m app.migrations upgrade   # apply pending migrations
+    python -m app.migrations current   # print applied / latest version
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import SQLModel
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+_meta = MetaData()
+schema_version = Table(
+    "schema_version",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def migration(version: int, description: str):
+    def register(fn: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        MIGRATIONS.append(Migration(version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return fn
+
+    return register
+
+
+def _create_index(conn: Connection, name: str, table: str, columns: str) -> None:
+    quoted = conn.dialect.identifier_preparer.quote(table)
+    conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {quoted} ({columns})")
+
+
+# ---------- Migrations ----------
+@migration(1, "baseline schema")
+def _baseline(conn: Connection) -> None:
+    from . import models  # noqa: F401
+
+    SQLModel.metadata.create_all(conn)
+
+
+@migration(2, "session (user_id, date DESC, id DESC)")
+def _ix_session_user_date(conn: Connection) -> None:
+    _create_index(conn, "ix_session_user_date_id", "session", "user_id, date DESC, id DESC")
+
+
+@migration(3, "sessionitem (session_id, order_index)")
+def _ix_sessionitem_order(conn: Connection) -> None:
+    _create_index(conn, "ix_sessionitem_session_order", "sessionitem", "session_id, order_index")
+
+
+@migration(4, "workoutitem (workout_template_id, order_index, id)")
+def _ix_workoutitem_order(conn: Connection) -> None:
+    _create_index(
+        conn,
+        "ix_workoutitem_template_order_id",
+        "workoutitem",
+        "workout_template_id, order_index, id",
+    )
+
+
+@migration(5, "exercise (user_id, lower(name))")
+def _ix_exercise_user_lower_name(conn: Connection) -> None:
+    _create_index(conn, "ix_exercise_user_lower_name", "exercise", "user_id, lower(name)")
+
+
+def _create_fts_index(conn: Connection, tbl: str) -> None:
+    fts = f"{tbl}_fts"
+    conn.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"name, content='{tbl}', content_rowid='id', tokenize='trigram')"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tbl} BEGIN "
+        f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tbl} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF name ON {tbl} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); "
+        f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END"
+    )
+    # Index the rows that already exist.
+    conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _create_trgm_index(conn: Connection, tbl: str) -> None:
+    conn.exec_driver_sql(
+        f"CREATE INDEX IF NOT EXISTS ix_{tbl}_name_trgm "
+        f"ON {tbl} USING gin (lower(name) gin_trgm_ops)"
+    )
+
+
+def _create_trgm_extension(conn: Connection) -> bool:
+    """CREATE EXTENSION pg_trgm; False (and a warning) where it is not allowed.
+
+    Managed servers (Azure Database for PostgreSQL) refuse it unless the
+    extension is allow-listed in `azure.extensions` and the role may create
+    it. The savepoint keeps the failure from aborting the migration.
+    """
+    try:
+        with conn.begin_nested():
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DBAPIError as e:
+        logger.warning(
+            "pg_trgm unavailable (%s); name search is not indexed and uses LIKE. "
+            "Allow-list pg_trgm (azure.extensions on Azure), run CREATE EXTENSION "
+            "pg_trgm and create the ix_*_name_trgm indexes by hand.",
+            e.orig,
+        )
+        return False
+    return True
+
+
+@migration(6, "name search: FTS5 trigram (SQLite) / pg_trgm (PostgreSQL)")
+def _name_search(conn: Connection) -> None:
+    from .services.search import SEARCHED_TABLES, sqlite_trigram_available
+
+    trgm = conn.dialect.name == "postgresql" and _create_trgm_extension(conn)
+    for tbl in SEARCHED_TABLES:
+        if conn.dialect.name == "sqlite" and sqlite_trigram_available():
+            _create_fts_index(conn, tbl)
+        elif conn.dialect.name == "postgresql" and trgm:
+            _create_trgm_index(conn, tbl)
+
+
+@migration(7, "exercise.name_norm + unique (user_id, name_norm)")
+def _exercise_name_norm(conn: Connection) -> None:
+    from .services.common import name_key
+
+    if "name_norm" not in {c["name"] for c in inspect(conn).get_columns("exercise")}:
+        conn.exec_driver_sql("ALTER TABLE exercise ADD COLUMN name_norm VARCHAR")
+
+    # Backfill. Rows that already collide with an earlier row of the same user
+    # (older duplicates created by the select-then-insert race) keep NULL,
+    # which the unique index allows; they are logged so they can be merged.
+    seen = set()
+    rows = conn.exec_driver_sql(
+        "SELECT id, user_id, name, name_norm FROM exercise ORDER BY id"
+    ).all()
+    updates = []
+    for ex_id, user_id, name, current in rows:
+        key = name_key(name)
+        if (user_id, key) in seen:
+            logger.warning(
+                "exercise %s duplicates an earlier name of user %s; name_norm left NULL",
+                ex_id,
+                user_id,
+            )
+            key = None
+        else:
+            seen.add((user_id, key))
+        if key != current:
+            updates.append({"id": ex_id, "name_norm": key})
+    if updates:
+        conn.execute(
+            text("UPDATE exercise SET name_norm = :name_norm WHERE id = :id"), updates
+        )
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_exercise_user_name_norm "
+        "ON exercise (user_id, name_norm)"
+    )
+
+
+@migration(8, "collectionversion (per-user collection stamps for ETags)")
+def _collection_version(conn: Connection) -> None:
+    from .models import CollectionVersion
+
+    CollectionVersion.__table__.create(conn, checkfirst=True)  # type: ignore[attr-defined]
+
+
+# ---------- Runner ----------
+def head_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to `target` (default: latest); return versions applied."""
+    target = head_version() if target is None else target
+    with engine.begin() as conn:
+        _meta.create_all(conn)
+        current = current_version(conn)
+
+    applied: List[int] = []
+    for m in MIGRATIONS:
+        if m.version <= current or m.version > target:
+            continue
+        with engine.begin() as conn:
+            m.apply(conn)
+            conn.execute(
+                schema_version.insert().values(
+                    version=m.version,
+                    description=m.description,
+                    applied_at=dt.datetime.now(dt.timezone.utc),
+                )
+            )
+        applied.append(m.version)
+    return applied
+
+
+def check_schema(engine: Engine) -> int:
+    """Raise SchemaOutOfDate unless every migration has been applied."""
+    with engine.connect() as conn:
+        current = current_version(conn)
+    if current < head_version():
+        raise SchemaOutOfDate(
+            f"Database schema is at version {current}, expected {head_version()}. "
+            "Run `python -m app.migrations upgrade`."
+        )
+    return current
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    sub = parser.add_subparsers(dest="command", required=True)
+    up = sub.add_parser("upgrade", help="apply pending migrations")
+    up.add_argument("--to", type=int, default=None, help="target version")
+    sub.add_parser("current", help="print applied and latest versions")
+    args = parser.parse_args(argv)
+
+    from .db import engine
+
+    if args.command == "upgrade":
+        applied = upgrade(engine, args.to)
+        for m in MIGRATIONS:
+            if m.version in applied:
+                print(f"applied {m.version}: {m.description}")
+        if not applied:
+            print("schema already up to date")
+    else:
+        with engine.connect() as conn:
+            print(f"current={current_version(conn)} head={head_version()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,8 @@ class Exercise(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id", index=True)
     name: str = Field(index=True)
+    # normalize_whitespace(name).casefold(); unique per user (migration 7)
+    name_norm: Optional[str] = None
     category: Category = Field(default=Category.strength)
     default_unit: Optional[str] = None
     equipment: Optional[str] = None
@@ -147,3 +149,15 @@ class SessionCardio(SQLModel, table=True):
     distance_unit: Optional[str] = None
     avg_hr: Optional[int] = None
     avg_pace: Optional[str] = None
+
+
+# ---------- Conditional GET ----------
+class CollectionVersion(SQLModel, table=True):
+    """
+    Per-user version of a collection ("exercises", "workouts", "sessions"),
+    bumped in the same transaction as every write to it (services/stamps.py).
+    """
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    collection: str = Field(primary_key=True)
+    version: int = Field(default=0)
@@ -0,0 +1,44 @@
+"""Keyset (cursor) pagination.
+
+List endpoints return one page as a plain JSON list; when more rows may
+follow, the response carries an `X-Next-Cursor` header. Passing it back as
+`?cursor=` returns the next page. The cursor is opaque to clients (URL-safe
+base64 of a small JSON object) and holds the sort key of the last row
+returned, so the next page is a `WHERE key < last` index range instead of
+an OFFSET that has to skip every earlier row.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+CURSOR_DESCRIPTION = "X-Next-Cursor of the previous page"
+
+
+def encode_cursor(key: dict) -> str:
+    raw = json.dumps(key, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, **fields: Callable[[Any], Any]) -> dict:
+    """Decode a cursor into `{field: convert(value)}` for each keyword
+    `field=convert`; 400 if it is malformed or a field is missing."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return {name: convert(key[name]) for name, convert in fields.items()}
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_cursor(
+    rows: Sequence[Any], limit: int, key: Callable[[Any], dict]
+) -> Optional[str]:
+    """Cursor for the page after `rows`, or None if this was the last page."""
+    if len(rows) < limit:
+        return None
+    return encode_cursor(key(rows[-1]))
@@ -0,0 +1,239 @@
+"""Password hashing off the request threadpool.
+
+argon2 is deliberately slow and memory hungry. Running it inline in sync
+handlers lets a burst of logins occupy every threadpool worker, so the
+auth endpoints await `hash_password` / `verify_password` instead, which
+run in a small process pool. At most PASSWORD_QUEUE_LIMIT hashes may be
+running or waiting; beyond that `HashQueueFull` is raised and the endpoint
+answers 503 with Retry-After instead of queueing without bound.
+
+PASSWORD_WORKERS=0 hashes in the threadpool (useful for tests/debugging).
+
+argon2 costs come from ARGON2_MEMORY_COST (KiB), ARGON2_TIME_COST and
+ARGON2_PARALLELISM. Hashes made with other costs still verify; login
+rehashes them (`verify_and_update`). To pick costs for this machine:
+
+    python -m app.passwords calibrate --target-ms 250
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+
+from .metrics import PASSWORD_HASH_QUEUE_DEPTH, PASSWORD_HASH_REJECTED, PASSWORD_HASH_SECONDS
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+T = TypeVar("T")
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", max(1, PASSWORD_WORKERS) * 8))
+RETRY_AFTER_SECONDS = 1
+
+
+def argon2_settings() -> dict:
+    """CryptContext argon2 options from env; unset values keep passlib's defaults."""
+    settings = {}
+    for env, key in (
+        ("ARGON2_MEMORY_COST", "argon2__memory_cost"),
+        ("ARGON2_TIME_COST", "argon2__time_cost"),
+        ("ARGON2_PARALLELISM", "argon2__parallelism"),
+    ):
+        value = os.getenv(env)
+        if value:
+            settings[key] = int(value)
+    return settings
+
+
+@functools.lru_cache(maxsize=None)
+def password_context() -> CryptContext:
+    """The app's CryptContext, built on first use (passlib is slow to import)."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["argon2"], deprecated="auto", **argon2_settings())
+
+
+class HashQueueFull(RuntimeError):
+    pass
+
+
+# ---------- Worker functions (run in the pool processes) ----------
+def _hash(password: str) -> str:
+    return password_context().hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return password_context().verify(password, hashed)
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return password_context().verify_and_update(password, hashed)
+
+
+# ---------- Pool ----------
+_pool: Optional[Executor] = None
+_pool_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _executor() -> Optional[Executor]:
+    global _pool
+    if PASSWORD_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that already runs threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _acquire() -> None:
+    global _pending
+    with _pending_lock:
+        if _pending >= PASSWORD_QUEUE_LIMIT:
+            PASSWORD_HASH_REJECTED.inc()
+            raise HashQueueFull("Too many password operations in progress")
+        _pending += 1
+        PASSWORD_HASH_QUEUE_DEPTH.set(_pending)
+
+
+def _release() -> None:
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+        PASSWORD_HASH_QUEUE_DEPTH.set(_pending)
+
+
+async def _run(op: str, fn: Callable[..., T], *args) -> T:
+    _acquire()
+    start = time.perf_counter()
+    try:
+        pool = _executor()
+        if pool is None:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    finally:
+        PASSWORD_HASH_SECONDS.labels(op=op).observe(time.perf_counter() - start)
+        _release()
+
+
+async def hash_password(password: str) -> str:
+    return await _run("hash", _hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await _run("verify", _verify, password, hashed)
+
+
+async def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when `hashed` uses outdated costs."""
+    return await _run("verify", _verify_and_update, password, hashed)
+
+
+# ---------- Calibration ----------
+def _time_hash(memory_cost: int, time_cost: int, parallelism: int, samples: int) -> float:
+    from passlib.hash import argon2
+
+    handler = argon2.using(
+        memory_cost=memory_cost, time_cost=time_cost, parallelism=parallelism
+    )
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        handler.hash("calibration-password")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def calibrate(
+    target_ms: float,
+    memory_costs: List[int],
+    parallelisms: List[int],
+    max_time_cost: int = 10,
+    samples: int = 3,
+) -> Tuple[List[dict], Optional[dict]]:
+    """Measure hash time over a grid of costs on this machine.
+
+    Returns every measurement plus the strongest setting (most memory x
+    passes) whose median hash time stays within `target_ms`.
+    """
+    results: List[dict] = []
+    for parallelism in parallelisms:
+        for memory_cost in memory_costs:
+            for time_cost in range(1, max_time_cost + 1):
+                ms = _time_hash(memory_cost, time_cost, parallelism, samples)
+                results.append(
+                    {"memory_cost": memory_cost, "time_cost": time_cost,
+                     "parallelism": parallelism, "ms": round(ms, 1)}
+                )
+                if ms > target_ms:
+                    break
+    fitting = [r for r in results if r["ms"] <= target_ms]
+    best = max(
+        fitting,
+        key=lambda r: (r["memory_cost"] * r["time_cost"], r["memory_cost"], -r["ms"]),
+        default=None,
+    )
+    return results, best
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.passwords")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cal = sub.add_parser("calibrate", help="measure argon2 costs on this machine")
+    cal.add_argument("--target-ms", type=float, default=250.0, help="hash time budget")
+    cal.add_argument(
+        "--memory", type=int, nargs="+", default=[19456, 32768, 65536, 131072],
+        help="memory_cost candidates in KiB",
+    )
+    cal.add_argument(
+        "--parallelism", type=int, nargs="+",
+        default=sorted({1, min(4, os.cpu_count() or 1)}),
+    )
+    cal.add_argument("--max-time-cost", type=int, default=10)
+    cal.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results, best = calibrate(
+        args.target_ms, args.memory, args.parallelism, args.max_time_cost, args.samples
+    )
+    print(f"{'memory_cost':>12} {'time_cost':>10} {'parallelism':>12} {'ms':>9}")
+    for r in results:
+        print(
+            f"{r['memory_cost']:>12} {r['time_cost']:>10} {r['parallelism']:>12} {r['ms']:>9}"
+        )
+    if best is None:
+        print(f"\nNo setting hashes within {args.target_ms}ms; lower --memory or raise the target.")
+        return
+    print(f"\nStrongest setting within {args.target_ms}ms ({best['ms']}ms):")
+    print(f"ARGON2_MEMORY_COST={best['memory_cost']}")
+    print(f"ARGON2_TIME_COST={best['time_cost']}")
+    print(f"ARGON2_PARALLELISM={best['parallelism']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""On-demand sampling profiler.
+
+A background thread samples the Python stacks of all threads every
+PROFILER_INTERVAL_MS and counts identical stacks. The result is written to
+PROFILE_DIR in collapsed-stack format (`frame;frame;frame count` per line),
+which speedscope (https://www.speedscope.app), flamegraph.pl and inferno
+open directly.
+
+Two ways to start it, both requiring debug access (see
+`app.auth.debug_access_allowed`):
+
+- a time window: `POST /__debug/profile?seconds=10` samples whatever the
+  process is doing for that long;
+- a single request: send `X-Profile: 1`. `ProfilerMiddleware` is only
+  installed when PROFILER_ENABLED=true, so there is no per-request cost
+  otherwise. Other requests running at the same time show up too.
+
+Nothing runs while no profile is being taken.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .auth import debug_access_allowed
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL_MS", 5)) / 1000
+MAX_WINDOW_SECONDS = 120
+
+# Leaf frames in these stdlib modules are idle threads (pool workers waiting
+# for work, the event loop waiting on sockets), not work.
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+_SAFE_LABEL = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or Path(code.co_filename).stem
+    return f"{module}:{code.co_name}"
+
+
+def _is_idle(frame) -> bool:
+    return frame.f_code.co_filename.endswith(_IDLE_MODULES)
+
+
+class Sampler:
+    """Counts collapsed stacks of every thread except its own."""
+
+    def __init__(self, interval: float = PROFILER_INTERVAL) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> "Sampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for tid, frame in sys._current_frames().items():
+                if tid == own or _is_idle(frame):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(labels))] += 1
+
+
+_active_lock = threading.Lock()
+
+
+def _claim() -> None:
+    if not _active_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being taken")
+
+
+def profile_name(label: str) -> str:
+    safe = _SAFE_LABEL.sub("_", label).strip("_")[:80] or "profile"
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{safe}.collapsed"
+
+
+def write_profile(stacks: Counter, name: str) -> None:
+    """Write collapsed stacks to PROFILE_DIR/name, heaviest stacks first."""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(PROFILE_DIR / name, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def profile_window(seconds: float) -> str:
+    """Sample for `seconds` in the background; return the file name the
+    profile will be written to. Raises ProfilerBusy if one is running."""
+    seconds = max(0.1, min(seconds, MAX_WINDOW_SECONDS))
+    _claim()
+    name = profile_name(f"window-{seconds:g}s")
+    try:
+        sampler = Sampler().start()
+    except BaseException:
+        _active_lock.release()
+        raise
+
+    def finish() -> None:
+        try:
+            time.sleep(seconds)
+            write_profile(sampler.stop(), name)
+        finally:
+            _active_lock.release()
+
+    threading.Thread(target=finish, name="profiler-window", daemon=True).start()
+    return name
+
+
+def list_profiles() -> List[dict]:
+    if not PROFILE_DIR.is_dir():
+        return []
+    stats = [(p.name, p.stat()) for p in PROFILE_DIR.glob("*.collapsed")]
+    stats.sort(key=lambda item: item[1].st_mtime, reverse=True)
+    return [{"name": n, "bytes": st.st_size, "modified": st.st_mtime} for n, st in stats]
+
+
+def profile_path(name: str) -> Optional[Path]:
+    """Path of a profile file, or None if `name` is not one of ours."""
+    if "/" in name or "\\" in name or not name.endswith(".collapsed"):
+        return None
+    path = PROFILE_DIR / name
+    return path if path.is_file() else None
+
+
+def _finish(sampler: Sampler, name: str) -> None:
+    write_profile(sampler.stop(), name)
+
+
+class ProfilerMiddleware:
+    """Profile a single request sent with `X-Profile: 1` (debug access only).
+
+    The response gets `X-Profile-File: <name>`; fetch it from
+    `/__debug/profiles/<name>`.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if headers.get("x-profile") != "1":
+            await self.app(scope, receive, send)
+            return
+        if not debug_access_allowed(headers):
+            await self.app(scope, receive, send)
+            return
+        try:
+            _claim()
+        except ProfilerBusy:
+            await self.app(scope, receive, send)
+            return
+
+        name = profile_name(f"{scope['method']}{scope['path']}")
+        sampler = Sampler().start()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"x-profile-file", name.encode()),
+                    ],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            try:
+                # Joining the sampler and writing the file block; keep them
+                # off the event loop so other requests are not stalled.
+                await anyio.to_thread.run_sync(_finish, sampler, name)
+            finally:
+                _active_lock.release()
@@ -0,0 +1,279 @@
+"""SQL instrumentation: per-request statistics, N+1 detection, slow-query log.
+
+`start_request()` opens a stats scope for the current request (a context
+variable, so it follows the request into the threadpool); engine cursor
+events then count every statement and its duration until
+`finish_request()` closes the scope.
+
+Statements slower than SQL_SLOW_MS are logged as JSON with their
+bound-parameter shape, the calling service function and the query plan,
+and kept in a ring buffer served by `/__debug/slow-queries`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar, Token
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import tracing
+from .db import ENVIRONMENT
+
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("app.sql.slow")
+
+NPLUSONE_THRESHOLD = int(os.getenv("SQL_NPLUSONE_THRESHOLD", 10))
+NPLUSONE_WARN = os.getenv(
+    "SQL_NPLUSONE_WARN", "true" if ENVIRONMENT != "production" else "false"
+).lower() in ("1", "true", "yes", "on")
+
+SLOW_QUERY_SECONDS = float(os.getenv("SQL_SLOW_MS", 250)) / 1000
+SLOW_QUERY_EXPLAIN = os.getenv("SQL_SLOW_EXPLAIN", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+    "on",
+)
+SLOW_QUERY_BUFFER = int(os.getenv("SQL_SLOW_BUFFER", 500))
+
+_IN_LIST_RE = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_WS_RE = re.compile(r"\s+")
+
+
+def statement_shape(sql: str) -> str:
+    """Normalize SQL so repeats of the same query compare equal."""
+    shape = _WS_RE.sub(" ", sql).strip()
+    shape = _IN_LIST_RE.sub("(?...)", shape)
+    return _NUMBER_RE.sub("N", shape)
+
+
+class RequestQueryStats:
+    __slots__ = ("statements", "db_time", "shapes")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.db_time = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.statements += 1
+        self.db_time += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [(s, n) for s, n in self.shapes.most_common() if n > threshold]
+
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar(
+    "request_query_stats", default=None
+)
+
+
+def current_stats() -> Optional[RequestQueryStats]:
+    return _current.get()
+
+
+def start_request() -> Token:
+    return _current.set(RequestQueryStats())
+
+
+def finish_request(token: Token, route: str) -> RequestQueryStats:
+    stats = _current.get()
+    _current.reset(token)
+    assert stats is not None
+    if NPLUSONE_WARN:
+        for shape, count in stats.repeated(NPLUSONE_THRESHOLD):
+            logger.warning(
+                "Possible N+1 on %s: statement ran %d times in one request: %s",
+                route,
+                count,
+                shape[:300],
+            )
+    return stats
+
+
+# ---------- Slow-query log ----------
+_slow_lock = threading.Lock()  # guards _slow_entries and _plans
+_slow_entries: deque[dict] = deque(maxlen=SLOW_QUERY_BUFFER)
+_plans: dict[str, Optional[list[str]]] = {}
+
+
+def param_shape(parameters: Any, executemany: bool) -> Any:
+    """Types of the bound parameters, never their values."""
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return {"executemany": len(parameters), "row": param_shape(parameters[0], False)}
+    if isinstance(parameters, dict):
+        return {k: type(v).__name__ for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(v).__name__ for v in parameters]
+    return None
+
+
+def calling_function() -> Optional[str]:
+    """Nearest app function on the stack, e.g. `exercises_service.list_exercises`."""
+    frame = sys._getframe(1)
+    fallback = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.services"):
+            return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        if fallback is None and module.startswith("app.") and module != __name__:
+            fallback = f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback
+
+
+def _savepoint(conn):
+    """A SAVEPOINT for the EXPLAIN when `conn` is inside a transaction.
+
+    On PostgreSQL a failed statement aborts the whole transaction, so the
+    EXPLAIN must not fail in the caller's; rolling back to the savepoint
+    leaves it as it was. pysqlite begins transactions lazily, and a
+    SAVEPOINT outside one would start a transaction of its own.
+    """
+    if not conn.in_transaction():
+        return None
+    if not getattr(conn.connection.dbapi_connection, "in_transaction", True):
+        return None
+    return conn.begin_nested()
+
+
+def explain(conn, statement: str, parameters: Any) -> Optional[list[str]]:
+    """EXPLAIN QUERY PLAN (SQLite) / EXPLAIN (PostgreSQL) for a SELECT.
+
+    Runs on the caller's connection, in a savepoint that is always rolled
+    back. Failures are logged and returned as the plan; never raised.
+    """
+    if not statement.lstrip()[:6].upper().startswith(("SELECT", "WITH")):
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    conn.info["explaining"] = True
+    savepoint = None
+    try:
+        savepoint = _savepoint(conn)
+        rows = conn.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+    except Exception as exc:  # the plan is best-effort diagnostics
+        logger.warning("EXPLAIN of slow query failed: %s: %s", type(exc).__name__, exc)
+        return [f"EXPLAIN failed: {type(exc).__name__}: {exc}"]
+    finally:
+        if savepoint is not None:
+            try:
+                savepoint.rollback()
+            except Exception:
+                logger.exception("rolling back the EXPLAIN savepoint failed")
+        conn.info["explaining"] = False
+    return [str(row[-1]) for row in rows]
+
+
+def _record_slow(conn, statement, parameters, executemany, elapsed) -> None:
+    shape = statement_shape(statement)
+    with _slow_lock:
+        known = shape in _plans
+        plan = _plans.get(shape)
+    if not known:
+        # EXPLAIN outside the lock; two threads may both explain a new shape.
+        plan = (
+            explain(conn, statement, parameters)
+            if SLOW_QUERY_EXPLAIN and not executemany
+            else None
+        )
+        with _slow_lock:
+            if len(_plans) >= 1000:
+                _plans.clear()
+            _plans[shape] = plan
+    entry = {
+        "duration_ms": round(elapsed * 1000, 3),
+        "statement": shape,
+        "params": param_shape(parameters, executemany),
+        "caller": calling_function(),
+        "plan": plan,
+        "at": time.time(),
+    }
+    with _slow_lock:
+        _slow_entries.append(entry)
+    slow_logger.warning(json.dumps({"event": "slow_query", **entry}, default=str))
+
+
+def slow_queries(k: int = 20) -> list[dict]:
+    """Top-k slowest statement shapes currently in the ring buffer."""
+    with _slow_lock:
+        entries = list(_slow_entries)
+    by_shape: dict[str, dict] = {}
+    for e in entries:
+        agg = by_shape.setdefault(
+            e["statement"],
+            {
+                "statement": e["statement"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "callers": set(),
+                "params": e["params"],
+                "plan": e["plan"],
+            },
+        )
+        agg["count"] += 1
+        agg["total_ms"] += e["duration_ms"]
+        agg["max_ms"] = max(agg["max_ms"], e["duration_ms"])
+        if e["caller"]:
+            agg["callers"].add(e["caller"])
+    top = sorted(by_shape.values(), key=lambda a: a["max_ms"], reverse=True)[:k]
+    for agg in top:
+        agg["avg_ms"] = round(agg["total_ms"] / agg["count"], 3)
+        agg["total_ms"] = round(agg["total_ms"], 3)
+        agg["callers"] = sorted(agg["callers"])
+    return top
+
+
+def clear_slow_queries() -> None:
+    with _slow_lock:
+        _slow_entries.clear()
+        _plans.clear()
+
+
+# ---------- Engine hooks ----------
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not conn.info.get("explaining"):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if conn.info.get("explaining") or not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if tracing.ENABLED and tracing.current_span() is not None:
+        tracing.record_span(
+            "sql",
+            elapsed,
+            **{"db.system": conn.dialect.name, "db.statement": statement_shape(statement)[:1000]},
+        )
+    if SLOW_QUERY_SECONDS > 0 and elapsed >= SLOW_QUERY_SECONDS:
+        _record_slow(conn, statement, parameters, executemany, elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    conn = context.connection
+    if conn is None or conn.info.get("explaining"):
+        return
+    starts = conn.info.get("query_start")
+    if starts:
+        starts.pop()
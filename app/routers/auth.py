@@ -1,17 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from pydantic import BaseModel, EmailStr, Field
 from sqlmodel import Session as DBSession, select
+from starlette.concurrency import run_in_threadpool
 
 from ..db import get_session
 from ..models import User
 from ..auth import (
-    hash_pw,
-    verify_pw,
+    CurrentUser,
     make_token,
     get_current_user,
+    invalidate_token,
     ACCESS_COOKIE,
     JWT_TTL,
 )
+from ..passwords import (
+    RETRY_AFTER_SECONDS,
+    HashQueueFull,
+    hash_password,
+    verify_and_update,
+)
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -31,25 +38,67 @@ class MeOut(BaseModel):
     email: EmailStr
 
 
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many sign-in attempts in progress, retry shortly",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+def _user_by_email(db: DBSession, email: str) -> User | None:
+    """Look the user up and end the transaction, so the session's pooled
+    connection (the single writer under SQLITE_PRODUCTION) is not held while
+    the caller awaits argon2. The row is detached with its attributes loaded;
+    `_save` re-attaches it."""
+    try:
+        u = db.exec(select(User).where(User.email == email)).first()
+        if u is not None:
+            db.expunge(u)
+        return u
+    finally:
+        db.rollback()
+
+
+def _save(db: DBSession, u: User) -> User:
+    db.add(u)
+    db.commit()
+    db.refresh(u)
+    return u
+
+
+# async handlers: argon2 runs in app.passwords' process pool and DB calls in
+# the threadpool, so a login burst cannot occupy every threadpool worker. No
+# DB connection is checked out while a hash is awaited.
 @router.post("/register", response_model=MeOut, status_code=201)
-def register(payload: RegisterIn, db: DBSession = Depends(get_session)):
+async def register(payload: RegisterIn, db: DBSession = Depends(get_session)):
     email = payload.email.lower()
-    exists = db.exec(select(User).where(User.email == email)).first()
+    exists = await run_in_threadpool(_user_by_email, db, email)
     if exists:
         raise HTTPException(status_code=409, detail="Email already registered")
-    u = User(email=email, password_hash=hash_pw(payload.password))
-    db.add(u)
-    db.commit()
-    db.refresh(u)
+    try:
+        password_hash = await hash_password(payload.password)
+    except HashQueueFull:
+        raise _busy()
+    u = await run_in_threadpool(_save, db, User(email=email, password_hash=password_hash))
     return MeOut(id=u.id, email=u.email)
 
 
 @router.post("/login", response_model=MeOut)
-def login(payload: LoginIn, response: Response, db: DBSession = Depends(get_session)):
+async def login(payload: LoginIn, response: Response, db: DBSession = Depends(get_session)):
     email = payload.email.lower()
-    u = db.exec(select(User).where(User.email == email)).first()
-    if not u or not verify_pw(payload.password, u.password_hash):
+    u = await run_in_threadpool(_user_by_email, db, email)
+    if u is None:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        ok, new_hash = await verify_and_update(payload.password, u.password_hash)
+    except HashQueueFull:
+        raise _busy()
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:  # stored hash predates the current ARGON2_* costs
+        u.password_hash = new_hash
+        u = await run_in_threadpool(_save, db, u)
 
     token = make_token(u.id)
     response.set_cookie(
@@ -65,13 +114,14 @@ def login(payload: LoginIn, response: Response, db: DBSession = Depends(get_sess
 
 
 @router.post("/logout", status_code=204)
-def logout(response: Response):
+def logout(request: Request, response: Response):
+    invalidate_token(request.cookies.get(ACCESS_COOKIE))
     response.delete_cookie(key=ACCESS_COOKIE, path="/")
     return
 
 
 @router.get("/me", response_model=MeOut)
-def me(user: User | None = Depends(get_current_user)):
+def me(user: CurrentUser | None = Depends(get_current_user)):
     if user is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
     return MeOut(id=user.id, email=user.email)
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from ..auth import require_debug_access
+from ..profiler import (
+    MAX_WINDOW_SECONDS,
+    ProfilerBusy,
+    list_profiles,
+    profile_path,
+    profile_window,
+)
+from ..query_monitor import slow_queries
+
+router = APIRouter(
+    prefix="/__debug",
+    tags=["debug"],
+    dependencies=[Depends(require_debug_access)],
+    include_in_schema=False,
+)
+
+
+@router.get("/slow-queries")
+def debug_slow_queries(k: int = 20):
+    """Slowest statement shapes seen recently (ring buffer, SQL_SLOW_MS)."""
+    return slow_queries(max(1, min(k, 200)))
+
+
+@router.post("/profile", status_code=202)
+def start_profile(seconds: float = Query(10, gt=0, le=MAX_WINDOW_SECONDS)):
+    """Sample every thread for `seconds`; the file appears in /__debug/profiles."""
+    try:
+        name = profile_window(seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"name": name, "seconds": seconds}
+
+
+@router.get("/profiles")
+def get_profiles():
+    return list_profiles()
+
+
+@router.get("/profiles/{name}")
+def get_profile(name: str):
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
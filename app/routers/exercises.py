@@ -1,51 +1,123 @@
-from typing import List, Optional
+import datetime as dt
+from typing import List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, Query
 from sqlmodel import Session as DBSession
+from sqlmodel.ext.asyncio.session import AsyncSession as AsyncDBSession
 
 
-from ..db import get_session
-from ..auth import get_current_user
-from ..models import Category, User
+from ..db import ASYNC_DB, get_async_session, get_read_session, get_session
+from ..auth import CurrentUser, get_current_user, get_current_user_async
+from ..conditional import etag_for, etag_for_async
+from ..models import Category
+from ..pagination import CURSOR_DESCRIPTION, decode_cursor, next_cursor
+from ..responses import list_response
 
 
 from ..schemas import ExerciseCreate, ExerciseRead, ExerciseUpdate
 from ..services import exercises_service as svc
+from ..services.stamps import EXERCISES
+from ..services.search import is_ranked
 
 
 router = APIRouter(prefix="/api/exercises", tags=["exercises"])
 
 
+def _page_start(
+    cursor: Optional[str], q: Optional[str], offset: int
+) -> Tuple[Optional[int], int]:
+    """(after_id, offset) of the requested page. Newest-first pages are keyed
+    by id; relevance-ranked search results are paged by offset."""
+    if cursor is None:
+        return None, offset
+    if is_ranked(q):
+        return None, decode_cursor(cursor, offset=int)["offset"]
+    return decode_cursor(cursor, id=int)["id"], 0
+
+
+def _next_cursor(rows, limit: int, q: Optional[str], offset: int) -> Optional[str]:
+    if is_ranked(q):
+        return next_cursor(rows, limit, lambda _: {"offset": offset + limit})
+    return next_cursor(rows, limit, lambda ex: {"id": ex.id})
+
+
 @router.post("", response_model=ExerciseRead, status_code=201)
 def create_exercise(
     payload: ExerciseCreate,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.create_exercise(db=db, user_id=user.id, payload=payload)
 
 
-@router.get("", response_model=List[ExerciseRead])
-def list_exercises(
-    db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
-    q: Optional[str] = Query(
-        None, description="Substring name match (case-insensitive)"
-    ),
-    category: Optional[Category] = Query(None, description="Category filter"),
-    limit: int = Query(100, ge=1, le=200),
-    offset: int = Query(0, ge=0),
-):
-    return svc.list_exercises(
-        db=db, user_id=user.id, q=q, category=category, limit=limit, offset=offset
-    )
-
-
-@router.get("/{exercise_id}", response_model=ExerciseRead)
+if ASYNC_DB:
+
+    @router.get("", response_model=List[ExerciseRead])
+    async def list_exercises(
+        db: AsyncDBSession = Depends(get_async_session),
+        user: CurrentUser = Depends(get_current_user_async),
+        q: Optional[str] = Query(
+            None, description="Substring name match (case-insensitive)"
+        ),
+        category: Optional[Category] = Query(None, description="Category filter"),
+        limit: int = Query(100, ge=1, le=200),
+        offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        etag: Optional[str] = Depends(etag_for_async(EXERCISES)),
+    ):
+        after_id, offset = _page_start(cursor, q, offset)
+        rows = await svc.list_exercises_async(
+            db=db,
+            user_id=user.id,
+            q=q,
+            category=category,
+            limit=limit,
+            offset=offset,
+            after_id=after_id,
+        )
+        return list_response(
+            ExerciseRead, rows, _next_cursor(rows, limit, q, offset), etag=etag
+        )
+
+else:
+
+    @router.get("", response_model=List[ExerciseRead])
+    def list_exercises(
+        db: DBSession = Depends(get_read_session),
+        user: CurrentUser = Depends(get_current_user),
+        q: Optional[str] = Query(
+            None, description="Substring name match (case-insensitive)"
+        ),
+        category: Optional[Category] = Query(None, description="Category filter"),
+        limit: int = Query(100, ge=1, le=200),
+        offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        etag: Optional[str] = Depends(etag_for(EXERCISES)),
+    ):
+        after_id, offset = _page_start(cursor, q, offset)
+        rows = svc.list_exercises(
+            db=db,
+            user_id=user.id,
+            q=q,
+            category=category,
+            limit=limit,
+            offset=offset,
+            after_id=after_id,
+        )
+        return list_response(
+            ExerciseRead, rows, _next_cursor(rows, limit, q, offset), etag=etag
+        )
+
+
+@router.get(
+    "/{exercise_id}",
+    response_model=ExerciseRead,
+    dependencies=[Depends(etag_for(EXERCISES))],
+)
 def get_exercise(
     exercise_id: int,
-    db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    db: DBSession = Depends(get_read_session),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.get_exercise(db=db, user_id=user.id, exercise_id=exercise_id)
 
@@ -55,7 +127,7 @@ def update_exercise(
     exercise_id: int,
     payload: ExerciseUpdate,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.update_exercise(
         db=db, user_id=user.id, exercise_id=exercise_id, payload=payload
@@ -66,16 +138,45 @@ def update_exercise(
 def delete_exercise(
     exercise_id: int,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     svc.delete_exercise(db=db, user_id=user.id, exercise_id=exercise_id)
     return None
 
 
+def _usage_after(cursor: Optional[str], **fields):
+    if cursor is None:
+        return None
+    key = decode_cursor(cursor, **fields)
+    return tuple(key.values())
+
+
 @router.get("/{exercise_id}/usage")
 def get_exercise_usage(
     exercise_id: int,
-    db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    counts_only: bool = Query(False, description="Only the counts, no lists"),
+    limit: int = Query(svc.USAGE_PAGE_SIZE, ge=1, le=100),
+    workouts_cursor: Optional[str] = Query(None, description="next.workouts of the previous page"),
+    sessions_cursor: Optional[str] = Query(None, description="next.sessions of the previous page"),
+    db: DBSession = Depends(get_read_session),
+    user: CurrentUser = Depends(get_current_user),
 ):
-    return svc.get_exercise_usage(db=db, user_id=user.id, exercise_id=exercise_id)
+    usage = svc.get_exercise_usage(
+        db=db,
+        user_id=user.id,
+        exercise_id=exercise_id,
+        counts_only=counts_only,
+        limit=limit,
+        workouts_after=_usage_after(workouts_cursor, name=str, id=int),
+        sessions_after=_usage_after(sessions_cursor, date=dt.date.fromisoformat, id=int),
+    )
+    if not counts_only:
+        usage["next"] = {
+            "workouts": next_cursor(
+                usage["workouts"], limit, lambda w: {"name": w["name"], "id": w["id"]}
+            ),
+            "sessions": next_cursor(
+                usage["sessions"], limit, lambda s: {"date": s["date"], "id": s["id"]}
+            ),
+        }
+    return usage
@@ -1,14 +1,16 @@
+from typing import Any, List
+
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session as DBSession, select
-import httpx
 
 
 from ..db import get_session
-from ..auth import get_current_user
-from ..models import Exercise, Muscle, ExerciseMuscle, Category, User
-from ..services.adapters.wger import search_wger, browse_wger
-from ..schemas import ExerciseRead
+from ..auth import CurrentUser, get_current_user
+from ..models import Exercise, Muscle, ExerciseMuscle, Category
+from ..schemas import BulkImportResult, ExerciseRead
+from ..services import exercise_cache, imports_service, stamps
+from ..services.common import name_key
 
 
 router = APIRouter(prefix="/api/external", tags=["external"])
@@ -19,6 +21,27 @@ def ensure_owner(obj, user_id: int, what: str = "resource"):
         raise HTTPException(status_code=404, detail=f"{what} not found")
 
 
+# The WGER adapter (and httpx) load on first use, not at worker startup.
+async def search_wger(query: str, limit: int = 20) -> List[dict]:
+    from ..services.adapters import wger
+
+    return await wger.search_wger(query, limit=limit)
+
+
+async def browse_wger(limit: int = 20, offset: int = 0, muscle: str | None = None) -> List[dict]:
+    from ..services.adapters import wger
+
+    return await wger.browse_wger(limit=limit, offset=offset, muscle=muscle)
+
+
+def _adapter_error(e: Exception) -> HTTPException:
+    import httpx
+
+    if isinstance(e, httpx.HTTPError):
+        return HTTPException(status_code=502, detail=f"WGER HTTP error: {e!s}")
+    return HTTPException(status_code=500, detail=f"Adapter error: {type(e).__name__}: {e}")
+
+
 # IMPORTANT: these slugs must match muscles_map_wger() in the WGER adapter
 MUSCLES = [
     {"slug": "biceps", "label": "Biceps"},
@@ -65,12 +88,8 @@ async def external_browse(
 
     try:
         items = await browse_wger(limit=limit, offset=offset, muscle=muscle)
-    except httpx.HTTPError as e:
-        raise HTTPException(status_code=502, detail=f"WGER HTTP error: {e!s}")
     except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Adapter error: {type(e).__name__}: {e}"
-        )
+        raise _adapter_error(e)
 
     next_offset = offset + limit if len(items) == limit else None
     return {
@@ -92,19 +111,15 @@ async def external_search(
     try:
         results = await search_wger(q, limit=limit)
         return results
-    except httpx.HTTPError as e:
-        raise HTTPException(status_code=502, detail=f"WGER HTTP error: {e!s}")
     except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Adapter error: {type(e).__name__}: {e}"
-        )
+        raise _adapter_error(e)
 
 
 @router.post("/exercises/import", response_model=ExerciseRead, status_code=201)
 def import_exercise(
     payload: dict,
     session: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     """
     Accept a normalized object like:
@@ -135,28 +150,6 @@ def import_exercise(
         if dup:
             return dup
 
-    # Fallback: name (case-insensitive) per user
-    dup2 = session.exec(
-        select(Exercise).where(
-            Exercise.user_id == user.id,
-            func.lower(Exercise.name) == name.lower(),
-        )
-    ).first()
-    if dup2:
-        return dup2
-
-    # ----- Ensure muscles exist -----
-    muscles = payload.get("muscles") or {}
-    slugs = set((muscles.get("primary") or []) + (muscles.get("secondary") or []))
-    existing = {m.slug: m for m in session.exec(select(Muscle)).all()}
-    for slug in slugs:
-        if slug and slug not in existing:
-            m = Muscle(name=slug.replace("_", " ").title(), slug=slug)
-            session.add(m)
-            session.commit()
-            session.refresh(m)
-            existing[slug] = m
-
     # ----- Category enum validation -----
     raw_cat = payload.get("category") or "strength"
     try:
@@ -165,9 +158,12 @@ def import_exercise(
         raise HTTPException(status_code=400, detail=f"Invalid category '{raw_cat}'")
 
     # ----- Create exercise FOR THIS USER -----
+    # Name de-dupe (per user, normalized) is the unique index on
+    # (user_id, name_norm): insert, and on conflict return the existing row.
     ex = Exercise(
         user_id=user.id,
         name=name,
+        name_norm=name_key(name),
         category=cat,
         default_unit=payload.get("default_unit"),
         equipment=payload.get("equipment"),
@@ -175,8 +171,32 @@ def import_exercise(
         source_ref=src_ref,
     )
     session.add(ex)
-    session.commit()
-    session.refresh(ex)
+    try:
+        session.flush()
+    except IntegrityError:
+        session.rollback()
+        dup = session.exec(
+            select(Exercise).where(
+                Exercise.user_id == user.id,
+                Exercise.name_norm == name_key(name),
+            )
+        ).first()
+        if dup:
+            return dup
+        raise
+    stamps.bump(session, user.id, stamps.EXERCISES)
+
+    # ----- Ensure muscles exist -----
+    muscles = payload.get("muscles") or {}
+    slugs = set((muscles.get("primary") or []) + (muscles.get("secondary") or []))
+    existing = {m.slug: m for m in session.exec(select(Muscle)).all()}
+    for slug in slugs:
+        if slug and slug not in existing:
+            m = Muscle(name=slug.replace("_", " ").title(), slug=slug)
+            session.add(m)
+            session.commit()
+            session.refresh(m)
+            existing[slug] = m
 
     # ----- Link muscles to this exercise (dedupe by muscle) -----
     prim_slugs = set(muscles.get("primary") or [])
@@ -195,10 +215,26 @@ def import_exercise(
         added_ids.add(m.id)
         session.add(ExerciseMuscle(exercise_id=ex.id, muscle_id=m.id, role=role))  # type: ignore
     session.commit()
+    exercise_cache.invalidate(user.id)
 
     return ex
 
 
+@router.post("/exercises/import/bulk", response_model=BulkImportResult)
+def import_exercises_bulk(
+    payload: List[Any],
+    session: DBSession = Depends(get_session),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Import a list of the objects /exercises/import accepts (at most
+    BULK_IMPORT_MAX, default 500) in one transaction. Each item reports
+    `created`, `exists` (with the id of the user's existing exercise) or
+    `error` (with a detail); invalid items do not stop the others.
+    """
+    return imports_service.bulk_import(session, user.id, payload)
+
+
 @router.get("/ping")
 def ping():
     return {"ok": True}
@@ -1,13 +1,17 @@
+import datetime as dt
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
 from sqlmodel import Session as DBSession
+from sqlmodel.ext.asyncio.session import AsyncSession as AsyncDBSession
 
 
-from ..db import get_session
-from ..auth import get_current_user
-from ..models import User
+from ..db import ASYNC_DB, get_async_session, get_read_session, get_session
+from ..auth import CurrentUser, get_current_user, get_current_user_async
+from ..conditional import etag_for, etag_for_async
+from ..pagination import CURSOR_DESCRIPTION, decode_cursor, next_cursor
+from ..responses import list_response
 from ..schemas import (
     SessionCreate,
     SessionRead,
@@ -15,42 +19,93 @@ from ..schemas import (
     SessionItemRead,
 )
 from ..services import sessions_service as svc
+from ..services.stamps import EXERCISES, SESSIONS
 
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _after(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    key = decode_cursor(cursor, date=dt.date.fromisoformat, id=int)
+    return key["date"], key["id"]
+
+
+def _next_cursor(rows, limit: int) -> Optional[str]:
+    return next_cursor(rows, limit, lambda s: {"date": s.date.isoformat(), "id": s.id})
+
 
 @router.post("", response_model=SessionRead, status_code=201)
 def create_session(
     payload: SessionCreate,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.create_session(db=db, user_id=user.id, payload=payload)
 
 
-@router.get("", response_model=List[SessionRead])
-def list_sessions(
-    on_date: Optional[str] = Query(None, description="YYYY-MM-DD"),
-    start_date: Optional[str] = Query(None, description="YYYY-MM-DD"),
-    end_date: Optional[str] = Query(None, description="YYYY-MM-DD (inclusive)"),
-    db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
-):
-    return svc.list_sessions(
-        db=db,
-        user_id=user.id,
-        on_date=on_date,
-        start_date=start_date,
-        end_date=end_date,
-    )
-
-
-@router.get("/{session_id}", response_model=SessionRead)
+if ASYNC_DB:
+
+    @router.get("", response_model=List[SessionRead])
+    async def list_sessions(
+        on_date: Optional[str] = Query(None, description="YYYY-MM-DD"),
+        start_date: Optional[str] = Query(None, description="YYYY-MM-DD"),
+        end_date: Optional[str] = Query(None, description="YYYY-MM-DD (inclusive)"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        db: AsyncDBSession = Depends(get_async_session),
+        user: CurrentUser = Depends(get_current_user_async),
+        etag: Optional[str] = Depends(etag_for_async(SESSIONS)),
+    ):
+        rows = await svc.list_sessions_async(
+            db=db,
+            user_id=user.id,
+            on_date=on_date,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            after=_after(cursor),
+        )
+        return list_response(SessionRead, rows, _next_cursor(rows, limit), etag=etag)
+
+else:
+
+    @router.get("", response_model=List[SessionRead])
+    def list_sessions(
+        on_date: Optional[str] = Query(None, description="YYYY-MM-DD"),
+        start_date: Optional[str] = Query(None, description="YYYY-MM-DD"),
+        end_date: Optional[str] = Query(None, description="YYYY-MM-DD (inclusive)"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        db: DBSession = Depends(get_read_session),
+        user: CurrentUser = Depends(get_current_user),
+        etag: Optional[str] = Depends(etag_for(SESSIONS)),
+    ):
+        rows = svc.list_sessions(
+            db=db,
+            user_id=user.id,
+            on_date=on_date,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            after=_after(cursor),
+        )
+        return list_response(SessionRead, rows, _next_cursor(rows, limit), etag=etag)
+
+
+@router.get(
+    "/{session_id}",
+    response_model=SessionRead,
+    dependencies=[Depends(etag_for(SESSIONS))],
+)
 def read_session(
     session_id: int,
-    db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    db: DBSession = Depends(get_read_session),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.read_session(db=db, user_id=user.id, session_id=session_id)
 
@@ -60,18 +115,42 @@ def add_item(
     session_id: int,
     payload: SessionItemCreate,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.add_item(db=db, user_id=user.id, session_id=session_id, payload=payload)
 
 
-@router.get("/{session_id}/items", response_model=List[SessionItemRead])
-def list_items(
-    session_id: int,
-    db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
-):
-    return svc.list_items(db=db, user_id=user.id, session_id=session_id)
+if ASYNC_DB:
+
+    @router.get("/{session_id}/items", response_model=List[SessionItemRead])
+    async def list_items(
+        session_id: int,
+        db: AsyncDBSession = Depends(get_async_session),
+        user: CurrentUser = Depends(get_current_user_async),
+        # items carry exercise_name / exercise_category
+        etag: Optional[str] = Depends(etag_for_async(SESSIONS, EXERCISES)),
+    ):
+        return list_response(
+            SessionItemRead,
+            await svc.list_items_async(db=db, user_id=user.id, session_id=session_id),
+            etag=etag,
+        )
+
+else:
+
+    @router.get("/{session_id}/items", response_model=List[SessionItemRead])
+    def list_items(
+        session_id: int,
+        db: DBSession = Depends(get_read_session),
+        user: CurrentUser = Depends(get_current_user),
+        # items carry exercise_name / exercise_category
+        etag: Optional[str] = Depends(etag_for(SESSIONS, EXERCISES)),
+    ):
+        return list_response(
+            SessionItemRead,
+            svc.list_items(db=db, user_id=user.id, session_id=session_id),
+            etag=etag,
+        )
 
 
 class SessionItemUpdate(BaseModel):
@@ -85,7 +164,7 @@ def update_item(
     item_id: int,
     payload: SessionItemUpdate,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.update_item(
         db=db,
@@ -102,7 +181,7 @@ def delete_item(
     session_id: int,
     item_id: int,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     svc.delete_item(db=db, user_id=user.id, session_id=session_id, item_id=item_id)
     return None
@@ -112,7 +191,7 @@ def delete_item(
 def delete_session(
     session_id: int,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     svc.delete_session(db=db, user_id=user.id, session_id=session_id)
     return None
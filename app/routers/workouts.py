@@ -4,11 +4,13 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
 from sqlmodel import Session as DBSession
+from sqlmodel.ext.asyncio.session import AsyncSession as AsyncDBSession
 
 
-from ..db import get_session
-from ..auth import get_current_user
-from ..models import User
+from ..db import ASYNC_DB, get_async_session, get_read_session, get_session
+from ..auth import CurrentUser, get_current_user, get_current_user_async
+from ..conditional import etag_for, etag_for_async
+from ..responses import list_response
 from ..schemas import (
     WorkoutTemplateCreate,
     WorkoutTemplateRead,
@@ -17,35 +19,60 @@ from ..schemas import (
     SessionRead,
 )
 from ..services import workouts_service as svc
+from ..services.stamps import WORKOUTS
 
 
 router = APIRouter(prefix="/api/workouts", tags=["workouts"])
 
 
 # ---------- Templates ----------
-@router.get("", response_model=List[WorkoutTemplateRead])
-def list_templates(
-    db: DBSession = Depends(get_session),
-    q: Optional[str] = Query(None, description="Search by name (case-insensitive)"),
-    user: User = Depends(get_current_user),
-):
-    return svc.list_templates(db=db, user_id=user.id, q=q)
+if ASYNC_DB:
+
+    @router.get("", response_model=List[WorkoutTemplateRead])
+    async def list_templates(
+        db: AsyncDBSession = Depends(get_async_session),
+        q: Optional[str] = Query(None, description="Search by name (case-insensitive)"),
+        user: CurrentUser = Depends(get_current_user_async),
+        etag: Optional[str] = Depends(etag_for_async(WORKOUTS)),
+    ):
+        return list_response(
+            WorkoutTemplateRead,
+            await svc.list_templates_async(db=db, user_id=user.id, q=q),
+            etag=etag,
+        )
+
+else:
+
+    @router.get("", response_model=List[WorkoutTemplateRead])
+    def list_templates(
+        db: DBSession = Depends(get_read_session),
+        q: Optional[str] = Query(None, description="Search by name (case-insensitive)"),
+        user: CurrentUser = Depends(get_current_user),
+        etag: Optional[str] = Depends(etag_for(WORKOUTS)),
+    ):
+        return list_response(
+            WorkoutTemplateRead, svc.list_templates(db=db, user_id=user.id, q=q), etag=etag
+        )
 
 
 @router.post("", response_model=WorkoutTemplateRead, status_code=201)
 def create_template(
     payload: WorkoutTemplateCreate,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.create_template(db=db, user_id=user.id, payload=payload)
 
 
-@router.get("/{template_id}", response_model=WorkoutTemplateRead)
+@router.get(
+    "/{template_id}",
+    response_model=WorkoutTemplateRead,
+    dependencies=[Depends(etag_for(WORKOUTS))],
+)
 def get_template(
     template_id: int,
-    db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    db: DBSession = Depends(get_read_session),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.get_template(db=db, user_id=user.id, template_id=template_id)
 
@@ -54,20 +81,44 @@ def get_template(
 def delete_template(
     template_id: int,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     svc.delete_template(db=db, user_id=user.id, template_id=template_id)
     return None
 
 
 # ---------- Template Items ----------
-@router.get("/{template_id}/items", response_model=List[WorkoutItemRead])
-def list_template_items(
-    template_id: int,
-    db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
-):
-    return svc.list_template_items(db=db, user_id=user.id, template_id=template_id)
+if ASYNC_DB:
+
+    @router.get("/{template_id}/items", response_model=List[WorkoutItemRead])
+    async def list_template_items(
+        template_id: int,
+        db: AsyncDBSession = Depends(get_async_session),
+        user: CurrentUser = Depends(get_current_user_async),
+        etag: Optional[str] = Depends(etag_for_async(WORKOUTS)),
+    ):
+        return list_response(
+            WorkoutItemRead,
+            await svc.list_template_items_async(
+                db=db, user_id=user.id, template_id=template_id
+            ),
+            etag=etag,
+        )
+
+else:
+
+    @router.get("/{template_id}/items", response_model=List[WorkoutItemRead])
+    def list_template_items(
+        template_id: int,
+        db: DBSession = Depends(get_read_session),
+        user: CurrentUser = Depends(get_current_user),
+        etag: Optional[str] = Depends(etag_for(WORKOUTS)),
+    ):
+        return list_response(
+            WorkoutItemRead,
+            svc.list_template_items(db=db, user_id=user.id, template_id=template_id),
+            etag=etag,
+        )
 
 
 @router.post("/{template_id}/items", response_model=WorkoutItemRead, status_code=201)
@@ -75,7 +126,7 @@ def add_template_item(
     template_id: int,
     payload: WorkoutItemCreate,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.add_template_item(
         db=db, user_id=user.id, template_id=template_id, payload=payload
@@ -99,7 +150,7 @@ def update_template_item(
     item_id: int,
     payload: WorkoutItemUpdate,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.update_template_item(
         db=db, user_id=user.id, item_id=item_id, payload=payload
@@ -110,7 +161,7 @@ def update_template_item(
 def delete_template_item(
     item_id: int,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     svc.delete_template_item(db=db, user_id=user.id, item_id=item_id)
     return None
@@ -124,7 +175,7 @@ def make_session_from_template(
     title: Optional[str] = None,
     notes: Optional[str] = None,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.make_session_from_template(
         db=db,
@@ -140,8 +191,8 @@ def make_session_from_template(
 @router.get("/{template_id}/muscles")
 def get_template_muscles(
     template_id: int,
-    db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    db: DBSession = Depends(get_read_session),
+    user: CurrentUser = Depends(get_current_user),
 ):
     return svc.template_muscles(db=db, user_id=user.id, template_id=template_id)
 
@@ -150,7 +201,7 @@ def get_template_muscles(
 def resequence_template(
     template_id: int,
     db: DBSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     svc.resequence_template(db=db, user_id=user.id, template_id=template_id)
     return None
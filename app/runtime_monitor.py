@@ -0,0 +1,40 @@
+"""Background sampler for event-loop lag and AnyIO threadpool saturation.
+
+Every router is a sync `def`, so under load requests queue for a threadpool
+token long before CPU or the database look busy. `run()` is started from the
+app lifespan and every RUNTIME_MONITOR_INTERVAL seconds records:
+
+- how late `asyncio.sleep` woke up (event-loop lag);
+- threadpool tokens in use, tasks waiting for one and the pool size.
+
+Active DB sessions are counted where they are opened (app.db).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Optional
+
+from anyio import to_thread
+
+from .metrics import EVENT_LOOP_LAG, THREADPOOL_BUSY, THREADPOOL_QUEUED, THREADPOOL_SIZE
+
+RUNTIME_MONITOR_INTERVAL = float(os.getenv("RUNTIME_MONITOR_INTERVAL", 0.5))
+
+
+def sample_threadpool() -> None:
+    limiter = to_thread.current_default_thread_limiter()
+    THREADPOOL_SIZE.set(limiter.total_tokens)
+    THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+    THREADPOOL_QUEUED.set(limiter.statistics().tasks_waiting)
+
+
+async def run(interval: Optional[float] = None) -> None:
+    interval = interval or RUNTIME_MONITOR_INTERVAL
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+        sample_threadpool()
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from datetime import date, datetime
 from pydantic import BaseModel
 from enum import Enum
@@ -141,3 +141,25 @@ class SessionCardioUpdate(BaseModel):
 class SessionCardioRead(SessionCardioUpdate):
     id: int
     session_item_id: int
+
+
+# ---------- Bulk import ----------
+class ImportStatus(str, Enum):
+    created = "created"
+    exists = "exists"
+    error = "error"
+
+
+class ImportItemResult(BaseModel):
+    index: int
+    status: ImportStatus
+    id: Optional[int] = None
+    name: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class BulkImportResult(BaseModel):
+    created: int
+    existing: int
+    failed: int
+    items: List[ImportItemResult]
@@ -2,18 +2,74 @@
 
 from __future__ import annotations
 
+import atexit
 import os
+import shutil
+import tempfile
 
-import uvicorn
+# Max concurrent sync handlers/dependencies per worker (AnyIO threadpool tokens).
+# Size it together with DB_POOL_SIZE + DB_MAX_OVERFLOW: threads beyond the
+# connection pool only queue inside the pool instead of the threadpool.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+
+def configure_threadpool(size: int | None = None) -> None:
+    """Resize this worker's threadpool; call from inside the event loop."""
+    from anyio import to_thread
+
+    to_thread.current_default_thread_limiter().total_tokens = size or THREADPOOL_SIZE
+
+
+def setup_metrics_dir(workers: int) -> None:
+    """Enable prometheus multiprocess mode for multi-worker runs.
+
+    Must run before anything imports prometheus_client; workers inherit the
+    env var. The directory is emptied so counters start from zero. A
+    temporary directory (PROMETHEUS_MULTIPROC_DIR unset) is removed when this
+    process exits.
+    """
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not path and workers <= 1:
+        return
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), f"fitness-metrics-{os.getpid()}")
+        atexit.register(_remove_metrics_dir, path, os.getpid())
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    from .metrics import prepare_multiprocess_dir
+
+    prepare_multiprocess_dir(path)
+
+
+def _remove_metrics_dir(path: str, owner_pid: int) -> None:
+    # Only the server process that created the directory removes it.
+    if os.getpid() == owner_pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def migrate() -> None:
+    """Apply pending schema migrations once, before any worker starts."""
+    from .db import engine
+    from .migrations import upgrade
+
+    applied = upgrade(engine)
+    if applied:
+        print(f"Applied migrations: {applied}", flush=True)
 
 
 def main() -> None:
     """Boot the FastAPI app with sensible defaults for containers."""
+    workers = int(os.getenv("UVICORN_WORKERS", "2"))
+    setup_metrics_dir(workers)
+
+    if os.getenv("DB_MIGRATE_ON_START", "true").lower() == "true":
+        migrate()
+
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
-    workers = int(os.getenv("UVICORN_WORKERS", "2"))
     log_level = os.getenv("UVICORN_LOG_LEVEL", "info")
 
+    import uvicorn
+
     uvicorn.run(
         "app.main:app",
         host=host,
@@ -6,6 +6,8 @@ from typing import List, Dict, Tuple
 
 import httpx
 
+from ...tracing import traced
+
 
 WGER_API = "https://wger.de/api/v2"
 
@@ -78,6 +80,7 @@ def category_for(name: str) -> str:
 
 
 # HTTP helpers
+@traced("wger.fetch_detail")
 async def _fetch_exercise_detail(  # pragma: no cover - exercised via browse/search integration
     client: httpx.AsyncClient, ex_id: int
 ) -> dict:
@@ -89,6 +92,7 @@ async def _fetch_exercise_detail(  # pragma: no cover - exercised via browse/sea
         return {}
 
 
+@traced("wger.fetch_page")
 async def _fetch_json(  # pragma: no cover - exercised via browse/search integration
     client: httpx.AsyncClient, url: str, params: dict
 ) -> dict:
@@ -128,6 +132,7 @@ def _score_name(name: str, q_tokens: List[str]) -> Tuple[int, int, int, int]:
 
 
 # Public: Search (strict AND)
+@traced()
 async def search_wger(query: str, limit: int = 20) -> List[dict]:  # pragma: no cover
     """
     Strategy:
@@ -235,6 +240,7 @@ async def search_wger(query: str, limit: int = 20) -> List[dict]:  # pragma: no
 
 
 # Public: Browse
+@traced()
 async def browse_wger(  # pragma: no cover
     limit: int = 20, offset: int = 0, muscle: str | None = None
 ) -> List[dict]:
@@ -256,12 +262,11 @@ async def browse_wger(  # pragma: no cover
         matches: List[dict] = []
 
         while len(matches) < offset + limit:
-            t_res = await client.get(
+            t_data = await _fetch_json(
+                client,
                 f"{WGER_API}/exercise-translation/",
-                params={"language": 2, "limit": page_size, "offset": api_offset},
+                {"language": 2, "limit": page_size, "offset": api_offset},
             )
-            t_res.raise_for_status()
-            t_data = t_res.json()
             results = t_data.get("results", [])
             if not results:
                 break
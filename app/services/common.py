@@ -16,6 +16,11 @@ def normalize_whitespace(value: Optional[str]) -> Optional[str]:
     return compact or None
 
 
+def name_key(value: Optional[str]) -> str:
+    """Normalized name used for per-user uniqueness (Exercise.name_norm)."""
+    return (normalize_whitespace(value) or "").casefold()
+
+
 def case_insensitive_equal(a: str, b: str) -> bool:
     return a.casefold() == b.casefold()
 
@@ -0,0 +1,219 @@
+"""Per-user, in-process cache of the exercise library.
+
+The sessions and workouts pages load the whole library on every view, and
+adding or listing session/template items needs each exercise's owner, name
+and category. The first lookup for a user loads their library with one
+query; later lookups are served from memory.
+
+Each entry records the user's exercises version stamp (app.services.stamps)
+it was loaded at, and every lookup first reads the current stamp (one
+primary-key query). Any committed exercise write, by this worker or
+another, bumps the stamp, so the next lookup reloads: a cached library is
+never older than the stamp the request saw. EXERCISE_CACHE_TTL_SECONDS
+(default 30, `0` disables) only bounds how long an unused entry is kept.
+
+Libraries larger than EXERCISE_CACHE_MAX_ROWS are not cached; lookups for
+those users go to the database.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from sqlmodel import Session as DBSession, select
+from sqlmodel.ext.asyncio.session import AsyncSession as AsyncDBSession
+
+from ..metrics import EXERCISE_CACHE_LOOKUPS
+from ..models import Exercise
+from . import stamps
+
+EXERCISE_CACHE_USERS = int(os.getenv("EXERCISE_CACHE_USERS", 1000))
+EXERCISE_CACHE_TTL = float(os.getenv("EXERCISE_CACHE_TTL_SECONDS", 30))
+EXERCISE_CACHE_MAX_ROWS = int(os.getenv("EXERCISE_CACHE_MAX_ROWS", 5000))
+
+
+@dataclass(frozen=True)
+class CachedExercise:
+    """The ExerciseRead fields of one exercise, plus its owner."""
+
+    id: int
+    user_id: int
+    name: str
+    category: str
+    default_unit: Optional[str]
+    equipment: Optional[str]
+    source: str
+    source_ref: Optional[str]
+
+    @classmethod
+    def of(cls, ex: Exercise) -> "CachedExercise":
+        return cls(
+            id=ex.id,  # type: ignore[arg-type]
+            user_id=ex.user_id,
+            name=ex.name,
+            category=ex.category,
+            default_unit=ex.default_unit,
+            equipment=ex.equipment,
+            source=ex.source,
+            source_ref=ex.source_ref,
+        )
+
+
+Library = Dict[int, CachedExercise]
+_STAMP = (stamps.EXERCISES,)
+
+
+class _LibraryCache:
+    """Bounded LRU of user_id -> library, valid for one exercises stamp."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[Library, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, stamp: int) -> Optional[Library]:
+        """The library cached at exercises stamp `stamp`, else None."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and (entry[1] != stamp or entry[2] <= time.monotonic()):
+                del self._entries[user_id]
+                entry = None
+            if entry is None:
+                EXERCISE_CACHE_LOOKUPS.labels(result="miss").inc()
+                return None
+            self._entries.move_to_end(user_id)
+        EXERCISE_CACHE_LOOKUPS.labels(result="hit").inc()
+        return entry[0]
+
+    def put(self, user_id: int, stamp: int, library: Library) -> None:
+        """Store `library`, loaded after reading exercises stamp `stamp`."""
+        if self.maxsize <= 0 or self.ttl <= 0 or len(library) > EXERCISE_CACHE_MAX_ROWS:
+            return
+        with self._lock:
+            self._entries[user_id] = (library, stamp, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+exercise_cache = _LibraryCache(EXERCISE_CACHE_USERS, EXERCISE_CACHE_TTL)
+
+
+def invalidate(user_id: int) -> None:
+    """Drop a user's cached library now (the stamp check would on next use)."""
+    exercise_cache.invalidate(user_id)
+
+
+def _library_stmt(user_id: int):
+    return select(Exercise).where(Exercise.user_id == user_id)
+
+
+def library(db: DBSession, user_id: int) -> Optional[Library]:
+    """The user's library (cached), or None if it is too large to cache."""
+    # Read the stamp before the rows: a write committed in between leaves a
+    # newer stamp, so the entry is reloaded on the next lookup.
+    stamp = stamps.current(db, user_id, _STAMP)[stamps.EXERCISES]
+    lib = exercise_cache.get(user_id, stamp)
+    if lib is not None:
+        return lib
+    rows = db.exec(_library_stmt(user_id).limit(EXERCISE_CACHE_MAX_ROWS + 1)).all()
+    if len(rows) > EXERCISE_CACHE_MAX_ROWS:
+        return None
+    lib = {ex.id: CachedExercise.of(ex) for ex in rows}
+    exercise_cache.put(user_id, stamp, lib)
+    return lib
+
+
+async def library_async(db: AsyncDBSession, user_id: int) -> Optional[Library]:
+    stamp = (await stamps.current_async(db, user_id, _STAMP))[stamps.EXERCISES]
+    lib = exercise_cache.get(user_id, stamp)
+    if lib is not None:
+        return lib
+    stmt = _library_stmt(user_id).limit(EXERCISE_CACHE_MAX_ROWS + 1)
+    rows = (await db.exec(stmt)).all()
+    if len(rows) > EXERCISE_CACHE_MAX_ROWS:
+        return None
+    lib = {ex.id: CachedExercise.of(ex) for ex in rows}
+    exercise_cache.put(user_id, stamp, lib)
+    return lib
+
+
+def owned_exercise(db: DBSession, user_id: int, exercise_id: int) -> Optional[CachedExercise]:
+    """The user's exercise `exercise_id`, or None if it is not theirs."""
+    lib = library(db, user_id)
+    if lib is not None and exercise_id in lib:
+        return lib[exercise_id]
+    # Not cached: too large a library, or created since the stamp was read.
+    ex = db.get(Exercise, exercise_id)
+    if ex is None or ex.user_id != user_id:
+        return None
+    if lib is not None:
+        invalidate(user_id)
+    return CachedExercise.of(ex)
+
+
+def _pick(lib: Library, exercise_ids: Iterable[int]) -> Dict[int, CachedExercise]:
+    return {i: lib[i] for i in exercise_ids if i in lib}
+
+
+def owned_exercises(
+    db: DBSession, user_id: int, exercise_ids: Iterable[int]
+) -> Dict[int, CachedExercise]:
+    """id -> exercise for the ids that belong to the user."""
+    ids = set(exercise_ids)
+    lib = library(db, user_id)
+    found = _pick(lib, ids) if lib is not None else {}
+    missing = ids - found.keys()
+    if missing:
+        stmt = _library_stmt(user_id).where(Exercise.id.in_(missing))
+        rows = db.exec(stmt).all()
+        if rows and lib is not None:
+            invalidate(user_id)  # created since the stamp was read
+        found.update({ex.id: CachedExercise.of(ex) for ex in rows})
+    return found
+
+
+async def owned_exercises_async(
+    db: AsyncDBSession, user_id: int, exercise_ids: Iterable[int]
+) -> Dict[int, CachedExercise]:
+    ids = set(exercise_ids)
+    lib = await library_async(db, user_id)
+    found = _pick(lib, ids) if lib is not None else {}
+    missing = ids - found.keys()
+    if missing:
+        stmt = _library_stmt(user_id).where(Exercise.id.in_(missing))
+        rows = (await db.exec(stmt)).all()
+        if rows and lib is not None:
+            invalidate(user_id)  # created since the stamp was read
+        found.update({ex.id: CachedExercise.of(ex) for ex in rows})
+    return found
+
+
+def newest_first(
+    lib: Library,
+    category: Optional[str],
+    limit: int,
+    offset: int,
+    after_id: Optional[int],
+) -> List[CachedExercise]:
+    """A page of the library in list_exercises order (id DESC)."""
+    rows = sorted(lib.values(), key=lambda ex: ex.id, reverse=True)
+    if category is not None:
+        rows = [ex for ex in rows if ex.category == category]
+    if after_id is not None:
+        rows = [ex for ex in rows if ex.id < after_id]
+    return rows[offset: offset + limit]
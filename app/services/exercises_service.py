@@ -1,8 +1,10 @@
 from __future__ import annotations
-from typing import List, Optional, Dict, Any
-from sqlalchemy import func
+from typing import List, Optional, Dict, Any, Tuple
+import datetime as dt
+from sqlalchemy import and_, exists, func, or_
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session as DBSession, select
+from sqlmodel.ext.asyncio.session import AsyncSession as AsyncDBSession
 from fastapi import HTTPException
 
 
@@ -16,28 +18,23 @@ from ..models import (
     ExerciseMuscle,
 )
 from ..schemas import ExerciseCreate, ExerciseUpdate
-from .common import ensure_owner, normalize_whitespace, case_insensitive_equal
+from . import exercise_cache, stamps
+from .common import ensure_owner, name_key, normalize_whitespace
+from .search import name_search, search_dialect, search_dialect_async
+from ..tracing import traced
 
 
+@traced()
 def create_exercise(db: DBSession, user_id: int, payload: ExerciseCreate) -> Exercise:
     if not payload.name or not payload.name.strip():
         raise HTTPException(status_code=400, detail="Name is required")
 
     norm_name = normalize_whitespace(payload.name)
 
-    dup = db.exec(
-        select(Exercise)
-        .where(Exercise.user_id == user_id)
-        .where(func.lower(Exercise.name) == (norm_name or "").lower())
-    ).first()
-    if dup:
-        raise HTTPException(
-            status_code=409, detail="Exercise with that name already exists"
-        )
-
     ex = Exercise(
         user_id=user_id,
         name=norm_name or "",
+        name_norm=name_key(norm_name),
         category=payload.category,
         default_unit=normalize_whitespace(payload.default_unit),
         equipment=normalize_whitespace(payload.equipment),
@@ -45,34 +42,91 @@ def create_exercise(db: DBSession, user_id: int, payload: ExerciseCreate) -> Exe
         source_ref=None,
     )
     db.add(ex)
-    db.commit()
+    stamps.bump(db, user_id, stamps.EXERCISES)
+    _commit_unique_name(db)
+    exercise_cache.invalidate(user_id)
     db.refresh(ex)
     return ex
 
 
-def list_exercises(
-    db: DBSession,
+def _commit_unique_name(db: DBSession) -> None:
+    """Commit; a clash on the (user_id, name_norm) unique index becomes a 409."""
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=409, detail="Exercise with that name already exists"
+        )
+
+
+def _list_exercises_stmt(
     user_id: int,
     q: Optional[str],
     category: Optional[Category],
     limit: int,
     offset: int,
-) -> List[Exercise]:
+    dialect: str,
+    after_id: Optional[int] = None,
+):
     stmt = select(Exercise).where(Exercise.user_id == user_id)
-    if q:
-        stmt = stmt.where(func.lower(Exercise.name).like(f"%{q.lower()}%"))
+    if q and q.strip():
+        stmt = name_search(stmt, Exercise, q, dialect)
     if category is not None:
         stmt = stmt.where(Exercise.category == category)
-    stmt = stmt.order_by(Exercise.id.desc()).limit(limit).offset(offset)
+    if after_id is not None:
+        stmt = stmt.where(Exercise.id < after_id)
+    return stmt.order_by(Exercise.id.desc()).limit(limit).offset(offset)
+
+
+@traced()
+def list_exercises(
+    db: DBSession,
+    user_id: int,
+    q: Optional[str],
+    category: Optional[Category],
+    limit: int,
+    offset: int,
+    after_id: Optional[int] = None,
+) -> List[Exercise]:
+    if not (q and q.strip()):
+        lib = exercise_cache.library(db, user_id)
+        if lib is not None:
+            return exercise_cache.newest_first(lib, category, limit, offset, after_id)
+    stmt = _list_exercises_stmt(
+        user_id, q, category, limit, offset, search_dialect(db), after_id
+    )
     return db.exec(stmt).all()
 
 
+@traced()
+async def list_exercises_async(
+    db: AsyncDBSession,
+    user_id: int,
+    q: Optional[str],
+    category: Optional[Category],
+    limit: int,
+    offset: int,
+    after_id: Optional[int] = None,
+) -> List[Exercise]:
+    if not (q and q.strip()):
+        lib = await exercise_cache.library_async(db, user_id)
+        if lib is not None:
+            return exercise_cache.newest_first(lib, category, limit, offset, after_id)
+    stmt = _list_exercises_stmt(
+        user_id, q, category, limit, offset, await search_dialect_async(db), after_id
+    )
+    return (await db.exec(stmt)).all()
+
+
+@traced()
 def get_exercise(db: DBSession, user_id: int, exercise_id: int) -> Exercise:
     ex = db.get(Exercise, exercise_id)
     ensure_owner(ex, user_id, "exercise")
     return ex  # type: ignore
 
 
+@traced()
 def update_exercise(
     db: DBSession,
     user_id: int,
@@ -89,17 +143,8 @@ def update_exercise(
         new_name = normalize_whitespace(data["name"]) or ""
         if not new_name:
             raise HTTPException(status_code=400, detail="Name cannot be empty")
-        if not case_insensitive_equal(new_name, ex.name):
-            dup = db.exec(
-                select(Exercise)
-                .where(Exercise.user_id == user_id)
-                .where(func.lower(Exercise.name) == new_name.lower())
-            ).first()
-            if dup:
-                raise HTTPException(
-                    status_code=409, detail="Exercise with that name already exists"
-                )
         ex.name = new_name
+        ex.name_norm = name_key(new_name)
 
     if "category" in data:
         ex.category = data["category"] or ex.category
@@ -109,11 +154,14 @@ def update_exercise(
         ex.equipment = normalize_whitespace(data["equipment"])  # type: ignore
 
     db.add(ex)
-    db.commit()
+    stamps.bump(db, user_id, stamps.EXERCISES)
+    _commit_unique_name(db)
+    exercise_cache.invalidate(user_id)
     db.refresh(ex)
     return ex
 
 
+@traced()
 def delete_exercise(db: DBSession, user_id: int, exercise_id: int) -> None:
     ex = db.get(Exercise, exercise_id)
     ensure_owner(ex, user_id, "exercise")
@@ -128,7 +176,9 @@ def delete_exercise(db: DBSession, user_id: int, exercise_id: int) -> None:
         db.flush()
 
         db.delete(ex)
+        stamps.bump(db, user_id, stamps.EXERCISES)
         db.commit()
+        exercise_cache.invalidate(user_id)
     except IntegrityError:
         db.rollback()
         raise HTTPException(
@@ -137,34 +187,110 @@ def delete_exercise(db: DBSession, user_id: int, exercise_id: int) -> None:
         )
 
 
-def get_exercise_usage(db: DBSession, user_id: int, exercise_id: int) -> Dict[str, Any]:
-    ex = db.get(Exercise, exercise_id)
-    ensure_owner(ex, user_id, "exercise")
-    assert ex is not None
+USAGE_PAGE_SIZE = 20
+
+
+def _uses_in_template(exercise_id: int):
+    return exists().where(
+        WorkoutItem.workout_template_id == WorkoutTemplate.id,
+        WorkoutItem.exercise_id == exercise_id,
+    )
+
+
+def _uses_in_session(exercise_id: int):
+    return exists().where(
+        SessionItem.session_id == Session.id,
+        SessionItem.exercise_id == exercise_id,
+    )
+
+
+def _usage_counts_stmt(user_id: int, exercise_id: int):
+    workouts = (
+        select(func.count())
+        .select_from(WorkoutTemplate)
+        .where(WorkoutTemplate.user_id == user_id, _uses_in_template(exercise_id))
+    )
+    sessions = (
+        select(func.count())
+        .select_from(Session)
+        .where(Session.user_id == user_id, _uses_in_session(exercise_id))
+    )
+    return select(workouts.scalar_subquery(), sessions.scalar_subquery())
+
 
-    wq = (
-        select(WorkoutTemplate)
-        .where(WorkoutTemplate.user_id == user_id)
-        .join(WorkoutItem, WorkoutItem.workout_template_id == WorkoutTemplate.id)
-        .where(WorkoutItem.exercise_id == exercise_id)
-        .order_by(WorkoutTemplate.name.asc())
+def _usage_workouts_stmt(
+    user_id: int, exercise_id: int, limit: int, after: Optional[Tuple[str, int]]
+):
+    stmt = select(WorkoutTemplate.id, WorkoutTemplate.name).where(
+        WorkoutTemplate.user_id == user_id, _uses_in_template(exercise_id)
     )
-    workouts = db.exec(wq).all()
-
-    sq = (
-        select(Session)
-        .where(Session.user_id == user_id)
-        .join(SessionItem, SessionItem.session_id == Session.id)
-        .where(SessionItem.exercise_id == exercise_id)
-        .order_by(Session.date.desc())
+    if after is not None:
+        # Keyset: rows after (name, id) in (name ASC, id ASC) order
+        after_name, after_id = after
+        stmt = stmt.where(
+            or_(
+                WorkoutTemplate.name > after_name,
+                and_(WorkoutTemplate.name == after_name, WorkoutTemplate.id > after_id),
+            )
+        )
+    return stmt.order_by(WorkoutTemplate.name.asc(), WorkoutTemplate.id.asc()).limit(limit)
+
+
+def _usage_sessions_stmt(
+    user_id: int, exercise_id: int, limit: int, after: Optional[Tuple[dt.date, int]]
+):
+    stmt = select(Session.id, Session.title, Session.date).where(
+        Session.user_id == user_id, _uses_in_session(exercise_id)
     )
-    sessions_rows = db.exec(sq).all()
+    if after is not None:
+        # Keyset: rows after (date, id) in (date DESC, id DESC) order
+        after_date, after_id = after
+        stmt = stmt.where(
+            or_(
+                Session.date < after_date,
+                and_(Session.date == after_date, Session.id < after_id),
+            )
+        )
+    return stmt.order_by(Session.date.desc(), Session.id.desc()).limit(limit)
+
+
+@traced()
+def get_exercise_usage(
+    db: DBSession,
+    user_id: int,
+    exercise_id: int,
+    counts_only: bool = False,
+    limit: int = USAGE_PAGE_SIZE,
+    workouts_after: Optional[Tuple[str, int]] = None,
+    sessions_after: Optional[Tuple[dt.date, int]] = None,
+) -> Dict[str, Any]:
+    """Templates and sessions that reference the exercise.
+
+    Both counts come from one COUNT query (each template / session counted
+    once, however many items use the exercise). Unless `counts_only`, one
+    page of up to `limit` templates (by name) and sessions (newest first)
+    follows, each after its keyset position `*_after`.
+    """
+    ex = db.get(Exercise, exercise_id)
+    ensure_owner(ex, user_id, "exercise")
+    assert ex is not None
 
-    return {
+    n_workouts, n_sessions = db.exec(_usage_counts_stmt(user_id, exercise_id)).one()
+    usage: Dict[str, Any] = {
         "exercise": {"id": ex.id, "name": ex.name},
-        "workouts": [{"id": w.id, "name": w.name} for w in workouts],
-        "sessions": [
-            {"id": s.id, "title": s.title, "date": str(s.date)} for s in sessions_rows
-        ],
-        "counts": {"workouts": len(workouts), "sessions": len(sessions_rows)},
+        "counts": {"workouts": n_workouts, "sessions": n_sessions},
     }
+    if counts_only:
+        return usage
+
+    workouts = db.exec(
+        _usage_workouts_stmt(user_id, exercise_id, limit, workouts_after)
+    ).all()
+    sessions_rows = db.exec(
+        _usage_sessions_stmt(user_id, exercise_id, limit, sessions_after)
+    ).all()
+    usage["workouts"] = [{"id": w.id, "name": w.name} for w in workouts]
+    usage["sessions"] = [
+        {"id": s.id, "title": s.title, "date": str(s.date)} for s in sessions_rows
+    ]
+    return usage
@@ -0,0 +1,232 @@
+"""Bulk import of normalized external (WGER) exercises.
+
+Takes a list of the objects `POST /api/external/exercises/import` accepts
+and imports them for one user in a single transaction:
+
+- one query finds exercises the user already has, by (source, source_ref)
+  or by normalized name; those items, and repeats within the batch, report
+  `exists` with the id of the existing exercise;
+- one query loads the referenced muscles, and the missing ones are inserted
+  together;
+- the new exercises and their ExerciseMuscle links are inserted with one
+  multi-row INSERT each.
+
+Items that fail validation report `error` and do not stop the others.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import insert, or_, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session as DBSession, select
+
+from ..models import Category, Exercise, ExerciseMuscle, Muscle, MuscleRole
+from ..schemas import BulkImportResult, ImportItemResult, ImportStatus
+from ..tracing import traced
+from . import exercise_cache, stamps
+from .common import name_key, normalize_whitespace
+
+BULK_IMPORT_MAX = int(os.getenv("BULK_IMPORT_MAX", 500))
+
+
+@dataclass
+class _Item:
+    index: int
+    name: str
+    name_norm: str
+    source: str
+    source_ref: Optional[str]
+    category: Category
+    default_unit: Optional[str]
+    equipment: Optional[str]
+    # (slug, role), primary first; a slug listed under both is primary
+    muscles: List[Tuple[str, MuscleRole]] = field(default_factory=list)
+
+
+def _optional_str(raw: dict, key: str) -> Optional[str]:
+    value = raw.get(key)
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"{key} must be a string")
+    return value
+
+
+def _source_ref(raw: dict) -> Optional[str]:
+    """WGER ids are integers; the single-item import accepts them via str()."""
+    value = raw.get("source_ref")
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    return _optional_str(raw, "source_ref")
+
+
+def _slugs(muscles: dict, role: str) -> set:
+    slugs = muscles.get(role) or []
+    if not isinstance(slugs, list) or not all(isinstance(s, str) for s in slugs):
+        raise ValueError(f"muscles.{role} must be a list of strings")
+    return {s for s in slugs if s}
+
+
+def _parse(index: int, raw: Any) -> _Item:
+    """Validate one payload object; ValueError(detail) if it is unusable."""
+    if not isinstance(raw, dict):
+        raise ValueError("expected an object")
+    name = normalize_whitespace(_optional_str(raw, "name"))
+    if not name:
+        raise ValueError("name required")
+    raw_cat = raw.get("category") or "strength"
+    try:
+        category = Category(raw_cat)
+    except ValueError:
+        raise ValueError(f"Invalid category '{raw_cat}'")
+    ref = (_source_ref(raw) or "").strip()
+
+    muscles = raw.get("muscles") or {}
+    if not isinstance(muscles, dict):
+        raise ValueError("muscles must be an object")
+    primary = _slugs(muscles, "primary")
+    secondary = _slugs(muscles, "secondary") - primary
+    return _Item(
+        index=index,
+        name=name,
+        name_norm=name_key(name),
+        source=(_optional_str(raw, "source") or "wger").strip().lower(),
+        source_ref=ref or None,
+        category=category,
+        default_unit=_optional_str(raw, "default_unit"),
+        equipment=_optional_str(raw, "equipment"),
+        muscles=[(s, MuscleRole.primary) for s in sorted(primary)]
+        + [(s, MuscleRole.secondary) for s in sorted(secondary)],
+    )
+
+
+def _existing(db: DBSession, user_id: int, items: List[_Item]) -> List[Exercise]:
+    """The user's exercises matching any item by source ref or name, in one query."""
+    refs = {(it.source, it.source_ref) for it in items if it.source_ref}
+    matches = [Exercise.name_norm.in_({it.name_norm for it in items})]
+    if refs:
+        matches.append(tuple_(Exercise.source, Exercise.source_ref).in_(refs))
+    return db.exec(
+        select(Exercise).where(Exercise.user_id == user_id, or_(*matches))
+    ).all()
+
+
+def _muscle_ids(db: DBSession, slugs: Iterable[str]) -> Dict[str, int]:
+    """slug -> Muscle.id for `slugs`, inserting the missing muscles in one statement."""
+    slugs = set(slugs)
+    if not slugs:
+        return {}
+    found = dict(db.exec(select(Muscle.slug, Muscle.id).where(Muscle.slug.in_(slugs))).all())
+    missing = [
+        {"name": slug.replace("_", " ").title(), "slug": slug}
+        for slug in sorted(slugs - found.keys())
+    ]
+    if missing:
+        found.update(db.execute(insert(Muscle).returning(Muscle.slug, Muscle.id), missing).all())
+    return found
+
+
+@dataclass
+class _Target:
+    """The exercise an item resolves to; `id` is None until it is inserted."""
+
+    id: Optional[int]
+    name: str
+
+
+@traced()
+def bulk_import(db: DBSession, user_id: int, payload: List[Any]) -> BulkImportResult:
+    if len(payload) > BULK_IMPORT_MAX:
+        raise HTTPException(
+            status_code=413, detail=f"At most {BULK_IMPORT_MAX} exercises per request"
+        )
+
+    results: Dict[int, ImportItemResult] = {}
+    items: List[_Item] = []
+    for index, raw in enumerate(payload):
+        try:
+            items.append(_parse(index, raw))
+        except ValueError as e:
+            results[index] = ImportItemResult(
+                index=index, status=ImportStatus.error, detail=str(e)
+            )
+
+    by_ref: Dict[Tuple[str, str], _Target] = {}
+    by_name: Dict[str, _Target] = {}
+    for ex in _existing(db, user_id, items) if items else []:
+        target = _Target(ex.id, ex.name)
+        if ex.source_ref:
+            by_ref[(ex.source, ex.source_ref)] = target
+        by_name.setdefault(ex.name_norm or "", target)
+
+    # Resolve every item to an existing exercise or a new one. New ones are
+    # registered as they are planned, so repeats in the batch resolve to them.
+    planned: List[Tuple[_Item, _Target, ImportStatus]] = []
+    new: List[Tuple[_Item, _Target]] = []
+    for it in items:
+        target = by_ref.get((it.source, it.source_ref)) if it.source_ref else None
+        target = target or by_name.get(it.name_norm)
+        if target is not None:
+            planned.append((it, target, ImportStatus.exists))
+            continue
+        target = _Target(None, it.name)
+        by_name[it.name_norm] = target
+        if it.source_ref:
+            by_ref[(it.source, it.source_ref)] = target
+        planned.append((it, target, ImportStatus.created))
+        new.append((it, target))
+
+    if new:
+        muscle_ids = _muscle_ids(db, (slug for it, _ in new for slug, _ in it.muscles))
+        rows = [
+            {
+                "user_id": user_id,
+                "name": it.name,
+                "name_norm": it.name_norm,
+                "category": it.category,
+                "default_unit": it.default_unit,
+                "equipment": it.equipment,
+                "source": it.source,
+                "source_ref": it.source_ref,
+            }
+            for it, _ in new
+        ]
+        try:
+            # name_norm is unique within `new`, so it maps the returned ids back.
+            ids = dict(
+                db.execute(insert(Exercise).returning(Exercise.name_norm, Exercise.id), rows).all()
+            )
+        except IntegrityError:
+            # A concurrent write took one of the names between the lookup and here.
+            db.rollback()
+            raise HTTPException(
+                status_code=409, detail="Exercise library changed during import; retry"
+            )
+        for it, target in new:
+            target.id = ids[it.name_norm]
+        links = [
+            {"exercise_id": target.id, "muscle_id": muscle_ids[slug], "role": role}
+            for it, target in new
+            for slug, role in it.muscles
+        ]
+        if links:
+            db.execute(insert(ExerciseMuscle), links)
+        stamps.bump(db, user_id, stamps.EXERCISES)
+        db.commit()
+        exercise_cache.invalidate(user_id)
+
+    for it, target, status in planned:
+        results[it.index] = ImportItemResult(
+            index=it.index, status=status, id=target.id, name=target.name
+        )
+    ordered = [results[i] for i in range(len(payload))]
+    statuses = [r.status for r in ordered]
+    return BulkImportResult(
+        created=statuses.count(ImportStatus.created),
+        existing=statuses.count(ImportStatus.exists),
+        failed=statuses.count(ImportStatus.error),
+        items=ordered,
+    )
@@ -0,0 +1,143 @@
+"""Indexed, ranked name search for exercises and workout templates.
+
+Migration 6 builds the indexes:
+
+- SQLite: an FTS5 table per searched table (`exercise_fts`,
+  `workouttemplate_fts`) with the trigram tokenizer, external content and
+  triggers that keep it in sync on insert, update and delete. Needs SQLite
+  3.34+ built with FTS5; otherwise no index is created and search falls back
+  to LIKE.
+- PostgreSQL: pg_trgm GIN indexes on lower(name), which serve the
+  `LIKE '%q%'` filter; results are ranked by `similarity()`. Where the
+  migration may not create the extension (managed servers that have not
+  allow-listed it) no index is created and search falls back to LIKE.
+
+`search_dialect` checks once per database whether the index exists, since
+it depends on what the migration could do, not on the running process.
+
+Trigrams need at least three characters, so shorter queries use the plain
+LIKE filter, ordered newest first as before.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import column, func, literal_column, table
+from sqlmodel import select
+
+MIN_QUERY_LENGTH = 3
+SEARCHED_TABLES = ("exercise", "workouttemplate")
+# Pseudo-dialects for databases that have the search index.
+SQLITE_FTS = "sqlite+fts"
+POSTGRES_TRGM = "postgresql+trgm"
+
+_sqlite_master = table("sqlite_master", column("type"), column("name"))
+_FTS_TABLES = (
+    select(func.count())
+    .select_from(_sqlite_master)
+    .where(
+        _sqlite_master.c.type == "table",
+        _sqlite_master.c.name.in_([f"{t}_fts" for t in SEARCHED_TABLES]),
+    )
+)
+_pg_extension = table("pg_extension", column("extname"))
+_TRGM_EXTENSION = (
+    select(func.count()).select_from(_pg_extension).where(_pg_extension.c.extname == "pg_trgm")
+)
+_search_dialects: Dict[str, str] = {}  # database URL -> search_dialect()
+
+
+@lru_cache(maxsize=1)
+def sqlite_trigram_available() -> bool:
+    """True if this Python's SQLite has FTS5 with the trigram tokenizer."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(x, tokenize='trigram')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def dialect_name(db) -> str:
+    return db.get_bind().dialect.name
+
+
+def _probe(db) -> Optional[Tuple[str, str, Any]]:
+    """(cache key, dialect, count of index objects) for `db`, or None when
+    the dialect has no search index."""
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+    if dialect == "sqlite":
+        return str(bind.url), dialect, _FTS_TABLES
+    if dialect == "postgresql":
+        return str(bind.url), dialect, _TRGM_EXTENSION
+    return None
+
+
+def _remember(key: str, dialect: str, found: int) -> str:
+    if dialect == "sqlite":
+        indexed = found == len(SEARCHED_TABLES) and sqlite_trigram_available()
+        _search_dialects[key] = SQLITE_FTS if indexed else dialect
+    else:
+        _search_dialects[key] = POSTGRES_TRGM if found else dialect
+    return _search_dialects[key]
+
+
+def search_dialect(db) -> str:
+    """The `dialect` argument for `name_search`: SQLITE_FTS / POSTGRES_TRGM
+    when migration 6 built the index in this database, else the dialect
+    name. Checked once per database."""
+    probe = _probe(db)
+    if probe is None:
+        return dialect_name(db)
+    key, dialect, stmt = probe
+    if key in _search_dialects:
+        return _search_dialects[key]
+    return _remember(key, dialect, db.exec(stmt).one())
+
+
+async def search_dialect_async(db) -> str:
+    probe = _probe(db)
+    if probe is None:
+        return dialect_name(db)
+    key, dialect, stmt = probe
+    if key in _search_dialects:
+        return _search_dialects[key]
+    return _remember(key, dialect, (await db.exec(stmt)).one())
+
+
+def is_ranked(q: Optional[str]) -> bool:
+    """True if `q` is long enough to be ordered by relevance rather than id."""
+    return bool(q) and len(q.strip()) >= MIN_QUERY_LENGTH
+
+
+def fts_phrase(q: str) -> str:
+    """`q` as a single FTS5 phrase, so operators in user input are literal."""
+    return '"' + q.replace('"', '""') + '"'
+
+
+def name_search(stmt, model, q: str, dialect: str):
+    """Filter `stmt` (a select of `model`) to names containing `q`, best match first.
+
+    `dialect` comes from `search_dialect`. The caller adds its own
+    tie-breaking order after this one.
+    """
+    q = q.strip()
+    if dialect == SQLITE_FTS and is_ranked(q):
+        name = f"{model.__tablename__}_fts"
+        fts = table(name, column("rowid"), column("rank"))
+        return (
+            stmt.join(fts, fts.c.rowid == model.id)
+            .where(literal_column(name).op("MATCH")(fts_phrase(q)))
+            .order_by(fts.c.rank)
+        )
+    lowered = func.lower(model.name)
+    stmt = stmt.where(lowered.like(f"%{q.lower()}%"))
+    if dialect == POSTGRES_TRGM and is_ranked(q):
+        stmt = stmt.order_by(func.similarity(lowered, q.lower()).desc())
+    return stmt
@@ -1,8 +1,10 @@
 from __future__ import annotations
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import datetime as dt
 from fastapi import HTTPException
+from sqlalchemy import and_, or_
 from sqlmodel import Session as DBSession, select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession as AsyncDBSession
 
 
 from ..models import (
@@ -10,20 +12,23 @@ from ..models import (
     SessionItem,
     SessionSet,
     SessionCardio,
-    Exercise,
     WorkoutItem,
 )
 from ..schemas import SessionCreate, SessionItemCreate, SessionItemRead
+from . import exercise_cache, stamps
 from .common import ensure_owner, today, now_utc
+from .exercise_cache import CachedExercise
+from ..tracing import traced
 
 
-def _exercise_or_400(db: DBSession, ex_id: int, user_id: int) -> Exercise:
-    ex = db.get(Exercise, ex_id)
-    if not ex or ex.user_id != user_id:
+def _exercise_or_400(db: DBSession, ex_id: int, user_id: int) -> CachedExercise:
+    ex = exercise_cache.owned_exercise(db, user_id, ex_id)
+    if ex is None:
         raise HTTPException(status_code=400, detail="Invalid exercise_id")
     return ex
 
 
+@traced()
 def create_session(db: DBSession, user_id: int, payload: SessionCreate) -> Session:
     if payload.date > today():
         raise HTTPException(
@@ -40,6 +45,7 @@ def create_session(db: DBSession, user_id: int, payload: SessionCreate) -> Sessi
         updated_at=now_utc(),
     )
     db.add(s)
+    stamps.bump(db, user_id, stamps.SESSIONS)
     db.commit()
     db.refresh(s)
 
@@ -63,18 +69,20 @@ def create_session(db: DBSession, user_id: int, payload: SessionCreate) -> Sessi
                     updated_at=now_utc(),
                 )
             )
+        stamps.bump(db, user_id, stamps.SESSIONS)
         db.commit()
 
     return s
 
 
-def list_sessions(
-    db: DBSession,
+def _list_sessions_stmt(
     user_id: int,
     on_date: Optional[str],
     start_date: Optional[str],
     end_date: Optional[str],
-) -> List[Session]:
+    limit: Optional[int] = None,
+    after: Optional[Tuple[dt.date, int]] = None,
+):
     stmt = select(Session).where(Session.user_id == user_id)
     if on_date:
         d = dt.date.fromisoformat(on_date)
@@ -85,16 +93,55 @@ def list_sessions(
     if end_date:
         ed = dt.date.fromisoformat(end_date)
         stmt = stmt.where(Session.date <= ed)
+    if after is not None:
+        # Keyset: rows after (date, id) in (date DESC, id DESC) order
+        after_date, after_id = after
+        stmt = stmt.where(
+            or_(
+                Session.date < after_date,
+                and_(Session.date == after_date, Session.id < after_id),
+            )
+        )
     stmt = stmt.order_by(Session.date.desc(), Session.id.desc())
+    return stmt if limit is None else stmt.limit(limit)
+
+
+@traced()
+def list_sessions(
+    db: DBSession,
+    user_id: int,
+    on_date: Optional[str],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    limit: Optional[int] = None,
+    after: Optional[Tuple[dt.date, int]] = None,
+) -> List[Session]:
+    stmt = _list_sessions_stmt(user_id, on_date, start_date, end_date, limit, after)
     return db.exec(stmt).all()
 
 
+@traced()
+async def list_sessions_async(
+    db: AsyncDBSession,
+    user_id: int,
+    on_date: Optional[str],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    limit: Optional[int] = None,
+    after: Optional[Tuple[dt.date, int]] = None,
+) -> List[Session]:
+    stmt = _list_sessions_stmt(user_id, on_date, start_date, end_date, limit, after)
+    return (await db.exec(stmt)).all()
+
+
+@traced()
 def read_session(db: DBSession, user_id: int, session_id: int) -> Session:
     s = db.get(Session, session_id)
     ensure_owner(s, user_id, "session")
     return s  # type: ignore
 
 
+@traced()
 def add_item(
     db: DBSession, user_id: int, session_id: int, payload: SessionItemCreate
 ) -> SessionItemRead:
@@ -126,6 +173,7 @@ def add_item(
         updated_at=now_utc(),
     )
     db.add(it)
+    stamps.bump(db, user_id, stamps.SESSIONS)
     db.commit()
     db.refresh(it)
 
@@ -140,29 +188,17 @@ def add_item(
     )
 
 
-def list_items(db: DBSession, user_id: int, session_id: int) -> List[SessionItemRead]:
-    s = db.get(Session, session_id)
-    ensure_owner(s, user_id, "session")
-
-    rows = db.exec(
+def _session_items_stmt(session_id: int):
+    return (
         select(SessionItem)
         .where(SessionItem.session_id == session_id)
         .order_by(SessionItem.order_index.asc())
-    ).all()
-    ex_ids = {r.exercise_id for r in rows}
-    ex_map = (
-        {
-            e.id: e
-            for e in db.exec(
-                select(Exercise)
-                .where(Exercise.id.in_(ex_ids))
-                .where(Exercise.user_id == user_id)
-            ).all()
-        }
-        if ex_ids
-        else {}
     )
 
+
+def _item_reads(
+    rows: List[SessionItem], ex_map: dict[int, CachedExercise]
+) -> List[SessionItemRead]:
     return [
         SessionItemRead(
             id=r.id,
@@ -183,6 +219,33 @@ def list_items(db: DBSession, user_id: int, session_id: int) -> List[SessionItem
     ]
 
 
+@traced()
+def list_items(db: DBSession, user_id: int, session_id: int) -> List[SessionItemRead]:
+    s = db.get(Session, session_id)
+    ensure_owner(s, user_id, "session")
+
+    rows = db.exec(_session_items_stmt(session_id)).all()
+    ex_ids = {r.exercise_id for r in rows}
+    ex_map = exercise_cache.owned_exercises(db, user_id, ex_ids) if ex_ids else {}
+    return _item_reads(rows, ex_map)
+
+
+@traced()
+async def list_items_async(
+    db: AsyncDBSession, user_id: int, session_id: int
+) -> List[SessionItemRead]:
+    s = await db.get(Session, session_id)
+    ensure_owner(s, user_id, "session")
+
+    rows = (await db.exec(_session_items_stmt(session_id))).all()
+    ex_ids = {r.exercise_id for r in rows}
+    ex_map = (
+        await exercise_cache.owned_exercises_async(db, user_id, ex_ids) if ex_ids else {}
+    )
+    return _item_reads(rows, ex_map)
+
+
+@traced()
 def update_item(
     db: DBSession,
     user_id: int,
@@ -208,11 +271,10 @@ def update_item(
         it.order_index = order_index
     it.updated_at = now_utc()
     db.add(it)
+    stamps.bump(db, user_id, stamps.SESSIONS)
     db.commit()
     db.refresh(it)
-    ex = db.get(Exercise, it.exercise_id)
-    if ex and ex.user_id != user_id:
-        ex = None
+    ex = exercise_cache.owned_exercise(db, user_id, it.exercise_id)
     return SessionItemRead(
         id=it.id,
         session_id=it.session_id,
@@ -224,6 +286,7 @@ def update_item(
     )
 
 
+@traced()
 def delete_item(db: DBSession, user_id: int, session_id: int, item_id: int) -> None:
     it = db.get(SessionItem, item_id)
     if not it or it.session_id != session_id:
@@ -233,9 +296,11 @@ def delete_item(db: DBSession, user_id: int, session_id: int, item_id: int) -> N
     db.exec(delete(SessionSet).where(SessionSet.session_item_id == item_id))
     db.exec(delete(SessionCardio).where(SessionCardio.session_item_id == item_id))
     db.delete(it)
+    stamps.bump(db, user_id, stamps.SESSIONS)
     db.commit()
 
 
+@traced()
 def delete_session(db: DBSession, user_id: int, session_id: int) -> None:
     s = db.get(Session, session_id)
     ensure_owner(s, user_id, "session")
@@ -245,4 +310,5 @@ def delete_session(db: DBSession, user_id: int, session_id: int) -> None:
     if item_ids:
         db.exec(delete(SessionItem).where(SessionItem.id.in_(item_ids)))
     db.exec(delete(Session).where(Session.id == session_id))
+    stamps.bump(db, user_id, stamps.SESSIONS)
     db.commit()
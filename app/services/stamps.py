@@ -0,0 +1,107 @@
+"""Per-user collection version stamps.
+
+Every write to a user's exercises, workout templates (and their items) or
+sessions (and their items) bumps that collection's counter in the
+`collectionversion` table, in the same transaction as the write. Readers
+fetch the counters with one primary-key lookup; app.conditional turns them
+into ETags, so an unchanged collection is answered with 304 without loading
+its rows.
+
+Call `bump` before `commit()`: a write that rolls back leaves the version
+unchanged, and a committed write can never be seen with the old version.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlmodel import Session as DBSession, select
+from sqlmodel.ext.asyncio.session import AsyncSession as AsyncDBSession
+
+from ..models import CollectionVersion
+
+EXERCISES = "exercises"
+WORKOUTS = "workouts"
+SESSIONS = "sessions"
+_MEMO_KEY = "collection_versions"
+
+# INSERT ... ON CONFLICT works on SQLite 3.24+ and PostgreSQL.
+_BUMP = text(
+    "INSERT INTO collectionversion (user_id, collection, version) "
+    "VALUES (:user_id, :collection, 1) "
+    "ON CONFLICT (user_id, collection) "
+    "DO UPDATE SET version = collectionversion.version + 1"
+)
+
+
+def _memo(db) -> Optional[Dict[Tuple[int, str], int]]:
+    """(user_id, collection) -> version read in `db`'s current transaction,
+    or None outside a transaction.
+
+    The ETag dependency and the exercise cache read the same stamp in one
+    request; sharing the read saves a query and guarantees the cache is
+    checked against the very stamp the ETag was built from.
+    """
+    sync = getattr(db, "sync_session", db)  # AsyncSession
+    txn = sync.get_transaction()
+    if txn is None:
+        return None
+    held = sync.info.get(_MEMO_KEY)
+    if held is None or held[0] is not txn:
+        held = sync.info[_MEMO_KEY] = (txn, {})
+    return held[1]
+
+
+def bump(db: DBSession, user_id: int, *collections: str) -> None:
+    """Mark `collections` of the user as changed (commit is the caller's)."""
+    for collection in collections:
+        db.execute(_BUMP, {"user_id": user_id, "collection": collection})
+    memo = _memo(db)
+    if memo is not None:
+        for collection in collections:
+            memo.pop((user_id, collection), None)
+
+
+def _versions_stmt(user_id: int, collections: Sequence[str]):
+    return select(CollectionVersion.collection, CollectionVersion.version).where(
+        CollectionVersion.user_id == user_id,
+        CollectionVersion.collection.in_(collections),
+    )
+
+
+def _recall(db, user_id: int, collections: Sequence[str]) -> Optional[Dict[str, int]]:
+    memo = _memo(db)
+    if memo is None or any((user_id, c) not in memo for c in collections):
+        return None
+    return {c: memo[(user_id, c)] for c in collections}
+
+
+def _remember(db, user_id: int, collections: Sequence[str], rows) -> Dict[str, int]:
+    found = dict(rows)
+    versions = {c: found.get(c, 0) for c in collections}
+    memo = _memo(db)  # the query has begun a transaction
+    if memo is not None:
+        memo.update({(user_id, c): v for c, v in versions.items()})
+    return versions
+
+
+def current(db: DBSession, user_id: int, collections: Sequence[str]) -> Dict[str, int]:
+    """collection -> version; 0 for a collection that was never written.
+
+    A stamp already read in the same transaction is not read again."""
+    versions = _recall(db, user_id, collections)
+    if versions is None:
+        rows = db.exec(_versions_stmt(user_id, collections)).all()
+        versions = _remember(db, user_id, collections, rows)
+    return versions
+
+
+async def current_async(
+    db: AsyncDBSession, user_id: int, collections: Sequence[str]
+) -> Dict[str, int]:
+    versions = _recall(db, user_id, collections)
+    if versions is None:
+        rows = (await db.exec(_versions_stmt(user_id, collections))).all()
+        versions = _remember(db, user_id, collections, rows)
+    return versions
@@ -4,31 +4,47 @@ from pydantic import BaseModel
 from fastapi import HTTPException
 from sqlalchemy import func
 from sqlmodel import Session as DBSession, select
+from sqlmodel.ext.asyncio.session import AsyncSession as AsyncDBSession
 
 
 from ..models import (
     WorkoutTemplate,
     WorkoutItem,
-    Exercise,
     Session,
     SessionItem,
     Muscle,
     ExerciseMuscle,
 )
 from ..schemas import WorkoutItemCreate, WorkoutTemplateCreate
+from . import exercise_cache, stamps
 from .common import ensure_owner
+from .search import name_search, search_dialect, search_dialect_async
+from ..tracing import traced
 
 
+def _list_templates_stmt(user_id: int, q: Optional[str], dialect: str):
+    stmt = select(WorkoutTemplate).where(WorkoutTemplate.user_id == user_id)
+    if q and q.strip():
+        stmt = name_search(stmt, WorkoutTemplate, q, dialect)
+    return stmt.order_by(WorkoutTemplate.id.desc())
+
+
+@traced()
 def list_templates(
     db: DBSession, user_id: int, q: Optional[str]
 ) -> List[WorkoutTemplate]:
-    stmt = select(WorkoutTemplate).where(WorkoutTemplate.user_id == user_id)
-    if q:
-        stmt = stmt.where(func.lower(WorkoutTemplate.name).like(f"%{q.lower()}%"))
-    stmt = stmt.order_by(WorkoutTemplate.id.desc())
-    return db.exec(stmt).all()
+    return db.exec(_list_templates_stmt(user_id, q, search_dialect(db))).all()
+
 
+@traced()
+async def list_templates_async(
+    db: AsyncDBSession, user_id: int, q: Optional[str]
+) -> List[WorkoutTemplate]:
+    dialect = await search_dialect_async(db)
+    return (await db.exec(_list_templates_stmt(user_id, q, dialect))).all()
 
+
+@traced()
 def create_template(
     db: DBSession, user_id: int, payload: WorkoutTemplateCreate
 ) -> WorkoutTemplate:
@@ -37,17 +53,20 @@ def create_template(
         raise HTTPException(status_code=400, detail="name is required")
     t = WorkoutTemplate(name=name, notes=(payload.notes or None), user_id=user_id)
     db.add(t)
+    stamps.bump(db, user_id, stamps.WORKOUTS)
     db.commit()
     db.refresh(t)
     return t
 
 
+@traced()
 def get_template(db: DBSession, user_id: int, template_id: int) -> WorkoutTemplate:
     t = db.get(WorkoutTemplate, template_id)
     ensure_owner(t, user_id, "template")
     return t  # type: ignore
 
 
+@traced()
 def delete_template(db: DBSession, user_id: int, template_id: int) -> None:
     t = db.get(WorkoutTemplate, template_id)
     ensure_owner(t, user_id, "template")
@@ -57,30 +76,44 @@ def delete_template(db: DBSession, user_id: int, template_id: int) -> None:
     for it in items:
         db.delete(it)
     db.delete(t)
+    stamps.bump(db, user_id, stamps.WORKOUTS)
     db.commit()
 
 
+def _template_items_stmt(template_id: int):
+    return (
+        select(WorkoutItem)
+        .where(WorkoutItem.workout_template_id == template_id)
+        .order_by(WorkoutItem.order_index.asc(), WorkoutItem.id.asc())
+    )
+
+
+@traced()
 def list_template_items(
     db: DBSession, user_id: int, template_id: int
 ) -> List[WorkoutItem]:
     t = db.get(WorkoutTemplate, template_id)
     ensure_owner(t, user_id, "template")
-    stmt = (
-        select(WorkoutItem)
-        .where(WorkoutItem.workout_template_id == template_id)
-        .order_by(WorkoutItem.order_index.asc(), WorkoutItem.id.asc())
-    )
-    return db.exec(stmt).all()
+    return db.exec(_template_items_stmt(template_id)).all()
+
+
+@traced()
+async def list_template_items_async(
+    db: AsyncDBSession, user_id: int, template_id: int
+) -> List[WorkoutItem]:
+    t = await db.get(WorkoutTemplate, template_id)
+    ensure_owner(t, user_id, "template")
+    return (await db.exec(_template_items_stmt(template_id))).all()
 
 
+@traced()
 def add_template_item(
     db: DBSession, user_id: int, template_id: int, payload: WorkoutItemCreate
 ) -> WorkoutItem:
     t = db.get(WorkoutTemplate, template_id)
     ensure_owner(t, user_id, "template")
 
-    ex = db.get(Exercise, payload.exercise_id)
-    if not ex or ex.user_id != user_id:
+    if exercise_cache.owned_exercise(db, user_id, payload.exercise_id) is None:
         raise HTTPException(status_code=404, detail="exercise not found")
 
     cur_max = (
@@ -109,6 +142,7 @@ def add_template_item(
         notes=(payload.notes or None),
     )
     db.add(it)
+    stamps.bump(db, user_id, stamps.WORKOUTS)
     db.commit()
     db.refresh(it)
 
@@ -121,6 +155,7 @@ def add_template_item(
         if obj.order_index != idx:
             obj.order_index = idx
             db.add(obj)
+    stamps.bump(db, user_id, stamps.WORKOUTS)
     db.commit()
     return it
 
@@ -137,6 +172,7 @@ class WorkoutItemUpdate(BaseModel):
     order_index: Optional[int] = None
 
 
+@traced()
 def update_template_item(
     db: DBSession, user_id: int, item_id: int, payload: WorkoutItemUpdate
 ) -> WorkoutItem:
@@ -151,11 +187,13 @@ def update_template_item(
         setattr(it, field, value)
 
     db.add(it)
+    stamps.bump(db, user_id, stamps.WORKOUTS)
     db.commit()
     db.refresh(it)
     return it
 
 
+@traced()
 def delete_template_item(db: DBSession, user_id: int, item_id: int) -> None:
     it = db.get(WorkoutItem, item_id)
     if not it:
@@ -165,6 +203,7 @@ def delete_template_item(db: DBSession, user_id: int, item_id: int) -> None:
 
     template_id = it.workout_template_id
     db.delete(it)
+    stamps.bump(db, user_id, stamps.WORKOUTS)
     db.commit()
 
     items = db.exec(
@@ -176,9 +215,11 @@ def delete_template_item(db: DBSession, user_id: int, item_id: int) -> None:
         if obj.order_index != idx:
             obj.order_index = idx
             db.add(obj)
+    stamps.bump(db, user_id, stamps.WORKOUTS)
     db.commit()
 
 
+@traced()
 def make_session_from_template(
     db: DBSession,
     user_id: int,
@@ -204,6 +245,7 @@ def make_session_from_template(
         workout_template_id=t.id,
     )
     db.add(ss)
+    stamps.bump(db, user_id, stamps.SESSIONS)
     db.commit()
     db.refresh(ss)
 
@@ -220,11 +262,13 @@ def make_session_from_template(
             notes=src.notes,
         )
         db.add(si)
+    stamps.bump(db, user_id, stamps.SESSIONS)
     db.commit()
     db.refresh(ss)
     return ss
 
 
+@traced()
 def template_muscles(db: DBSession, user_id: int, template_id: int):
     t = db.get(WorkoutTemplate, template_id)
     ensure_owner(t, user_id, "template")
@@ -253,6 +297,7 @@ def template_muscles(db: DBSession, user_id: int, template_id: int):
     return {"template_id": template_id, "primary": prim, "secondary": sec}
 
 
+@traced()
 def resequence_template(db: DBSession, user_id: int, template_id: int) -> None:
     t = db.get(WorkoutTemplate, template_id)
     ensure_owner(t, user_id, "template")
@@ -266,4 +311,5 @@ def resequence_template(db: DBSession, user_id: int, template_id: int) -> None:
         if obj.order_index != idx:
             obj.order_index = idx
             db.add(obj)
+    stamps.bump(db, user_id, stamps.WORKOUTS)
     db.commit()
@@ -0,0 +1,324 @@
+"""Lightweight request tracing.
+
+Every request gets a root span (app.middleware), service functions decorated
+with `@traced()` and WGER fetches get child spans, and each SQL statement is
+recorded as a span by app.query_monitor. The current span lives in a context
+variable, so it follows the request into the threadpool and into
+`asyncio.gather` tasks.
+
+Finished spans are batched on a background thread and written by the
+exporter chosen with TRACE_EXPORTER:
+
+    none  (default) tracing off; `start_span` / `@traced` cost one flag check
+    file  JSON lines in TRACE_FILE (default traces.jsonl)
+    otlp  OTLP/HTTP JSON to $OTEL_EXPORTER_OTLP_ENDPOINT/v1/traces, e.g. a
+          local OpenTelemetry Collector or Jaeger on http://localhost:4318
+
+TRACE_SAMPLE_RATE (0..1) samples whole traces at the root span. The trace id
+is returned in the X-Trace-Id response header and attached as an exemplar to
+http_request_latency_seconds (OpenMetrics scrapes, single-process mode).
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 1.0))
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "fitness-tracker")
+ENABLED = TRACE_EXPORTER != "none"
+
+_BATCH_SIZE = 512
+_FLUSH_SECONDS = 1.0
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start_ns: int
+    end_ns: int = 0
+    attributes: dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+@contextmanager
+def start_span(name: str, root: bool = False, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child span of the current span; `root=True` starts a new (sampled) trace.
+
+    Yields None when tracing is off, the trace was not sampled, or a child span
+    is requested outside any trace.
+    """
+    parent = _current_span.get() if ENABLED else None
+    if root:
+        parent = None
+        sampled = ENABLED and random.random() < TRACE_SAMPLE_RATE
+    else:
+        sampled = parent is not None
+    if not sampled:
+        yield None
+        return
+
+    span = Span(
+        trace_id=parent.trace_id if parent else _new_id(128),
+        span_id=_new_id(64),
+        parent_id=parent.span_id if parent else None,
+        name=name,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        span.end_ns = time.time_ns()
+        _current_span.reset(token)
+        _processor().submit(span)
+
+
+def record_span(name: str, duration: float, **attributes: Any) -> None:
+    """Record an already finished child span (ending now) of the current span."""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    end = time.time_ns()
+    _processor().submit(
+        Span(
+            trace_id=parent.trace_id,
+            span_id=_new_id(64),
+            parent_id=parent.span_id,
+            name=name,
+            start_ns=end - int(duration * 1e9),
+            end_ns=end,
+            attributes=attributes,
+        )
+    )
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator: run the function in a child span named `module.function`."""
+
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not ENABLED or _current_span.get() is None:
+                    return await fn(*args, **kwargs)
+                with start_span(span_name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED or _current_span.get() is None:
+                return fn(*args, **kwargs)
+            with start_span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+# ---------- Exporters ----------
+class FileExporter:
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPExporter:
+    """OTLP/HTTP with the JSON encoding; no OpenTelemetry SDK required."""
+
+    def __init__(self, endpoint: str) -> None:
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+
+    def payload(self, spans: List[Span]) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [
+                                {
+                                    "traceId": s.trace_id,
+                                    "spanId": s.span_id,
+                                    "parentSpanId": s.parent_id or "",
+                                    "name": s.name,
+                                    "kind": 1 if s.parent_id else 2,  # internal / server
+                                    "startTimeUnixNano": str(s.start_ns),
+                                    "endTimeUnixNano": str(s.end_ns),
+                                    "attributes": [
+                                        {"key": k, "value": _otlp_value(v)}
+                                        for k, v in s.attributes.items()
+                                    ],
+                                    "status": (
+                                        {"code": 2, "message": s.error}
+                                        if s.error
+                                        else {"code": 1}
+                                    ),
+                                }
+                                for s in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def export(self, spans: List[Span]) -> None:
+        import httpx
+
+        httpx.post(self.url, json=self.payload(spans), timeout=5.0).raise_for_status()
+
+
+class _BatchProcessor:
+    """Hands finished spans to the exporter on a daemon thread, in batches."""
+
+    def __init__(self, exporter) -> None:
+        self.exporter = exporter
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=10_000)
+        self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> None:
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _run(self) -> None:
+        batch: List[Span] = []
+        while True:
+            try:
+                item = self._queue.get(timeout=_FLUSH_SECONDS)
+            except queue.Empty:
+                item = None
+            if isinstance(item, Span):
+                batch.append(item)
+                if len(batch) < _BATCH_SIZE:
+                    continue
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception:  # tracing must never break the app
+                    logger.warning("Exporting %d spans failed", len(batch), exc_info=True)
+                batch = []
+            if isinstance(item, threading.Event):
+                item.set()
+
+
+_proc: Optional[_BatchProcessor] = None
+_proc_lock = threading.Lock()
+
+
+def _default_exporter():
+    if TRACE_EXPORTER == "otlp":
+        return OTLPExporter(TRACE_OTLP_ENDPOINT)
+    return FileExporter(TRACE_FILE)
+
+
+def _processor() -> _BatchProcessor:
+    global _proc
+    if _proc is None:
+        with _proc_lock:
+            if _proc is None:
+                _proc = _BatchProcessor(_default_exporter())
+    return _proc
+
+
+def configure(exporter=None, enabled: bool = True) -> None:
+    """Switch tracing on/off at runtime and optionally replace the exporter."""
+    global ENABLED, _proc
+    ENABLED = enabled
+    if exporter is not None:
+        with _proc_lock:
+            _proc = _BatchProcessor(exporter)
+
+
+def flush(timeout: float = 5.0) -> None:
+    """Block until spans finished so far have been exported."""
+    if _proc is not None:
+        _proc.flush(timeout)
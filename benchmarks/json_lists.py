@@ -0,0 +1,118 @@
+"""Serialization cost of a 1k-row list endpoint.
+
+Drives a minimal FastAPI app in-process (no sockets, no database) whose two
+routes return the same `Session` ORM rows: one the default way
+(`response_model=List[SessionRead]`: re-validate, then stdlib json) and one
+through app.responses.list_response (no re-validation, orjson). Each is
+measured with and without `Accept-Encoding: gzip` behind GZipMiddleware.
+Prints milliseconds per request and the response size.
+
+    python benchmarks/json_lists.py --rows 1000 --requests 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import os
+import sys
+import time
+from typing import List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def _build(rows: int):
+    from fastapi import FastAPI
+    from fastapi.middleware.gzip import GZipMiddleware
+
+    from app.models import Session
+    from app.responses import GZIP_MIN_SIZE, list_response
+    from app.schemas import SessionRead
+
+    now = dt.datetime(2024, 1, 1, 12, 30, 15, 123456)
+    data = [
+        Session(
+            id=i,
+            user_id=1,
+            date=dt.date(2024, 1, 1) + dt.timedelta(days=i % 365),
+            title=f"Session {i}",
+            notes="Felt strong today, added 2.5kg on the last set",
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(rows)
+    ]
+
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
+    @app.get("/validated", response_model=List[SessionRead])
+    def validated():
+        return data
+
+    @app.get("/fast", response_model=List[SessionRead])
+    def fast():
+        return list_response(SessionRead, data)
+
+    return app
+
+
+async def _drive(app, path: str, gzip: bool, requests: int):
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    headers = [(b"host", b"bench")]
+    if gzip:
+        headers.append((b"accept-encoding", b"gzip"))
+    start = time.perf_counter()
+    for _ in range(requests):
+        size = 0
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": headers,
+            "client": ("127.0.0.1", 1234),
+            "server": ("bench", 80),
+        }
+        await app(scope, receive, send)
+    return time.perf_counter() - start, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    app = _build(args.rows)
+    for path in ("/validated", "/fast"):
+        for gzip in (False, True):
+            asyncio.run(_drive(app, path, gzip, 10))  # warm up
+            elapsed, size = asyncio.run(_drive(app, path, gzip, args.requests))
+            label = f"{path[1:]}{' +gzip' if gzip else ''}"
+            print(
+                f"{label:>16}: {elapsed / args.requests * 1000:7.2f} ms/request  "
+                f"{size / 1024:7.1f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Load test: sync (threadpool) vs async (DB_ASYNC=true) read endpoints.
+
+Boots the app under Uvicorn once per mode against a seeded temporary SQLite
+database, drives the hot GET endpoints with concurrent clients for a fixed
+duration and prints requests per second and latency percentiles.
+
+    python benchmarks/load_async.py --concurrency 32 --duration 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server at {base} did not become ready")
+
+
+def _seed(base: str, exercises: int) -> tuple[httpx.Cookies, list[str]]:
+    creds = {"email": "load@example.com", "password": "secret123"}
+    with httpx.Client(base_url=base) as c:
+        c.post("/api/auth/register", json=creds)
+        c.post("/api/auth/login", json=creds).raise_for_status()
+        ex_ids = [
+            c.post(
+                "/api/exercises", json={"name": f"Lift {i}", "category": "strength"}
+            ).json()["id"]
+            for i in range(exercises)
+        ]
+        tpl = c.post("/api/workouts", json={"name": "Load Day"}).json()
+        for ex_id in ex_ids[:8]:
+            c.post(f"/api/workouts/{tpl['id']}/items", json={"exercise_id": ex_id})
+        sess = c.post(
+            "/api/sessions",
+            json={"date": dt.date.today().isoformat(), "workout_template_id": tpl["id"]},
+        ).json()
+        paths = [
+            "/api/exercises?limit=200",
+            "/api/sessions",
+            f"/api/sessions/{sess['id']}/items",
+            "/api/workouts",
+            f"/api/workouts/{tpl['id']}/items",
+        ]
+        return c.cookies, paths
+
+
+async def _drive(
+    base: str, cookies: httpx.Cookies, paths: list[str], concurrency: int, duration: float
+) -> tuple[list[float], int, float]:
+    latencies: list[float] = []
+    errors = 0
+    started = time.monotonic()
+    deadline = started + duration
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base, cookies=cookies, limits=limits, timeout=60.0
+    ) as client:
+
+        async def worker(offset: int) -> None:
+            nonlocal errors
+            i = offset
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    r = await client.get(paths[i % len(paths)])
+                    ok = r.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                if not ok:
+                    errors += 1
+                i += 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return latencies, errors, time.monotonic() - started
+
+
+def run_mode(async_mode: bool, concurrency: int, duration: float, exercises: int) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'load.db')}",
+            DB_ASYNC="true" if async_mode else "false",
+        )
+        subprocess.run(
+            [sys.executable, "-m", "app.migrations", "upgrade"],
+            cwd=ROOT,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        proc = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "app.main:app",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+            ],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_ready(base)
+            cookies, paths = _seed(base, exercises)
+            latencies, errors, elapsed = asyncio.run(
+                _drive(base, cookies, paths, concurrency, duration)
+            )
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "mode": "async" if async_mode else "sync",
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(q[49] * 1000, 1),
+        "p99_ms": round(q[98] * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--exercises", type=int, default=100, help="seeded library size")
+    args = parser.parse_args()
+
+    print(f"concurrency={args.concurrency} duration={args.duration}s")
+    for async_mode in (False, True):
+        r = run_mode(async_mode, args.concurrency, args.duration, args.exercises)
+        print(
+            f"{r['mode']:>5}: {r['rps']:>8} req/s  p50={r['p50_ms']}ms "
+            f"p99={r['p99_ms']}ms  requests={r['requests']} errors={r['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Login storm: API latency while many clients hit /api/auth/login at once.
+
+Boots the app under Uvicorn against a temporary SQLite database and
+measures `GET /api/exercises` latency alone, then again while a storm of
+concurrent logins runs. Repeated with PASSWORD_WORKERS=0 and no queue
+limit (argon2 in the request threadpool, the old behaviour) and with the
+bounded process pool.
+
+    python benchmarks/login_storm.py --storm 64 --duration 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CREDS = {"email": "storm@example.com", "password": "secret123"}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server at {base} did not become ready")
+
+
+def _pct(values: list[float], p: int) -> float:
+    if len(values) < 2:
+        return round((values or [0.0])[0] * 1000, 1)
+    return round(statistics.quantiles(values, n=100)[p - 1] * 1000, 1)
+
+
+async def _probe(base: str, cookies: httpx.Cookies, duration: float, clients: int) -> list[float]:
+    """Steady API traffic; returns latencies of GET /api/exercises."""
+    latencies: list[float] = []
+    deadline = time.monotonic() + duration
+    async with httpx.AsyncClient(base_url=base, cookies=cookies, timeout=60.0) as c:
+
+        async def worker() -> None:
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                await c.get("/api/exercises")
+                latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(worker() for _ in range(clients)))
+    return latencies
+
+
+async def _storm(base: str, duration: float, concurrency: int) -> dict:
+    statuses: dict[int, int] = {}
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60.0) as c:
+
+        async def worker() -> None:
+            while time.monotonic() < deadline:
+                try:
+                    status = (await c.post("/api/auth/login", json=CREDS)).status_code
+                except httpx.HTTPError:
+                    status = 0
+                statuses[status] = statuses.get(status, 0) + 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return statuses
+
+
+async def _measure(base: str, cookies: httpx.Cookies, args) -> dict:
+    calm = await _probe(base, cookies, args.duration / 2, args.probes)
+    storm, statuses = await asyncio.gather(
+        _probe(base, cookies, args.duration, args.probes),
+        _storm(base, args.duration, args.storm),
+    )
+    return {
+        "calm_p50": _pct(calm, 50),
+        "calm_p99": _pct(calm, 99),
+        "storm_p50": _pct(storm, 50),
+        "storm_p99": _pct(storm, 99),
+        "logins": statuses,
+    }
+
+
+def run_mode(workers: int, args) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'storm.db')}",
+            PASSWORD_WORKERS=str(workers),
+        )
+        if workers == 0:
+            env["PASSWORD_QUEUE_LIMIT"] = "1000000"
+        subprocess.run(
+            [sys.executable, "-m", "app.migrations", "upgrade"],
+            cwd=ROOT,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_ready(base)
+            with httpx.Client(base_url=base, timeout=60.0) as c:
+                c.post("/api/auth/register", json=CREDS)
+                c.post("/api/auth/login", json=CREDS).raise_for_status()
+                cookies = c.cookies
+            result = asyncio.run(_measure(base, cookies, args))
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    result["mode"] = f"PASSWORD_WORKERS={workers}"
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--storm", type=int, default=64, help="concurrent login clients")
+    parser.add_argument("--probes", type=int, default=4, help="concurrent API clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="storm seconds per mode")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    print(f"storm={args.storm} probes={args.probes} duration={args.duration}s")
+    for workers in (0, args.workers):
+        r = run_mode(workers, args)
+        print(
+            f"{r['mode']:>20}: GET /api/exercises p50 {r['calm_p50']} -> {r['storm_p50']}ms, "
+            f"p99 {r['calm_p99']} -> {r['storm_p99']}ms  logins={r['logins']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
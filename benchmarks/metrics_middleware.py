@@ -0,0 +1,111 @@
+"""Per-request cost of the HTTP metrics middleware.
+
+Drives a minimal FastAPI app in-process (no sockets) through three stacks:
+no middleware, the previous `@app.middleware("http")` wrapper labelled by
+raw path, and app.middleware.MetricsMiddleware. Prints microseconds per
+request and the number of http_requests_total series each stack created.
+
+    python benchmarks/metrics_middleware.py --requests 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def _build(kind: str):
+    from fastapi import FastAPI, Request
+    from prometheus_client import CollectorRegistry, Counter, Histogram
+
+    from app.middleware import MetricsMiddleware
+
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        return {"id": item_id}
+
+    if kind == "base_http":
+        registry = CollectorRegistry()
+        count = Counter("bench_requests", "", ["method", "path", "status"], registry=registry)
+        latency = Histogram("bench_latency", "", ["method", "path"], registry=registry)
+
+        @app.middleware("http")
+        async def metrics_middleware(request: Request, call_next):
+            start = time.perf_counter()
+            response = await call_next(request)
+            count.labels(request.method, request.url.path, str(response.status_code)).inc()
+            latency.labels(request.method, request.url.path).observe(
+                time.perf_counter() - start
+            )
+            return response
+
+        return app, lambda: len(list(count.collect())[0].samples) // 2
+    if kind == "asgi":
+        from app.metrics import REQUEST_COUNT
+
+        app.add_middleware(MetricsMiddleware)
+
+        def series() -> int:
+            return sum(
+                1
+                for s in list(REQUEST_COUNT.collect())[0].samples
+                if s.name.endswith("_total") and s.labels["route"] == "/items/{item_id}"
+            )
+
+        return app, series
+    return app, lambda: 0
+
+
+async def _drive(app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(requests):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/items/{i}",
+            "raw_path": f"/items/{i}".encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 1234),
+            "server": ("bench", 80),
+        }
+        await app(scope, receive, send)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    for kind in ("none", "base_http", "asgi"):
+        app, series = _build(kind)
+        asyncio.run(_drive(app, 500))  # warm up, builds the middleware stack
+        elapsed = asyncio.run(_drive(app, args.requests))
+        print(
+            f"{kind:>10}: {elapsed / args.requests * 1e6:8.1f} us/request  "
+            f"request series={series()}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Exercise name search over a large library: LIKE scan vs. the search index.
+
+Builds a migrated temporary SQLite database holding one user with --rows
+exercises, then times `exercises_service.list_exercises` for a handful of
+queries, once through the index (app.services.search) and once with the
+previous `lower(name) LIKE '%q%'` filter ordered by id.
+
+    python benchmarks/name_search.py --rows 100000 --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+WORDS = (
+    "bench press squat deadlift row curl extension raise fly pulldown lunge "
+    "dip pushup pullup shrug kickback thrust bridge plank crunch"
+).split()
+MODIFIERS = (
+    "incline decline seated standing single-arm dumbbell barbell cable machine "
+    "kettlebell banded paused tempo deficit sumo front overhead reverse"
+).split()
+QUERIES = ("press", "bench press", "dumbbell curl", "sumo deadlift", "pullover")
+
+
+def _setup(db_path: str, rows: int):
+    from sqlmodel import create_engine
+
+    from app.migrations import upgrade
+
+    eng = create_engine(f"sqlite:///{db_path}")
+    upgrade(eng)
+    rnd = random.Random(0)
+    with eng.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO user (email, password_hash, created_at) "
+            "VALUES ('bench@example.com', 'x', CURRENT_TIMESTAMP)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO exercise (user_id, name, category, source) VALUES (?, ?, ?, ?)",
+            [
+                (1, f"{' '.join(rnd.sample(MODIFIERS, 2))} {rnd.choice(WORDS)} {i}",
+                 "strength", "local")
+                for i in range(rows)
+            ],
+        )
+    return eng
+
+
+def _like(db, q: str, limit: int):
+    from sqlalchemy import func
+    from sqlmodel import select
+
+    from app.models import Exercise
+
+    stmt = (
+        select(Exercise)
+        .where(Exercise.user_id == 1)
+        .where(func.lower(Exercise.name).like(f"%{q.lower()}%"))
+        .order_by(Exercise.id.desc())
+        .limit(limit)
+    )
+    return db.exec(stmt).all()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    from sqlmodel import Session
+
+    from app.services import exercises_service as svc
+    from app.services.search import sqlite_trigram_available
+
+    if not sqlite_trigram_available():
+        sys.exit("This SQLite has no FTS5 trigram tokenizer (needs 3.34+).")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        eng = _setup(os.path.join(tmp, "search.db"), args.rows)
+        print(f"loaded {args.rows} exercises in {time.perf_counter() - start:.1f}s")
+        with Session(eng) as db:
+            for q in QUERIES:
+                results = {}
+                for label, run in (
+                    ("like", lambda: _like(db, q, args.limit)),
+                    ("index", lambda: svc.list_exercises(db, 1, q, None, args.limit, 0)),
+                ):
+                    run()  # warm up
+                    samples = []
+                    for _ in range(args.repeat):
+                        t = time.perf_counter()
+                        found = run()
+                        samples.append((time.perf_counter() - t) * 1000)
+                    results[label] = (statistics.median(samples), len(found))
+                print(
+                    f"{q!r:>16}: like {results['like'][0]:7.2f}ms ({results['like'][1]:3d} rows)"
+                    f"  index {results['index'][0]:7.2f}ms ({results['index'][1]:3d} rows)"
+                )
+        eng.dispose()
+
+
+if __name__ == "__main__":
+    main()
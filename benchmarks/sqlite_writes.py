@@ -0,0 +1,148 @@
+"""Write-throughput benchmark for the SQLite profiles in app/db.py.
+
+Concurrent clients log sessions (create_session + add_item) through the
+service layer, first with the default SQLite engine and then with
+SQLITE_PRODUCTION=true. Clients are threads spread over several processes,
+like requests spread over Uvicorn workers.
+
+    python benchmarks/sqlite_writes.py --clients 8 --processes 2 --writes 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def _setup(db_path: str) -> tuple[int, int]:
+    """Create the schema plus one user and one exercise; return their ids."""
+    import sqlite3
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from sqlmodel import Session, create_engine
+
+    from app import models
+    from app.migrations import upgrade
+
+    eng = create_engine(os.environ["DATABASE_URL"])
+    upgrade(eng)
+    with Session(eng) as s:
+        user = models.User(email="bench@example.com", password_hash="x")
+        s.add(user)
+        s.commit()
+        ex = models.Exercise(user_id=user.id, name="Bench Squat")
+        s.add(ex)
+        s.commit()
+        ids = (user.id, ex.id)
+    eng.dispose()
+    sqlite3.connect(db_path).execute("PRAGMA journal_mode=DELETE").close()
+    return ids
+
+
+def _client_process(threads: int, writes: int, user_id: int, exercise_id: int) -> dict:
+    """Runs inside a child process with DATABASE_URL/SQLITE_PRODUCTION set."""
+    from sqlalchemy.exc import OperationalError
+    from sqlmodel import Session
+
+    from app import db
+    from app.schemas import SessionCreate, SessionItemCreate
+    from app.services import sessions_service as svc
+
+    ok = 0
+    locked = 0
+    lock = threading.Lock()
+
+    def client() -> None:
+        nonlocal ok, locked
+        for _ in range(writes):
+            try:
+                with Session(db.engine) as s:
+                    sess = svc.create_session(
+                        s, user_id, SessionCreate(date=dt.date.today(), title="bench")
+                    )
+                    svc.add_item(
+                        s, user_id, sess.id, SessionItemCreate(exercise_id=exercise_id)
+                    )
+                with lock:
+                    ok += 1
+            except OperationalError:
+                with lock:
+                    locked += 1
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return {"ok": ok, "locked": locked, "elapsed": time.perf_counter() - start}
+
+
+def run_mode(production: bool, clients: int, processes: int, writes: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        user_id, exercise_id = _setup(db_path)
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+        env["SQLITE_PRODUCTION"] = "true" if production else "false"
+        per_proc = max(1, clients // processes)
+        procs = [
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    __file__,
+                    "--child",
+                    json.dumps([per_proc, writes, user_id, exercise_id]),
+                ],
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+            for _ in range(processes)
+        ]
+        results = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+    ok = sum(r["ok"] for r in results)
+    elapsed = max(r["elapsed"] for r in results)
+    return {
+        "mode": "production" if production else "default",
+        "ok": ok,
+        "locked": sum(r["locked"] for r in results),
+        "elapsed_s": round(elapsed, 3),
+        "writes_per_s": round(ok / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--writes", type=int, default=50, help="writes per client")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_client_process(*json.loads(args.child))))
+        return
+
+    print(f"clients={args.clients} processes={args.processes} writes/client={args.writes}")
+    for production in (False, True):
+        r = run_mode(production, args.clients, args.processes, args.writes)
+        print(
+            f"{r['mode']:>10}: {r['writes_per_s']:>8} writes/s  "
+            f"ok={r['ok']} locked={r['locked']} elapsed={r['elapsed_s']}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Worker startup time: cold `import app.main` and time to first request.
+
+Each measurement runs in a fresh interpreter against a migrated temporary
+SQLite database:
+
+- import: wall time of `python -c "import app.main"`;
+- first request: from spawning Uvicorn until `GET /health` returns 200
+  (import + lifespan startup + first request).
+
+Exits with status 1 when a median exceeds its budget, so CI can catch
+startup regressions.
+
+    python benchmarks/startup.py --runs 5 --import-budget-ms 1500 --first-request-budget-ms 3000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_import(env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def time_first_request(env: dict, timeout: float = 30.0) -> float:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(url, timeout=1.0).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.005)
+        raise RuntimeError("server did not answer /health in time")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=1500.0)
+    parser.add_argument("--first-request-budget-ms", type=float, default=3000.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}")
+        subprocess.run(
+            [sys.executable, "-m", "app.migrations", "upgrade"],
+            cwd=ROOT,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        imports = [time_import(env) * 1000 for _ in range(args.runs)]
+        firsts = [time_first_request(env) * 1000 for _ in range(args.runs)]
+
+    failed = False
+    for label, samples, budget in (
+        ("import app.main", imports, args.import_budget_ms),
+        ("first request", firsts, args.first_request_budget_ms),
+    ):
+        median = statistics.median(samples)
+        ok = median <= budget
+        failed |= not ok
+        print(
+            f"{label:>16}: median {median:7.1f}ms  min {min(samples):7.1f}ms  "
+            f"budget {budget:.0f}ms  {'ok' if ok else 'OVER BUDGET'}"
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
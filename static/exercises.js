@@ -129,13 +129,13 @@ function showUsageModal(usage) {
   }
   if (links) {
     links.innerHTML = "";
-    if (usage.workouts && usage.workouts.length) {
+    if (usage.counts.workouts > 0) {
       const a = document.createElement("a");
       a.href = `/workouts?exercise_id=${usage.exercise.id}`;
       a.textContent = "View related workouts";
       links.appendChild(a);
     }
-    if (usage.sessions && usage.sessions.length) {
+    if (usage.counts.sessions > 0) {
       const a = document.createElement("a");
       a.href = `/sessions?exercise_id=${usage.exercise.id}`;
       a.textContent = "View related sessions";
@@ -261,7 +261,7 @@ async function deleteExercise(id) {
 
   if (res.status === 409) {
     try {
-      const usageRes = await apiFetch(`/api/exercises/${id}/usage`);
+      const usageRes = await apiFetch(`/api/exercises/${id}/usage?counts_only=true`);
       if (usageRes.ok) {
         const usage = await usageRes.json();
         return { status: "in_use", usage };
@@ -271,7 +271,7 @@ async function deleteExercise(id) {
     }
     return {
       status: "in_use",
-      usage: { exercise: { id, name: "This exercise" }, workouts: [], sessions: [], counts: { workouts: 0, sessions: 0 } }
+      usage: { exercise: { id, name: "This exercise" }, counts: { workouts: 0, sessions: 0 } }
     };
   }
 
@@ -33,6 +33,7 @@ function h(tag, attrs={}, ...kids){
 const state = {
   workouts: [],
   sessions: [],
+  sessionsCursor: null,   // X-Next-Cursor of the last loaded page
   selectedId: null,
   sessionMap: new Map(),
   items: [],
@@ -56,8 +57,10 @@ async function apiListSessions(params={}){
   if (params.on_date) qs.set('on_date', params.on_date);
   if (params.start_date) qs.set('start_date', params.start_date);
   if (params.end_date) qs.set('end_date', params.end_date);
+  if (params.cursor) qs.set('cursor', params.cursor);
   const res = await apiFetch('/api/sessions' + (qs.toString() ? `?${qs}` : ''));
-  return res.ok ? res.json() : [];
+  if (!res.ok) return { rows: [], next: null };
+  return { rows: await res.json(), next: res.headers.get('X-Next-Cursor') };
 }
 
 async function apiCreateSession(payload){
@@ -118,6 +121,12 @@ function renderSessionList(){
     btn.addEventListener('click', () => selectSession(s.id));
     box.appendChild(btn);
   });
+  if (state.sessionsCursor) {
+    const more = h('button', { class:'btn-small', style:'width:100%; margin-top:6px' });
+    more.textContent = 'Load older sessions';
+    more.addEventListener('click', loadOlderSessions);
+    box.appendChild(more);
+  }
 }
 
 function setEditorEnabled(enabled){
@@ -345,8 +354,18 @@ async function refreshItems(){
   renderItems();
 }
 
+async function loadOlderSessions(){
+  const page = await apiListSessions({ cursor: state.sessionsCursor });
+  state.sessions = state.sessions.concat(page.rows);
+  state.sessionsCursor = page.next;
+  page.rows.forEach(s => state.sessionMap.set(s.id, s));
+  renderSessionList();
+}
+
 async function refreshSessionsList(){
-  state.sessions = await apiListSessions({});
+  const page = await apiListSessions({});
+  state.sessions = page.rows;
+  state.sessionsCursor = page.next;
   state.sessionMap.clear();
   state.sessions.forEach(s => state.sessionMap.set(s.id, s));
   renderSessionList();
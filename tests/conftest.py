@@ -10,9 +10,11 @@ if ROOT not in sys.path:
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import create_engine, Session
 
 from app.main import app
+from app.auth import user_cache
+from app.services.exercise_cache import exercise_cache
 from app.db import get_session as prod_get_session
 
 
@@ -38,10 +40,9 @@ def _engine(_test_db_url):
         {"check_same_thread": False} if _test_db_url.startswith("sqlite") else {}
     )
     engine = create_engine(_test_db_url, connect_args=connect_args)
-    # Import models to register metadata, then create tables
-    from app import models  # noqa: F401
+    from app.migrations import upgrade
 
-    SQLModel.metadata.create_all(engine)
+    upgrade(engine)
     return engine
 
 
@@ -59,6 +60,8 @@ def client(db, _engine):
             yield s
 
     app.dependency_overrides[prod_get_session] = _get_session_override
+    user_cache.clear()
+    exercise_cache.clear()
     try:
         with TestClient(app) as c:
             yield c
@@ -0,0 +1,80 @@
+import gzip
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app import assets
+
+
+def _site(tmp_path):
+    src = tmp_path / "static"
+    src.mkdir()
+    (src / "config.js").write_text('export const API_BASE = "";\n')
+    (src / "app.js").write_text('import { API_BASE } from "./config.js";\nconsole.log(API_BASE);\n')
+    (src / "logo.png").write_bytes(b"\x89PNG fake")
+    return src
+
+
+def test_build_fingerprints_and_rewrites_imports(tmp_path):
+    src = _site(tmp_path)
+    manifest = assets.build(src)
+    dist = src / "dist"
+
+    assert manifest["config.js"].startswith("config.") and manifest["config.js"] != "config.js"
+    app_js = (dist / manifest["app.js"]).read_text()
+    assert f'from "./{manifest["config.js"]}"' in app_js
+    assert gzip.decompress((dist / f'{manifest["app.js"]}.gz').read_bytes()).decode() == app_js
+    assert not (dist / f'{manifest["logo.png"]}.gz').exists()
+
+    # A change to an imported module renames its importers too.
+    (src / "config.js").write_text('export const API_BASE = "/api";\n')
+    rebuilt = assets.build(src)
+    assert rebuilt["app.js"] != manifest["app.js"]
+    assert rebuilt["logo.png"] == manifest["logo.png"]
+
+
+def test_precompressed_variant_and_immutable_caching(tmp_path):
+    src = _site(tmp_path)
+    manifest = assets.build(src)
+    app = Starlette(routes=[Mount("/static", assets.PrecompressedStaticFiles(directory=src))])
+    url = f'/static/dist/{manifest["app.js"]}'
+
+    with TestClient(app) as c:
+        r = c.get(url, headers={"Accept-Encoding": "gzip"})
+        assert r.status_code == 200
+        assert r.headers["content-encoding"] == "gzip"
+        assert r.headers["cache-control"] == assets.IMMUTABLE
+        assert "javascript" in r.headers["content-type"]
+        assert "API_BASE" in r.text
+
+        r = c.get(url, headers={"Accept-Encoding": "gzip;q=0, identity"})
+        assert "content-encoding" not in r.headers
+        assert r.headers["vary"] == "Accept-Encoding"
+
+        r = c.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+        assert "immutable" not in r.headers.get("cache-control", "")
+
+
+def test_asset_url_falls_back_without_manifest(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, "load_manifest", lambda: {})
+    assert assets.asset_url("exercises.js") == "/static/exercises.js"
+    monkeypatch.setattr(assets, "load_manifest", lambda: {"exercises.js": "exercises.abc.js"})
+    assert assets.asset_url("exercises.js") == "/static/dist/exercises.abc.js"
+
+
+def test_pages_get_asset_urls_substituted(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, "load_manifest", lambda: {"auth.js": "auth.1a2b3c4d.js"})
+    src = tmp_path / "templates"
+    src.mkdir()
+    (src / "login.html").write_text(
+        """<link href="{{ asset_url('styles.css') }}">\n"""
+        """<script src="{{asset_url("auth.js")}}"></script>\n"""
+        "{% if user %}{{ user.email }}{% endif %}\n"
+    )
+    assert assets.render_pages(tmp_path / "pages", src) == ["login.html"]
+    html = (tmp_path / "pages" / "login.html").read_text()
+    assert '<link href="/static/styles.css">' in html
+    assert '<script src="/static/dist/auth.1a2b3c4d.js">' in html
+    assert "asset_url" not in html
+    assert "{% if user %}" in html  # only asset URLs are substituted
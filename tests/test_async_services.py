@@ -0,0 +1,60 @@
+import asyncio
+import datetime as dt
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db import build_async_engine
+from app.models import User
+from app.services import exercises_service, sessions_service, workouts_service
+from sqlmodel import select
+
+
+def _login(client, email="async@example.com"):
+    client.post("/api/auth/register", json={"email": email, "password": "secret123"})
+    r = client.post("/api/auth/login", json={"email": email, "password": "secret123"})
+    assert r.status_code == 200
+
+
+def test_async_services_match_sync_results(client, db, _test_db_url):
+    _login(client)
+    ex = client.post(
+        "/api/exercises", json={"name": "Async Squat", "category": "strength"}
+    ).json()
+    tpl = client.post("/api/workouts", json={"name": "Async Day"}).json()
+    client.post(f"/api/workouts/{tpl['id']}/items", json={"exercise_id": ex["id"]})
+    sess = client.post(
+        "/api/sessions",
+        json={"date": dt.date.today().isoformat(), "workout_template_id": tpl["id"]},
+    ).json()
+
+    user_id = db.exec(select(User).where(User.email == "async@example.com")).one().id
+
+    async def run():
+        aengine = build_async_engine(_test_db_url, name="async-test")
+        try:
+            async with AsyncSession(aengine, expire_on_commit=False) as adb:
+                exercises = await exercises_service.list_exercises_async(
+                    adb, user_id, q="squat", category=None, limit=50, offset=0
+                )
+                sessions = await sessions_service.list_sessions_async(
+                    adb, user_id, None, None, None
+                )
+                items = await sessions_service.list_items_async(adb, user_id, sess["id"])
+                templates = await workouts_service.list_templates_async(
+                    adb, user_id, q=None
+                )
+                tpl_items = await workouts_service.list_template_items_async(
+                    adb, user_id, tpl["id"]
+                )
+                return exercises, sessions, items, templates, tpl_items
+        finally:
+            await aengine.dispose()
+
+    exercises, sessions, items, templates, tpl_items = asyncio.run(run())
+
+    assert [e.id for e in exercises] == [ex["id"]]
+    assert [s.id for s in sessions] == [sess["id"]]
+    assert [i.exercise_name for i in items] == ["Async Squat"]
+    assert [t.id for t in templates] == [tpl["id"]]
+    assert [i.exercise_id for i in tpl_items] == [ex["id"]]
+    assert items == sessions_service.list_items(db, user_id, sess["id"])
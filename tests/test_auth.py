@@ -130,3 +130,83 @@ def test_html_pages_require_auth(client):
     # Now index is allowed
     r = client.get("/")
     assert r.status_code == 200
+
+
+def test_current_user_cached_until_logout(client):
+    from prometheus_client import REGISTRY
+
+    from app.auth import user_cache
+
+    _register_and_login(client, email="cache@example.com")
+    token = client.cookies.get("access_token")
+
+    def lookups(result):
+        return REGISTRY.get_sample_value(
+            "auth_user_cache_lookups_total", {"result": result}
+        ) or 0
+
+    assert client.get("/api/auth/me").status_code == 200  # miss, then cached
+    hits = lookups("hit")
+    me = client.get("/api/auth/me").json()
+    assert me["email"] == "cache@example.com"
+    assert lookups("hit") == hits + 1
+    assert user_cache.get(token).id == me["id"]
+
+    client.post("/api/auth/logout")
+    assert user_cache.get(token) is None
+
+
+def test_login_returns_503_when_hash_queue_full(client, monkeypatch):
+    from app import passwords
+
+    _register_and_login(client, email="busy@example.com")
+    monkeypatch.setattr(passwords, "PASSWORD_QUEUE_LIMIT", 0)
+    r = client.post(
+        "/api/auth/login", json={"email": "busy@example.com", "password": "secret123"}
+    )
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == str(passwords.RETRY_AFTER_SECONDS)
+
+
+def test_login_rehashes_outdated_password_hash(client, db):
+    from passlib.context import CryptContext
+
+    from app.models import User
+    from app.passwords import password_context
+
+    weak = CryptContext(
+        schemes=["argon2"], argon2__memory_cost=8192, argon2__time_cost=1,
+        argon2__parallelism=1,
+    )
+    u = User(email="rehash@example.com", password_hash=weak.hash("secret123"))
+    db.add(u)
+    db.commit()
+    assert password_context().needs_update(u.password_hash)
+
+    r = client.post(
+        "/api/auth/login", json={"email": "rehash@example.com", "password": "secret123"}
+    )
+    assert r.status_code == 200
+    db.refresh(u)
+    assert not password_context().needs_update(u.password_hash)
+    assert password_context().verify("secret123", u.password_hash)
+
+
+def test_no_db_connection_held_while_hashing(client, monkeypatch, _engine):
+    from app import passwords
+    from app.routers import auth as auth_router
+
+    checked_out = []
+
+    def watch(fn):
+        async def wrapper(*args, **kwargs):
+            checked_out.append(_engine.pool.checkedout())
+            return await fn(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(auth_router, "hash_password", watch(passwords.hash_password))
+    monkeypatch.setattr(auth_router, "verify_and_update", watch(passwords.verify_and_update))
+
+    _register_and_login(client, email="pool@example.com")
+    assert checked_out == [0, 0]
@@ -0,0 +1,133 @@
+import datetime as dt
+
+from app.conditional import etag_matches
+from app.services import exercises_service
+
+
+def login(client, email, password="secret123"):
+    client.post("/api/auth/register", json={"email": email, "password": password})
+    client.post("/api/auth/login", json={"email": email, "password": password})
+
+
+def test_etag_matches_weak_lists_and_star():
+    assert etag_matches('W/"abc"', 'W/"abc"')
+    assert etag_matches('"abc"', 'W/"abc"')
+    assert etag_matches('"x", W/"abc"', 'W/"abc"')
+    assert etag_matches("*", 'W/"abc"')
+    assert not etag_matches('W/"abd"', 'W/"abc"')
+
+
+def test_exercise_list_304_skips_query_until_written(client, monkeypatch):
+    login(client, "etag1@example.com")
+    client.post("/api/exercises", json={"name": "Etag Squat", "category": "strength"})
+
+    r = client.get("/api/exercises")
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert etag.startswith('W/"')
+    assert r.headers["cache-control"] == "private, no-cache"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("rows loaded for a 304")
+
+    monkeypatch.setattr(exercises_service, "list_exercises", fail)
+    r = client.get("/api/exercises", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+    assert r.content == b""
+    monkeypatch.undo()
+
+    # Other query strings have their own ETag.
+    assert client.get("/api/exercises?limit=5").headers["etag"] != etag
+
+    client.post("/api/exercises", json={"name": "Etag Row", "category": "strength"})
+    r = client.get("/api/exercises", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert [e["name"] for e in r.json()] == ["Etag Row", "Etag Squat"]
+
+    # Another user with the same collection version gets a different ETag.
+    login(client, "etag2@example.com")
+    client.post("/api/exercises", json={"name": "Other", "category": "strength"})
+    client.post("/api/exercises", json={"name": "Other 2", "category": "strength"})
+    r = client.get("/api/exercises", headers={"If-None-Match": r.headers["etag"]})
+    assert r.status_code == 200
+
+
+def test_detail_and_item_etags_follow_their_collections(client):
+    login(client, "etag3@example.com")
+    ex = client.post(
+        "/api/exercises", json={"name": "Etag Bench", "category": "strength"}
+    ).json()
+    tpl = client.post("/api/workouts", json={"name": "Etag Day"}).json()
+    sess = client.post("/api/sessions", json={"date": dt.date.today().isoformat()}).json()
+    client.post(f"/api/sessions/{sess['id']}/items", json={"exercise_id": ex["id"]})
+
+    urls = [
+        f"/api/exercises/{ex['id']}",
+        f"/api/workouts/{tpl['id']}",
+        f"/api/workouts/{tpl['id']}/items",
+        f"/api/sessions/{sess['id']}",
+        f"/api/sessions/{sess['id']}/items",
+    ]
+    etags = {u: client.get(u).headers["etag"] for u in urls}
+    for u in urls:
+        assert client.get(u, headers={"If-None-Match": etags[u]}).status_code == 304
+
+    # Adding a template item changes the workouts stamp only.
+    client.post(f"/api/workouts/{tpl['id']}/items", json={"exercise_id": ex["id"]})
+    changed = {
+        u for u in urls
+        if client.get(u, headers={"If-None-Match": etags[u]}).status_code == 200
+    }
+    assert changed == {f"/api/workouts/{tpl['id']}", f"/api/workouts/{tpl['id']}/items"}
+
+    # Renaming the exercise changes session items (they carry its name).
+    etags = {u: client.get(u).headers["etag"] for u in urls}
+    client.put(f"/api/exercises/{ex['id']}", json={"name": "Etag Bench Press"})
+    r = client.get(
+        f"/api/sessions/{sess['id']}/items",
+        headers={"If-None-Match": etags[f"/api/sessions/{sess['id']}/items"]},
+    )
+    assert r.status_code == 200
+    assert r.json()[0]["exercise_name"] == "Etag Bench Press"
+    r = client.get(
+        f"/api/sessions/{sess['id']}",
+        headers={"If-None-Match": etags[f"/api/sessions/{sess['id']}"]},
+    )
+    assert r.status_code == 304
+
+
+def test_etag_and_cached_body_agree_across_workers(client, db, _engine):
+    from sqlalchemy import event
+    from sqlmodel import select
+
+    from app.models import Exercise, User
+    from app.services import stamps
+
+    login(client, "etag4@example.com")
+    ex = client.post("/api/exercises", json={"name": "Etag Curl", "category": "strength"}).json()
+    etag = client.get("/api/exercises").headers["etag"]  # body now cached in this worker
+
+    # Another worker renames it: the stamp moves, this worker's cache is not told.
+    user = db.exec(select(User).where(User.email == "etag4@example.com")).one()
+    db.get(Exercise, ex["id"]).name = "Etag Hammer Curl"
+    stamps.bump(db, user.id, stamps.EXERCISES)
+    db.commit()
+
+    stamp_reads = []
+
+    def count(conn, cursor, statement, *args):
+        if "FROM collectionversion" in statement:
+            stamp_reads.append(statement)
+
+    event.listen(_engine, "before_cursor_execute", count)
+    try:
+        r = client.get("/api/exercises", headers={"If-None-Match": etag})
+    finally:
+        event.remove(_engine, "before_cursor_execute", count)
+    assert r.status_code == 200
+    assert [e["name"] for e in r.json()] == ["Etag Hammer Curl"]
+    assert len(stamp_reads) == 1  # the ETag's read is reused by the cache
+    r = client.get("/api/exercises", headers={"If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
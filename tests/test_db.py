@@ -0,0 +1,188 @@
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlmodel import Session
+
+from app import db as db_module
+
+
+def test_pool_settings_use_backend_profile(monkeypatch):
+    for var in (
+        "DB_POOL_SIZE",
+        "DB_MAX_OVERFLOW",
+        "DB_POOL_TIMEOUT",
+        "DB_POOL_PRE_PING",
+        "DB_POOL_RECYCLE",
+    ):
+        monkeypatch.delenv(var, raising=False)
+
+    pg = db_module.pool_settings("postgresql+psycopg://u:p@localhost/db")
+    assert pg["pool_pre_ping"] is True
+    assert pg["pool_size"] == db_module.POOL_PROFILES["postgresql"]["pool_size"]
+
+    lite = db_module.pool_settings("sqlite:///./x.db")
+    assert lite["pool_pre_ping"] is False
+    assert lite["pool_recycle"] == -1
+
+
+def test_pool_settings_env_overrides(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "0.5")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "60")
+
+    s = db_module.pool_settings("postgresql+psycopg://u:p@localhost/db")
+    assert s == {
+        "pool_size": 3,
+        "max_overflow": 0,
+        "pool_timeout": 0.5,
+        "pool_pre_ping": False,
+        "pool_recycle": 60,
+    }
+
+
+def test_pool_metrics_track_checkout_overflow_and_timeout(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "1")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "0.05")
+    eng = db_module.build_engine(f"sqlite:///{tmp_path / 'pool.db'}", name="pooltest")
+    labels = {"pool": "pooltest"}
+
+    def sample(name):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    c1 = eng.connect()
+    c1.execute(text("select 1"))
+    assert sample("db_pool_checked_out_connections") == 1
+
+    c2 = eng.connect()  # beyond pool_size -> overflow
+    assert sample("db_pool_overflow_total") == 1
+    assert sample("db_pool_checked_out_connections") == 2
+
+    with pytest.raises(PoolTimeoutError):
+        eng.connect()
+    assert sample("db_pool_timeouts_total") == 1
+    assert sample("db_pool_checkout_wait_seconds_count") == 3
+
+    c1.close()
+    c2.close()
+    assert sample("db_pool_checked_out_connections") == 0
+    eng.dispose()
+
+
+def test_sqlite_production_engines_use_wal_and_read_only_pool(tmp_path):
+    url = f"sqlite:///{tmp_path / 'prod.db'}"
+    writer = db_module.build_sqlite_writer_engine(url)
+    reader = db_module.build_sqlite_reader_engine(url)
+
+    with writer.begin() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        conn.exec_driver_sql("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+        conn.exec_driver_sql("INSERT INTO t (id) VALUES (1)")
+    assert writer.pool.size() == 1
+
+    with reader.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM t").scalar() == 1
+        with pytest.raises(Exception, match="readonly|read-only|query_only"):
+            conn.exec_driver_sql("INSERT INTO t (id) VALUES (2)")
+
+    writer.dispose()
+    reader.dispose()
+
+
+def _replicas(tmp_path, n):
+    return [
+        db_module.build_engine(f"sqlite:///{tmp_path / f'replica{i}.db'}", name=f"r{i}")
+        for i in range(n)
+    ]
+
+
+def test_read_router_round_robin_and_least_connections(tmp_path):
+    a, b = _replicas(tmp_path, 2)
+
+    rr = db_module.ReadRouter([a, b])
+    assert [rr.pick() for _ in range(4)] == [a, b, a, b]
+
+    lc = db_module.ReadRouter([a, b], policy="least_connections")
+    held = a.connect()
+    assert lc.pick() is b
+    held.close()
+
+    with pytest.raises(ValueError):
+        db_module.ReadRouter([a], policy="random")
+
+
+def test_read_session_falls_back_and_pins_after_write(monkeypatch, tmp_path):
+    from starlette.requests import Request
+
+    (good,) = _replicas(tmp_path, 1)
+    dead = db_module.build_engine(f"sqlite:///{tmp_path / 'missing' / 'x.db'}")
+    router = db_module.ReadRouter([dead, good])
+    monkeypatch.setattr(db_module, "read_router", router)
+    monkeypatch.setattr(db_module, "READ_URLS", ["sqlite://dead", "sqlite://good"])
+
+    def request(cookie=None):
+        headers = []
+        if cookie:
+            headers.append((b"cookie", cookie.encode()))
+        return Request({"type": "http", "headers": headers})
+
+    primary = Session(db_module.build_engine(f"sqlite:///{tmp_path / 'primary.db'}"))
+
+    def resolve(req):
+        gen = db_module.get_read_session(req, primary)
+        return next(gen)
+
+    # nothing is chosen or connected until the first query
+    session = resolve(request())
+    assert good.pool.checkedout() == 0 and not router._down_until
+    # the unreachable replica is skipped and marked down
+    assert session.execute(text("SELECT 1")).scalar() == 1
+    assert session.get_bind().engine is good and good.pool.checkedout() == 1
+    session.close()
+    assert good.pool.checkedout() == 0
+    assert router.pick() is good and router._down_until.keys() == {dead}
+
+    # a recent write pins the client to the primary
+    until = f"{db_module.READ_AFTER_WRITE_COOKIE}={time.time() + 60}"
+    assert resolve(request(until)) is primary
+    expired = f"{db_module.READ_AFTER_WRITE_COOKIE}={time.time() - 1}"
+    assert resolve(request(expired)).get_bind().engine is good
+
+    # with no reachable replica the reads go to the primary
+    monkeypatch.setattr(db_module, "read_router", db_module.ReadRouter([dead]))
+    assert resolve(request()).get_bind() is primary.get_bind()
+
+
+def test_read_after_write_cookie_set_on_successful_writes_only():
+    from fastapi import FastAPI, HTTPException
+    from fastapi.testclient import TestClient
+
+    from app.middleware import ReadAfterWriteMiddleware
+
+    app = FastAPI()
+    app.add_middleware(ReadAfterWriteMiddleware)
+
+    @app.get("/r")
+    def read():
+        return {}
+
+    @app.post("/w")
+    def write(fail: bool = False):
+        if fail:
+            raise HTTPException(status_code=400)
+        return {}
+
+    client = TestClient(app)
+    assert "set-cookie" not in client.get("/r").headers
+    assert "set-cookie" not in client.post("/w?fail=true").headers
+    cookie = client.post("/w").headers["set-cookie"]
+    name, _, rest = cookie.partition("=")
+    assert name == db_module.READ_AFTER_WRITE_COOKIE
+    assert float(rest.split(";")[0]) > time.time()
+    assert "HttpOnly" in cookie and "SameSite=lax" in cookie and "Path=/" in cookie
@@ -237,3 +237,190 @@ def test_delete_exercise_referenced_by_session_returns_409(client):
     assert ur.status_code == 200
     body = ur.json()
     assert body["counts"]["sessions"] >= 1
+
+
+def test_exercise_search_is_indexed_ranked_and_kept_in_sync(client):
+    _login(client, "fts@example.com")
+    ids = {}
+    for name in ("Incline Dumbbell Bench Press", "Bench Press", "Leg Press", "Squat"):
+        r = client.post("/api/exercises", json={"name": name, "category": "strength"})
+        ids[name] = r.json()["id"]
+
+    names = [e["name"] for e in client.get("/api/exercises?q=bench press").json()]
+    assert names == ["Bench Press", "Incline Dumbbell Bench Press"]
+    # Operators in user input are matched literally
+    assert client.get('/api/exercises?q=" OR squat').json() == []
+
+    client.put(f"/api/exercises/{ids['Squat']}", json={"name": "Box Squat"})
+    assert [e["name"] for e in client.get("/api/exercises?q=box").json()] == ["Box Squat"]
+    client.delete(f"/api/exercises/{ids['Leg Press']}")
+    assert "Leg Press" not in [e["name"] for e in client.get("/api/exercises?q=press").json()]
+
+    # Two-character queries are below trigram length and use LIKE
+    assert {e["name"] for e in client.get("/api/exercises?q=sq").json()} == {"Box Squat"}
+
+    client.post("/api/workouts", json={"name": "Push Day"})
+    client.post("/api/workouts", json={"name": "Pull Day"})
+    assert [t["name"] for t in client.get("/api/workouts?q=push").json()] == ["Push Day"]
+
+
+def test_exercise_cursor_pagination(client):
+    _login(client, "excursor@example.com")
+    for i in range(5):
+        client.post("/api/exercises", json={"name": f"Curl Variant {i}", "category": "strength"})
+
+    def walk(**params):
+        rows, cursor = [], None
+        while True:
+            r = client.get(
+                "/api/exercises", params={**params, **({"cursor": cursor} if cursor else {})}
+            )
+            assert r.status_code == 200
+            rows += r.json()
+            cursor = r.headers.get("x-next-cursor")
+            if cursor is None:
+                return rows
+
+    newest_first = walk(limit=2)
+    assert [e["id"] for e in newest_first] == sorted((e["id"] for e in newest_first), reverse=True)
+    assert len(newest_first) == 5
+    # Old limit/offset paging still works
+    offset_page = client.get("/api/exercises", params={"limit": 2, "offset": 2}).json()
+    assert offset_page == newest_first[2:4]
+    # Ranked search results page by offset inside the cursor
+    ranked = walk(q="curl variant", limit=2)
+    assert len(ranked) == 5 and len({e["id"] for e in ranked}) == 5
+
+
+def test_exercise_names_are_unique_after_normalization(client):
+    _login(client, "norm@example.com")
+    a = client.post("/api/exercises", json={"name": "Romanian Deadlift", "category": "strength"})
+    b = client.post("/api/exercises", json={"name": "Good Morning", "category": "strength"})
+
+    r = client.post("/api/exercises", json={"name": "  romanian   DEADLIFT ", "category": "strength"})
+    assert r.status_code == 409
+    r = client.put(f"/api/exercises/{b.json()['id']}", json={"name": "ROMANIAN deadlift"})
+    assert r.status_code == 409
+    # Changing only the case of its own name is not a conflict
+    r = client.put(f"/api/exercises/{a.json()['id']}", json={"name": "romanian deadlift"})
+    assert r.status_code == 200 and r.json()["name"] == "romanian deadlift"
+    # The session is usable after a conflict was rolled back
+    assert len(client.get("/api/exercises", params={"q": "good"}).json()) == 1
+
+
+def _cache_lookups(result):
+    from app.metrics import EXERCISE_CACHE_LOOKUPS
+
+    return EXERCISE_CACHE_LOOKUPS.labels(result=result)._value.get()
+
+
+def test_exercise_library_cache_hits_and_write_through(client, db):
+    from sqlmodel import select
+
+    from app.models import Exercise, User
+    from app.services.exercise_cache import CachedExercise, exercise_cache
+
+    _login(client, "cache@example.com")
+    first = client.post("/api/exercises", json={"name": "Cached Row", "category": "strength"})
+    client.get("/api/exercises")  # loads the library
+
+    hits = _cache_lookups("hit")
+    assert [e["name"] for e in client.get("/api/exercises").json()] == ["Cached Row"]
+    s = client.post("/api/sessions", json={"date": "2024-05-01"}).json()
+    item = client.post(f"/api/sessions/{s['id']}/items", json={"exercise_id": first.json()["id"]})
+    assert item.json()["exercise_name"] == "Cached Row"
+    assert _cache_lookups("hit") >= hits + 2
+
+    # Writes through the API are visible immediately
+    client.put(f"/api/exercises/{first.json()['id']}", json={"name": "Cached Pendlay Row"})
+    assert client.get("/api/exercises").json()[0]["name"] == "Cached Pendlay Row"
+    items = client.get(f"/api/sessions/{s['id']}/items").json()
+    assert items[0]["exercise_name"] == "Cached Pendlay Row"
+
+    # A row written by another worker is found by falling back to the database
+    user = db.exec(select(User).where(User.email == "cache@example.com")).one()
+    other = Exercise(user_id=user.id, name="Other Worker Curl", name_norm="other worker curl")
+    db.add(other)
+    db.commit()
+    r = client.post(f"/api/sessions/{s['id']}/items", json={"exercise_id": other.id})
+    assert r.status_code == 201 and r.json()["exercise_name"] == "Other Worker Curl"
+    assert "Other Worker Curl" in [e["name"] for e in client.get("/api/exercises").json()]
+
+    # An entry loaded at an older exercises stamp is never served
+    stale = CachedExercise(1, user.id, "stale", "strength", None, None, "local", None)
+    exercise_cache.put(user.id, 1, {1: stale})
+    assert exercise_cache.get(user.id, 2) is None
+
+
+def test_exercise_cache_follows_writes_from_other_workers(client, db):
+    from sqlmodel import select
+
+    from app.models import Exercise, User
+    from app.services import stamps
+
+    _login(client, "cache2@example.com")
+    kept = client.post("/api/exercises", json={"name": "Kept", "category": "strength"}).json()
+    gone = client.post("/api/exercises", json={"name": "Gone", "category": "strength"}).json()
+    s = client.post("/api/sessions", json={"date": "2024-05-01"}).json()
+    client.post(f"/api/sessions/{s['id']}/items", json={"exercise_id": kept["id"]})
+    client.get("/api/exercises")  # this worker caches the library
+
+    # Another worker renames one exercise and deletes the other: it bumps
+    # the stamp but cannot invalidate this worker's cache.
+    user = db.exec(select(User).where(User.email == "cache2@example.com")).one()
+    db.get(Exercise, kept["id"]).name = "Kept Renamed"
+    db.delete(db.get(Exercise, gone["id"]))
+    stamps.bump(db, user.id, stamps.EXERCISES)
+    db.commit()
+
+    assert [e["name"] for e in client.get("/api/exercises").json()] == ["Kept Renamed"]
+    items = client.get(f"/api/sessions/{s['id']}/items").json()
+    assert items[0]["exercise_name"] == "Kept Renamed"
+    r = client.post(f"/api/sessions/{s['id']}/items", json={"exercise_id": gone["id"]})
+    assert r.status_code == 400
+    tpl = client.post("/api/workouts", json={"name": "Stale Day"}).json()
+    r = client.post(f"/api/workouts/{tpl['id']}/items", json={"exercise_id": gone["id"]})
+    assert r.status_code == 404
+
+
+def test_exercise_usage_counts_and_pages(client):
+    _login(client, "usage@example.com")
+    ex = client.post(
+        "/api/exercises", json={"name": "Usage Squat", "category": "strength"}
+    ).json()
+    today = dt.date.today()
+    for name in ("Leg C", "Leg A", "Leg B"):
+        tpl = client.post("/api/workouts", json={"name": name}).json()
+        # used twice in a template: still one template
+        for _ in range(2):
+            client.post(f"/api/workouts/{tpl['id']}/items", json={"exercise_id": ex["id"]})
+    for days in range(3):
+        s = client.post(
+            "/api/sessions", json={"date": (today - dt.timedelta(days=days)).isoformat()}
+        ).json()
+        client.post(f"/api/sessions/{s['id']}/items", json={"exercise_id": ex["id"]})
+        client.post(f"/api/sessions/{s['id']}/items", json={"exercise_id": ex["id"]})
+
+    counts = client.get(f"/api/exercises/{ex['id']}/usage?counts_only=true").json()
+    assert counts == {
+        "exercise": {"id": ex["id"], "name": "Usage Squat"},
+        "counts": {"workouts": 3, "sessions": 3},
+    }
+
+    page = client.get(f"/api/exercises/{ex['id']}/usage?limit=2").json()
+    assert page["counts"] == {"workouts": 3, "sessions": 3}
+    assert [w["name"] for w in page["workouts"]] == ["Leg A", "Leg B"]
+    assert [s["date"] for s in page["sessions"]] == [
+        today.isoformat(), (today - dt.timedelta(days=1)).isoformat()
+    ]
+    rest = client.get(
+        f"/api/exercises/{ex['id']}/usage",
+        params={
+            "limit": 2,
+            "workouts_cursor": page["next"]["workouts"],
+            "sessions_cursor": page["next"]["sessions"],
+        },
+    ).json()
+    assert [w["name"] for w in rest["workouts"]] == ["Leg C"]
+    assert [s["date"] for s in rest["sessions"]] == [(today - dt.timedelta(days=2)).isoformat()]
+    assert rest["next"] == {"workouts": None, "sessions": None}
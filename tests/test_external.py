@@ -1,7 +1,11 @@
 import httpx
 import pytest
 
+from sqlmodel import select
+
+from app.models import Exercise, ExerciseMuscle, Muscle
 from app.routers import external as external_router
+from app.services import imports_service
 
 
 def _register_and_login(client, email="ext@example.com"):
@@ -100,6 +104,81 @@ def test_import_exercise_dedupes_by_source_and_name(client):
     assert any(e["name"] == "Barbell Squat" for e in exercises)
 
 
+def test_bulk_import_reports_each_item(client, db, monkeypatch):
+    _register_and_login(client, "bulk@example.com")
+    existing = client.post(
+        "/api/external/exercises/import",
+        json={"source": "wger", "source_ref": "9", "name": "Deadlift", "category": "strength"},
+    ).json()
+
+    payload = [
+        {
+            "source": "wger",
+            "source_ref": "1",
+            "name": "Bulk  Press",
+            "category": "strength",
+            "muscles": {"primary": ["chest", "bulk_new"], "secondary": ["chest", "triceps"]},
+        },
+        {"source": "wger", "source_ref": "9", "name": "Renamed Deadlift"},
+        {"source": "wger", "source_ref": "2", "name": "bulk press"},
+        {"name": "Bad", "category": "dance"},
+        "not an object",
+        {"name": "Bulk Row", "category": "strength", "muscles": {"primary": ["lats"]}},
+        # wrong JSON types are per-item errors too
+        {"name": 5},
+        {"name": "Typed", "source": 3},
+        {"name": "Typed", "source_ref": 7.5},
+        {"name": "Typed", "default_unit": {"x": 1}},
+        {"name": "Typed", "equipment": ["bar"]},
+        {"name": "Typed", "muscles": ["quads"]},
+        {"name": "Typed", "muscles": {"primary": "quads"}},
+        {"name": "Typed", "muscles": {"secondary": [1]}},
+        # WGER ids are integers, as the single-item import accepts them
+        {"source": "wger", "source_ref": 9, "name": "Deadlift Again"},
+        {"source": "wger", "source_ref": 11, "name": "Int Ref Curl"},
+    ]
+    r = client.post("/api/external/exercises/import/bulk", json=payload)
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["created"], body["existing"], body["failed"]) == (3, 3, 10)
+    items = body["items"]
+    assert [i["status"] for i in items] == [
+        "created", "exists", "exists", "error", "error", "created"
+    ] + ["error"] * 8 + ["exists", "created"]
+    assert [i["detail"] for i in items[6:14]] == [
+        "name must be a string",
+        "source must be a string",
+        "source_ref must be a string",
+        "default_unit must be a string",
+        "equipment must be a string",
+        "muscles must be an object",
+        "muscles.primary must be a list of strings",
+        "muscles.secondary must be a list of strings",
+    ]
+    assert not db.exec(select(Muscle).where(Muscle.slug == "q")).first()
+    assert items[1]["id"] == existing["id"]
+    assert items[2]["id"] == items[0]["id"]  # same normalized name earlier in the batch
+    assert items[0]["name"] == "Bulk Press"
+    assert items[14]["id"] == existing["id"]
+    assert db.get(Exercise, items[15]["id"]).source_ref == "11"
+    assert "Invalid category" in items[3]["detail"]
+
+    links = db.exec(
+        select(Muscle.slug, ExerciseMuscle.role)
+        .join(Muscle, Muscle.id == ExerciseMuscle.muscle_id)
+        .where(ExerciseMuscle.exercise_id == items[0]["id"])
+    ).all()
+    assert sorted((slug, str(role.value)) for slug, role in links) == [
+        ("bulk_new", "primary"), ("chest", "primary"), ("triceps", "secondary")
+    ]
+    names = {e["name"] for e in client.get("/api/exercises").json()}
+    assert {"Bulk Press", "Bulk Row", "Deadlift"} <= names
+
+    monkeypatch.setattr(imports_service, "BULK_IMPORT_MAX", 1)
+    r = client.post("/api/external/exercises/import/bulk", json=payload[:2])
+    assert r.status_code == 413
+
+
 @pytest.mark.parametrize(
     "raw, expected",
     [
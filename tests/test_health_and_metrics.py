@@ -17,3 +17,27 @@ def test_metrics_available():
     r = client.get("/metrics")
     assert r.status_code == 200
     assert "http_requests_total" in r.text
+
+
+def test_http_metrics_use_route_template_and_status_class(client):
+    from prometheus_client import REGISTRY
+
+    creds = {"email": "routes@example.com", "password": "secret123"}
+    client.post("/api/auth/register", json=creds)
+    client.post("/api/auth/login", json=creds)
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    labels = {"method": "GET", "route": "/api/sessions/{session_id}", "status": "4xx"}
+    before = sample("http_requests_total", **labels)
+    for session_id in (987654, 987655):
+        assert client.get(f"/api/sessions/{session_id}").status_code == 404
+
+    assert sample("http_requests_total", **labels) == before + 2
+    body = client.get("/metrics").text
+    assert "987654" not in body
+    assert sample("http_requests_in_flight") == 0
+    assert sample(
+        "http_response_size_bytes_sum", method="GET", route="/api/sessions/{session_id}"
+    ) > 0
@@ -0,0 +1,111 @@
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+WORKERS = 3
+REQUESTS = 60
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _health_total(text: str) -> float:
+    m = re.search(
+        r'^http_requests_total\{method="GET",route="/health",status="2xx"\} (\S+)$',
+        text,
+        re.M,
+    )
+    return float(m.group(1)) if m else 0.0
+
+
+@pytest.fixture
+def multi_worker_server(tmp_path):
+    port = _free_port()
+    metrics_dir = tmp_path / "prom"
+    metrics_dir.mkdir()
+    (metrics_dir / "counter_stale.db").write_bytes(b"left over from a previous run")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'mp.db'}",
+        PORT=str(port),
+        HOST="127.0.0.1",
+        UVICORN_WORKERS=str(WORKERS),
+        UVICORN_LOG_LEVEL="warning",
+        PROMETHEUS_MULTIPROC_DIR=str(metrics_dir),
+        PASSWORD_WORKERS="0",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.server"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"{base}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                pytest.fail("multi-worker server did not start")
+            time.sleep(0.2)
+        yield base, metrics_dir
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def test_metrics_are_merged_across_workers(multi_worker_server):
+    base, metrics_dir = multi_worker_server
+    assert not (metrics_dir / "counter_stale.db").exists()
+
+    before = _health_total(httpx.get(f"{base}/metrics").text)
+    for _ in range(REQUESTS):
+        # a fresh connection per request so the kernel spreads them over workers
+        assert httpx.get(f"{base}/health", headers={"Connection": "close"}).status_code == 200
+
+    totals = {_health_total(httpx.get(f"{base}/metrics").text) for _ in range(2 * WORKERS)}
+    assert totals == {before + REQUESTS}
+    assert list(metrics_dir.glob("counter_*.db"))  # per-process sample files
+
+
+def test_temporary_metrics_dir_is_removed_at_exit(tmp_path, monkeypatch):
+    import atexit
+    import tempfile
+
+    from app import server
+
+    registered = []
+    monkeypatch.setattr(atexit, "register", lambda fn, *args: registered.append((fn, args)))
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", "")
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR")
+
+    server.setup_metrics_dir(2)
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    assert os.path.dirname(path) == str(tmp_path) and os.path.isdir(path)
+    (fn, args), = registered
+    fn(*args)
+    assert not os.path.exists(path)
+
+    # A directory the operator configured is left alone.
+    registered.clear()
+    server.setup_metrics_dir(2)
+    assert registered == []
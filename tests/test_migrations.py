@@ -0,0 +1,124 @@
+import pytest
+from sqlmodel import SQLModel, create_engine
+
+from app import migrations
+
+
+def _engine(tmp_path, name="m.db"):
+    return create_engine(f"sqlite:///{tmp_path / name}")
+
+
+def test_upgrade_applies_all_then_is_a_noop(tmp_path):
+    eng = _engine(tmp_path)
+    with pytest.raises(migrations.SchemaOutOfDate):
+        migrations.check_schema(eng)
+
+    applied = migrations.upgrade(eng)
+    assert applied == [m.version for m in migrations.MIGRATIONS]
+    assert migrations.check_schema(eng) == migrations.head_version()
+    assert migrations.upgrade(eng) == []
+
+    with eng.connect() as conn:
+        names = set(
+            conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            ).scalars()
+        )
+    assert {
+        "ix_session_user_date_id",
+        "ix_sessionitem_session_order",
+        "ix_workoutitem_template_order_id",
+        "ix_exercise_user_lower_name",
+    } <= names
+
+    from app.services.search import sqlite_trigram_available
+
+    if sqlite_trigram_available():
+        with eng.connect() as conn:
+            tables = set(
+                conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'").scalars()
+            )
+        assert {"exercise_fts", "workouttemplate_fts"} <= tables
+
+
+def test_upgrade_adopts_database_created_by_create_all(tmp_path):
+    from app import models  # noqa: F401
+
+    eng = _engine(tmp_path, "legacy.db")
+    SQLModel.metadata.create_all(eng)
+
+    migrations.upgrade(eng, target=1)
+    with eng.connect() as conn:
+        assert migrations.current_version(conn) == 1
+
+    migrations.upgrade(eng)
+    assert migrations.check_schema(eng) == migrations.head_version()
+
+
+def test_name_norm_backfill_keeps_older_duplicates_unindexed(tmp_path):
+    eng = _engine(tmp_path, "names.db")
+    migrations.upgrade(eng, target=6)
+    with eng.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE exercise DROP COLUMN name_norm")
+        conn.exec_driver_sql(
+            "INSERT INTO user (id, email, password_hash, created_at) "
+            "VALUES (1, 'a@example.com', 'x', CURRENT_TIMESTAMP)"
+        )
+        for name in ("Bench Press", "bench  PRESS", "Squat"):
+            conn.exec_driver_sql(
+                "INSERT INTO exercise (user_id, name, category, source) "
+                "VALUES (1, ?, 'strength', 'local')",
+                (name,),
+            )
+
+    migrations.upgrade(eng)
+    with eng.connect() as conn:
+        norms = conn.exec_driver_sql("SELECT name_norm FROM exercise ORDER BY id").scalars().all()
+        indexes = set(
+            conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars()
+        )
+    assert norms == ["bench press", None, "squat"]
+    assert "ux_exercise_user_name_norm" in indexes
+
+
+def test_search_falls_back_to_like_when_migration_skipped_fts(tmp_path, monkeypatch):
+    from sqlmodel import Session
+
+    from app.models import Exercise, User
+    from app.services import exercises_service, search
+
+    # Migrated by a Python whose SQLite lacked the trigram tokenizer ...
+    monkeypatch.setattr(search, "sqlite_trigram_available", lambda: False)
+    eng = _engine(tmp_path, "nofts.db")
+    migrations.upgrade(eng)
+    # ... and served by one that has it.
+    monkeypatch.setattr(search, "sqlite_trigram_available", lambda: True)
+    monkeypatch.setattr(search, "_search_dialects", {})
+
+    with Session(eng) as db:
+        user = User(email="nofts@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        db.add(Exercise(user_id=user.id, name="Bench Press", name_norm="bench press"))
+        db.commit()
+        assert search.search_dialect(db) == "sqlite"
+        found = exercises_service.list_exercises(db, user.id, "bench", None, 50, 0)
+        assert [e.name for e in found] == ["Bench Press"]
+    assert search._search_dialects == {str(eng.url): "sqlite"}
+
+
+def test_refused_trgm_extension_is_skipped_without_aborting_the_migration(tmp_path, caplog):
+    import logging
+
+    eng = _engine(tmp_path, "ext.db")
+    with eng.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+    with eng.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+        # SQLite has no CREATE EXTENSION, like a server that refuses pg_trgm.
+        with caplog.at_level(logging.WARNING, logger="app.migrations"):
+            assert migrations._create_trgm_extension(conn) is False
+        conn.exec_driver_sql("INSERT INTO t VALUES (2)")
+    assert "pg_trgm unavailable" in caplog.text
+    with eng.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM t").scalar() == 2
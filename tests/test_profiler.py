@@ -0,0 +1,67 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app import profiler
+from app.main import app
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+def test_window_profile_is_written_and_listed(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_DIR", tmp_path)
+
+    r = client.post("/__debug/profile?seconds=0.3")
+    assert r.status_code == 202
+    name = r.json()["name"]
+    assert client.post("/__debug/profile?seconds=0.3").status_code == 409
+    _busy(0.5)
+    deadline = time.monotonic() + 5
+    while not (tmp_path / name).exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert name in [p["name"] for p in client.get("/__debug/profiles").json()]
+    body = client.get(f"/__debug/profiles/{name}").text
+    assert "test_profiler:_busy" in body
+    stack, count = body.splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+    assert client.get("/__debug/profiles/..%2Fsecret.collapsed").status_code == 404
+
+
+def test_single_request_profile_via_header(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_DIR", tmp_path)
+    profiled = TestClient(profiler.ProfilerMiddleware(app))
+
+    assert "x-profile-file" not in profiled.get("/health").headers
+    r = profiled.get("/health", headers={"X-Profile": "1"})
+    assert r.status_code == 200
+    assert (tmp_path / r.headers["x-profile-file"]).is_file()
+
+
+def test_request_profile_is_finished_off_the_event_loop(client, tmp_path, monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(profiler, "PROFILE_DIR", tmp_path)
+    on_loop = []
+    write_profile = profiler.write_profile
+
+    def recording(stacks, name):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        write_profile(stacks, name)
+
+    monkeypatch.setattr(profiler, "write_profile", recording)
+    profiled = TestClient(profiler.ProfilerMiddleware(app))
+    r = profiled.get("/health", headers={"X-Profile": "1"})
+    assert (tmp_path / r.headers["x-profile-file"]).is_file()
+    assert on_loop == [False]
+    assert not profiler._active_lock.locked()
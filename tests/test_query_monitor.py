@@ -0,0 +1,91 @@
+import logging
+
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from app import query_monitor
+
+
+def test_statement_shape_collapses_in_lists_and_literals():
+    a = query_monitor.statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?) LIMIT 10")
+    b = query_monitor.statement_shape("SELECT *\n FROM t WHERE id IN (?, ?) LIMIT 20")
+    assert a == b == "SELECT * FROM t WHERE id IN (?...) LIMIT N"
+
+
+def test_request_scope_counts_statements_and_warns_on_repeats(_engine, caplog):
+    token = query_monitor.start_request()
+    with _engine.connect() as conn:
+        for i in range(query_monitor.NPLUSONE_THRESHOLD + 1):
+            conn.execute(text("SELECT :x"), {"x": i})
+    with caplog.at_level(logging.WARNING, logger="app.query_monitor"):
+        stats = query_monitor.finish_request(token, "/test")
+
+    assert stats.statements == query_monitor.NPLUSONE_THRESHOLD + 1
+    assert stats.db_time > 0
+    assert query_monitor.current_stats() is None
+    if query_monitor.NPLUSONE_WARN:
+        assert "Possible N+1 on /test" in caplog.text
+
+
+def test_statements_per_request_exported_by_route_template(client):
+    client.post(
+        "/api/auth/register", json={"email": "qm@example.com", "password": "secret123"}
+    )
+    client.post(
+        "/api/auth/login", json={"email": "qm@example.com", "password": "secret123"}
+    )
+    labels = {"method": "GET", "route": "/api/sessions/{session_id}/items"}
+    before = REGISTRY.get_sample_value("db_statements_per_request_sum", labels) or 0
+
+    s = client.post("/api/sessions", json={"date": "2024-01-01"}).json()
+    assert client.get(f"/api/sessions/{s['id']}/items").status_code == 200
+
+    count = REGISTRY.get_sample_value("db_statements_per_request_count", labels)
+    total = REGISTRY.get_sample_value("db_statements_per_request_sum", labels)
+    assert count and count >= 1
+    assert total - before >= 2  # user lookup + session + items
+
+
+def test_slow_queries_logged_with_caller_and_plan(client, db, monkeypatch, caplog):
+    from app.services import exercises_service
+
+    monkeypatch.setattr(query_monitor, "SLOW_QUERY_SECONDS", 1e-9)
+    query_monitor.clear_slow_queries()
+    with caplog.at_level(logging.WARNING, logger="app.sql.slow"):
+        exercises_service.list_exercises(db, 1, "sq", None, 50, 0)
+    monkeypatch.setattr(query_monitor, "SLOW_QUERY_SECONDS", 0)
+
+    assert '"event": "slow_query"' in caplog.text
+    top = client.get("/__debug/slow-queries?k=5").json()
+    entry = next(e for e in top if "FROM exercise" in e["statement"])
+    assert "exercises_service.list_exercises" in entry["callers"]
+    assert entry["plan"] and any("exercise" in line for line in entry["plan"])
+    assert "sq" not in str(entry["params"])  # types only, never values
+    query_monitor.clear_slow_queries()
+
+
+def test_failed_explain_rolls_back_to_savepoint_and_keeps_transaction(_engine, caplog):
+    from sqlalchemy import event
+
+    seen = []
+
+    def record(conn, cursor, statement, *args):
+        seen.append(statement)
+
+    with _engine.connect() as conn:
+        trans = conn.begin()
+        conn.execute(text("CREATE TEMP TABLE qm_probe (x INTEGER)"))
+        conn.execute(text("INSERT INTO qm_probe VALUES (1)"))
+        event.listen(_engine, "before_cursor_execute", record)
+        try:
+            with caplog.at_level(logging.WARNING, logger="app.query_monitor"):
+                plan = query_monitor.explain(conn, "SELECT * FROM qm_missing", ())
+        finally:
+            event.remove(_engine, "before_cursor_execute", record)
+        assert plan[0].startswith("EXPLAIN failed: OperationalError")
+        assert "EXPLAIN of slow query failed" in caplog.text
+        assert seen[0].startswith("SAVEPOINT") and seen[-1].startswith("ROLLBACK TO SAVEPOINT")
+        # The caller's transaction and its work are intact.
+        assert conn.in_transaction() and not conn.info["explaining"]
+        assert conn.execute(text("SELECT x FROM qm_probe")).scalar() == 1
+        trans.rollback()
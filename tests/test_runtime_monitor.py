@@ -0,0 +1,38 @@
+import time
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app import runtime_monitor, server
+from app.db import get_session
+from app.main import app
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels)
+
+
+def test_lifespan_starts_monitor_and_sizes_threadpool(monkeypatch):
+    monkeypatch.setattr(runtime_monitor, "RUNTIME_MONITOR_INTERVAL", 0.02)
+    monkeypatch.setattr(server, "THREADPOOL_SIZE", 7)
+    before = _value("event_loop_lag_seconds_count") or 0
+
+    with TestClient(app) as c:
+        assert c.get("/health").status_code == 200
+        time.sleep(0.2)
+        assert _value("threadpool_size") == 7
+        assert _value("threadpool_busy") is not None
+        assert _value("threadpool_queued") == 0
+
+    assert _value("event_loop_lag_seconds_count") > before
+
+
+def test_active_db_sessions_gauge(_engine, monkeypatch):
+    monkeypatch.setattr("app.db.engine", _engine)
+    before = _value("db_sessions_active", kind="primary") or 0
+
+    gen = get_session()
+    next(gen)
+    assert _value("db_sessions_active", kind="primary") == before + 1
+    gen.close()
+    assert _value("db_sessions_active", kind="primary") == before
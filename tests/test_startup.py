@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LAZY_MODULES = ("httpx", "passlib", "uvicorn", "app.services.adapters.wger")
+
+
+def test_importing_app_is_quiet_and_skips_rarely_used_modules(tmp_path):
+    code = (
+        "import sys, app.main; "
+        f"print([m for m in {LAZY_MODULES!r} if m in sys.modules])"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'startup.db'}"),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.strip() == "[]"
+    assert out.stderr == ""
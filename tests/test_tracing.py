@@ -0,0 +1,68 @@
+import pytest
+
+from app import tracing
+
+
+class _MemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def exporter():
+    mem = _MemoryExporter()
+    tracing.configure(mem)
+    try:
+        yield mem
+    finally:
+        tracing.flush()
+        tracing.configure(enabled=False)
+
+
+def test_request_trace_has_service_and_sql_spans(client, exporter):
+    creds = {"email": "trace@example.com", "password": "secret123"}
+    client.post("/api/auth/register", json=creds)
+    client.post("/api/auth/login", json=creds)
+    ex = client.post("/api/exercises", json={"name": "Trace Squat", "category": "strength"}).json()
+    s = client.post("/api/sessions", json={"date": "2024-02-01"}).json()
+
+    r = client.post(f"/api/sessions/{s['id']}/items", json={"exercise_id": ex["id"]})
+    assert r.status_code == 201
+    trace_id = r.headers["x-trace-id"]
+    tracing.flush()
+
+    spans = [sp for sp in exporter.spans if sp.trace_id == trace_id]
+    by_id = {sp.span_id: sp for sp in spans}
+    root = next(sp for sp in spans if sp.parent_id is None)
+    assert root.name == "POST /api/sessions/{session_id}/items"
+    assert root.attributes["http.status_code"] == 201
+
+    service = next(sp for sp in spans if sp.name == "sessions_service.add_item")
+    assert service.parent_id == root.span_id
+    sql = [sp for sp in spans if sp.name == "sql"]
+    assert sql and all(sp.parent_id in by_id for sp in sql)
+    assert any(by_id[sp.parent_id] is service for sp in sql)
+
+    metrics = client.get(
+        "/metrics", headers={"Accept": "application/openmetrics-text"}
+    ).text
+    assert 'trace_id="' in metrics
+
+
+def test_otlp_payload_shape():
+    span = tracing.Span("a" * 32, "b" * 16, None, "GET /x", 1, 2, {"http.status_code": 200})
+    out = tracing.OTLPExporter("http://collector:4318").payload([span])
+    otlp_span = out["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_span["traceId"] == "a" * 32
+    assert otlp_span["attributes"] == [
+        {"key": "http.status_code", "value": {"intValue": "200"}}
+    ]
+
+
+def test_tracing_off_by_default_is_a_no_op():
+    assert not tracing.ENABLED
+    with tracing.start_span("x", root=True) as span:
+        assert span is None
@@ -198,3 +198,67 @@ def test_session_cannot_be_future_dated(client):
         json={"date": tomorrow, "title": "Future", "workout_template_id": None},
     )
     assert r.status_code == 422
+
+
+def test_list_fast_path_matches_response_model(client):
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    from app.schemas import SessionItemRead, SessionRead
+
+    login(client, "fast@example.com", "secret123")
+    ex = client.post("/api/exercises", json={"name": "Press", "category": "strength"}).json()
+    for day in range(1, 21):
+        s = client.post("/api/sessions", json={"date": f"2024-03-{day:02d}", "title": "x" * 40})
+        client.post(f"/api/sessions/{s.json()['id']}/items", json={"exercise_id": ex["id"]})
+
+    r = client.get("/api/sessions", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    body = r.json()
+    assert len(body) == 20 and "user_id" not in body[0]
+    # Same JSON the validating path would produce
+    expected = TypeAdapter(List[SessionRead]).validate_python(body)
+    assert TypeAdapter(List[SessionRead]).dump_python(expected, mode="json") == body
+
+    items = client.get(f"/api/sessions/{body[0]['id']}/items").json()
+    assert items[0]["exercise_name"] == "Press"
+    assert set(items[0]) == set(SessionItemRead.model_fields)
+
+    small = client.get("/api/exercises", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers  # below GZIP_MIN_SIZE
+
+
+def test_sessions_keyset_pagination(client):
+    login(client, "pages@example.com", "secret123")
+    # Two sessions share a date, so the cursor has to break ties by id
+    for day in (1, 2, 2, 3, 4):
+        client.post("/api/sessions", json={"date": f"2024-04-{day:02d}"})
+    everything = client.get("/api/sessions").json()
+    assert "x-next-cursor" not in client.get("/api/sessions").headers
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/api/sessions", params=params)
+        assert r.status_code == 200
+        seen += r.json()
+        cursor = r.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    assert [s["id"] for s in seen] == [s["id"] for s in everything]
+    assert len(seen) == 5
+
+    ranged = client.get(
+        "/api/sessions", params={"start_date": "2024-04-02", "end_date": "2024-04-03", "limit": 2}
+    )
+    page2 = client.get(
+        "/api/sessions",
+        params={"start_date": "2024-04-02", "end_date": "2024-04-03", "limit": 2,
+                "cursor": ranged.headers["x-next-cursor"]},
+    ).json()
+    assert [s["date"] for s in ranged.json() + page2] == ["2024-04-03", "2024-04-02", "2024-04-02"]
+
+    assert client.get("/api/sessions", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/sessions", params={"limit": 1000}).status_code == 422